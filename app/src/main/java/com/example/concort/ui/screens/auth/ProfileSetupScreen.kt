@@ -43,7 +43,8 @@ fun ProfileSetupScreen(
     var isLoading by remember { mutableStateOf(false) }
     var isVisible by remember { mutableStateOf(false) }
     
-    val isFormValid = name.isNotBlank() && selectedGender != null
+    // The server matches within a city, so it requires one
+    val isFormValid = name.isNotBlank() && selectedGender != null && city.isNotBlank()
     
     LaunchedEffect(Unit) {
         delay(100)
@@ -258,7 +259,7 @@ fun ProfileSetupScreen(
                 
                 Spacer(modifier = Modifier.height(24.dp))
                 
-                // City field (optional)
+                // City field
                 AnimatedVisibility(
                     visible = isVisible,
                     enter = fadeIn(tween(600, delayMillis = 400)) + slideInVertically(
@@ -270,7 +271,7 @@ fun ProfileSetupScreen(
                         modifier = Modifier.fillMaxWidth()
                     ) {
                         Text(
-                            text = "City (optional)",
+                            text = "City",
                             style = MaterialTheme.typography.labelLarge,
                             color = ConcortColors.OnSurfaceVariant,
                             modifier = Modifier.padding(bottom = 8.dp)
@@ -324,7 +325,7 @@ fun ProfileSetupScreen(
                                 name,
                                 selectedGender!!,
                                 age.toIntOrNull(),
-                                city.ifBlank { null }
+                                city.trim()
                             )
                         },
                         modifier = Modifier.fillMaxWidth(),
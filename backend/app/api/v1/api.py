@@ -1,4 +1,4 @@
-from app.api.v1.endpoints import auth, chat, matching, users
+from app.api.v1.endpoints import admin, auth, chat, matching, users
 from fastapi import APIRouter
 
 api_router = APIRouter()
@@ -8,3 +8,4 @@ api_router.include_router(auth.router)
 api_router.include_router(users.router)
 api_router.include_router(matching.router)
 api_router.include_router(chat.router)
+api_router.include_router(admin.router)
@@ -0,0 +1,56 @@
+"""
+Admin endpoints (require the X-Admin-Token header):
+- Profile the event loop
+"""
+
+import secrets
+
+from app.core.config import settings
+from app.core.profiler import profile_event_loop, profile_in_progress
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+async def require_admin(x_admin_token: str = Header(None)):
+    """Dependency guarding admin endpoints with ADMIN_TOKEN."""
+    if not settings.ADMIN_TOKEN:
+        # Admin endpoints are off unless a token is configured
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+    if not x_admin_token or not secrets.compare_digest(
+        x_admin_token, settings.ADMIN_TOKEN
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token"
+        )
+
+
+@router.get(
+    "/profile",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(require_admin)],
+)
+async def profile(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=1, le=100),
+):
+    """
+    Sample this worker's event loop for `seconds` and return collapsed
+    stacks, ready for `flamegraph.pl`, speedscope or inferno:
+
+        curl -H "X-Admin-Token: ..." .../admin/profile?seconds=10 > loop.collapsed
+        flamegraph.pl loop.collapsed > loop.svg
+    """
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS}",
+        )
+    if profile_in_progress():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="A profile is already running"
+        )
+
+    return await profile_event_loop(seconds, interval_ms / 1000)
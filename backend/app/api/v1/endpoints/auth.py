@@ -2,26 +2,33 @@
 Authentication endpoints:
 - Register (send OTP)
 - Verify OTP
+- Refresh / logout
 - Profile setup
 """
 
 import random
-from datetime import datetime, timedelta
 
+from app.api.v1.endpoints.users import get_current_user
 from app.core.config import settings
 from app.core.database import get_db
 from app.core.matching_engine import MatchingEngine
-from app.core.security import create_access_token
+from app.core.rate_limit import rate_limiter
+from app.core.versions import versions
 from app.models.user import Gender as ModelGender
 from app.models.user import User, UserStatus
 from app.schemas import (
     ProfileSetupRequest,
+    RefreshRequest,
+    RefreshResponse,
     RegisterRequest,
     RegisterResponse,
     TokenResponse,
     UserResponse,
     VerifyOtpRequest,
 )
+from app.services.otp import OtpResult, check_otp, issue_otp
+from app.services.sessions import revoke_refresh_token, rotate_session, start_session
+from app.services.sms import sms_outbox
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -36,52 +43,38 @@ def generate_otp() -> str:
     return str(random.randint(100000, 999999))
 
 
-async def send_otp_sms(phone_number: str, otp: str) -> bool:
-    """Send OTP via SMS. Returns True if sent successfully."""
-    if settings.DEV_MODE:
-        print(f"[DEV] OTP for {phone_number}: {otp}")
-        return True
-
-    # In production, use Twilio
-    # TODO: Implement Twilio SMS sending
-    return True
+def send_otp_sms(phone_number: str, otp: str) -> bool:
+    """
+    Queue the OTP SMS for background delivery.
+    Returns False if the SMS outbox is full.
+    """
+    return sms_outbox.enqueue(
+        phone_number, f"Your {settings.APP_NAME} verification code is {otp}"
+    )
 
 
 @router.post("/register", response_model=RegisterResponse)
-async def register(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
+async def register(request: RegisterRequest):
     """
     Register with phone number. Sends OTP for verification.
     In DEV mode, OTP is always 123456.
+
+    The OTP challenge lives in the TTL store; no user row is written
+    until the code is verified.
     """
     phone = request.phone_number.strip()
+    await rate_limiter.check("otp_send_phone", phone)
 
-    # Check if user exists
-    query = select(User).where(User.phone_number == phone)
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
-
-    # Generate OTP
+    # Generate and store OTP
     otp = generate_otp()
-    otp_expires = datetime.utcnow() + timedelta(minutes=10)
-
-    if user:
-        # Update existing user's OTP
-        user.otp_code = otp
-        user.otp_expires_at = otp_expires
-    else:
-        # Create new user
-        user = User(
-            phone_number=phone,
-            otp_code=otp,
-            otp_expires_at=otp_expires,
-            status=UserStatus.PENDING_VERIFICATION,
-        )
-        db.add(user)
-
-    await db.commit()
+    await issue_otp(phone, otp)
 
-    # Send OTP SMS
-    await send_otp_sms(phone, otp)
+    # Send OTP SMS (delivered in the background)
+    if not send_otp_sms(phone, otp):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Could not send OTP right now. Please try again.",
+        )
 
     return RegisterResponse(
         message="OTP sent successfully"
@@ -98,89 +91,117 @@ async def verify_otp(request: VerifyOtpRequest, db: AsyncSession = Depends(get_d
     In DEV mode, OTP 123456 always works.
     """
     phone = request.phone_number.strip()
+    await rate_limiter.check("otp_verify_phone", phone)
+
+    # Verify OTP
+    otp_result = await check_otp(phone, request.otp_code)
+    if otp_result == OtpResult.EXPIRED:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="OTP has expired. Please request a new one.",
+        )
+    if otp_result == OtpResult.TOO_MANY_ATTEMPTS:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts. Please request a new OTP.",
+        )
+    if otp_result != OtpResult.VALID:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid OTP code"
+        )
 
-    # Find user
+    # Find or create user - the only write in the OTP flow
     query = select(User).where(User.phone_number == phone)
     result = await db.execute(query)
     user = result.scalar_one_or_none()
 
     if not user:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found. Please register first.",
+        user = User(
+            phone_number=phone,
+            status=UserStatus.PENDING_VERIFICATION,
         )
-
-    # Verify OTP
-    if not user.otp_code or user.otp_code != request.otp_code:
-        # In dev mode, also accept the dev OTP
-        if not (settings.DEV_MODE and request.otp_code == settings.DEV_OTP_CODE):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid OTP code"
-            )
-
-    # Check expiration
-    if user.otp_expires_at and user.otp_expires_at < datetime.utcnow():
-        if not settings.DEV_MODE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="OTP has expired. Please request a new one.",
-            )
+        db.add(user)
 
     # Mark as verified
     user.is_verified = True
-    user.otp_code = None
-    user.otp_expires_at = None
+    await db.flush()
 
-    await db.commit()
-
-    # Generate token
-    token = create_access_token(subject=str(user.id))
+    # Start a session (commits the user and the refresh token together)
+    access_token, refresh_token = await start_session(db, user.id)
+    await versions.bump(f"user:{user.id}")
 
     # Check if profile is complete
     is_profile_complete = bool(user.name and user.gender)
 
     return TokenResponse(
-        access_token=token,
+        access_token=access_token,
+        refresh_token=refresh_token,
         token_type="bearer",
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
         user_id=user.id,
         is_profile_complete=is_profile_complete,
     )
 
 
+@router.post("/refresh", response_model=RefreshResponse)
+async def refresh_token(request: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """
+    Exchange a refresh token for a new access/refresh token pair.
+    Refresh tokens are single-use; reusing one revokes the session.
+    """
+    rotated = await rotate_session(db, request.refresh_token)
+    if rotated is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or expired refresh token",
+        )
+
+    user_id, access_token, new_refresh_token = rotated
+    return RefreshResponse(
+        access_token=access_token,
+        refresh_token=new_refresh_token,
+        token_type="bearer",
+        expires_in=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        user_id=user_id,
+    )
+
+
+@router.post("/logout")
+async def logout(request: RefreshRequest, db: AsyncSession = Depends(get_db)):
+    """Revoke the session of a refresh token, including its access tokens."""
+    await revoke_refresh_token(db, request.refresh_token)
+    return {"message": "Logged out"}
+
+
 @router.post("/profile-setup", response_model=UserResponse)
 async def setup_profile(
     request: ProfileSetupRequest,
+    user: User = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
-    user_id: str = None,  # TODO: Get from JWT token
 ):
     """
     Complete profile setup and join the queue.
     """
-    # For now, use a simple user lookup (in production, use JWT)
-    # This will be improved with proper auth middleware
-
-    # Get the most recently verified user without a profile
-    query = (
-        select(User)
-        .where(User.is_verified == True)
-        .where(User.name == None)
-        .order_by(User.registered_at.desc())
-        .limit(1)
-    )
-    result = await db.execute(query)
-    user = result.scalar_one_or_none()
+    if user.status != UserStatus.PENDING_VERIFICATION:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Profile is already set up",
+        )
 
-    if not user:
+    # Users are matched within their city, so one without a city would
+    # only ever be paired with other users without one
+    city = (request.city or "").strip() or None
+    if city is None and settings.MATCH_BY_CITY:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="No user found pending profile setup",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="City is required",
         )
 
     # Update profile
     user.name = request.name
     user.gender = ModelGender(request.gender.value)
     user.age = request.age
-    user.city = request.city
+    user.city = city
 
     # Add to queue
     engine = MatchingEngine(db)
@@ -193,6 +214,6 @@ async def setup_profile(
 
 
 @router.post("/resend-otp", response_model=RegisterResponse)
-async def resend_otp(request: RegisterRequest, db: AsyncSession = Depends(get_db)):
+async def resend_otp(request: RegisterRequest):
     """Resend OTP to phone number."""
-    return await register(request, db)
+    return await register(request)
@@ -5,15 +5,22 @@ Chat endpoints:
 - Mark as read
 """
 
+from datetime import datetime
 from uuid import UUID
 
-from app.api.v1.endpoints.users import get_current_user
-from app.core.database import get_db
-from app.models.match import Match
+from app.api.v1.endpoints.users import get_current_user_id
+from app.core.config import settings
+from app.core.database import async_session_maker, get_db
+from app.core.json_stream import stream_json_object
+from app.core.outbox import record_message_created
+from app.core.rate_limit import rate_limiter
+from app.core.versions import conditional_get, set_etag, user_stamps, versions
+from app.models.match import Match, MatchStatus
 from app.models.message import Message
-from app.models.user import User
 from app.schemas import ChatHistoryResponse, MessageCreate, MessageResponse
-from fastapi import APIRouter, Depends, HTTPException, status
+from app.services.message_archive import fetch_archived_messages
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -21,7 +28,7 @@ router = APIRouter(prefix="/chat", tags=["Chat"])
 
 
 async def verify_match_access(
-    match_id: UUID, current_user: User, db: AsyncSession
+    match_id: UUID, current_user_id: UUID, db: AsyncSession
 ) -> Match:
     """Verify user has access to this match."""
     query = select(Match).where(Match.id == match_id)
@@ -34,8 +41,8 @@ async def verify_match_access(
         )
 
     if (
-        match.male_user_id != current_user.id
-        and match.female_user_id != current_user.id
+        match.male_user_id != current_user_id
+        and match.female_user_id != current_user_id
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -45,44 +52,52 @@ async def verify_match_access(
     return match
 
 
+async def mark_read(db: AsyncSession, match_id: UUID, reader_id: UUID) -> int:
+    """Mark the partner's messages as read and commit; returns rows changed."""
+    result = await db.execute(
+        update(Message)
+        .where(Message.match_id == match_id)
+        .where(Message.sender_id != reader_id)
+        .where(Message.is_read == False)
+        .values(is_read=True)
+    )
+    await db.commit()
+    if result.rowcount:
+        await versions.bump(f"chat:{match_id}", f"inbox:{reader_id}")
+    return result.rowcount
+
+
 @router.get("/{match_id}/messages", response_model=ChatHistoryResponse)
 async def get_messages(
+    request: Request,
     match_id: UUID,
     limit: int = 50,
     offset: int = 0,
-    current_user: User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ):
-    """Get chat messages for a match."""
-    match = await verify_match_access(match_id, current_user, db)
-
-    # Get messages
-    query = (
-        select(Message)
-        .where(Message.match_id == match_id)
-        .order_by(Message.sent_at.asc())
-        .offset(offset)
-        .limit(limit + 1)  # Get one extra to check if there's more
+    """
+    Get chat messages for a match, streamed as they are read.
+    Answers If-None-Match without DB access. Being streamed, the response
+    has no Server-Timing header; its query stats are logged when it ends.
+    """
+    # ETags are bound to the user, so only a participant holds a valid one
+    etag, not_modified = await conditional_get(
+        request, current_user_id, [f"chat:{match_id}"]
     )
-    result = await db.execute(query)
-    messages = list(result.scalars().all())
+    if not_modified:
+        return not_modified
 
-    has_more = len(messages) > limit
-    if has_more:
-        messages = messages[:limit]
+    match = await verify_match_access(match_id, current_user_id, db)
+    closed = match.status != MatchStatus.ACTIVE
 
-    # Mark unread messages as read
-    await db.execute(
-        update(Message)
-        .where(Message.match_id == match_id)
-        .where(Message.sender_id != current_user.id)
-        .where(Message.is_read == False)
-        .values(is_read=True)
-    )
-    await db.commit()
+    # Mark unread messages as read (the page below already shows them read)
+    await mark_read(db, match_id, current_user_id)
+
+    page = {"total": 0, "has_more": False}
 
-    return ChatHistoryResponse(
-        messages=[
+    def encode(msg) -> bytes:
+        return (
             MessageResponse(
                 id=msg.id,
                 match_id=msg.match_id,
@@ -90,32 +105,111 @@ async def get_messages(
                 content=msg.content,
                 is_read=msg.is_read,
                 sent_at=msg.sent_at,
-                is_sent_by_me=msg.sender_id == current_user.id,
+                is_sent_by_me=msg.sender_id == current_user_id,
+            )
+            .model_dump_json()
+            .encode()
+        )
+
+    async def encoded_messages():
+        # Runs while the response is sent, in a session of its own; cold
+        # and hot pages are read in the same transaction, so messages the
+        # archiver moves in between are neither lost nor repeated
+        async with async_session_maker() as stream_db:
+            # Closed matches may have (part of) their history in the cold
+            # archive, which always precedes the hot messages
+            archived = []
+            cold_total = 0
+            if closed:
+                archived, cold_total = await fetch_archived_messages(
+                    stream_db, match_id, offset, limit + 1
+                )
+            for msg in archived:
+                if page["total"] == limit:
+                    page["has_more"] = True
+                    return
+                yield encode(msg)
+                page["total"] += 1
+
+            # Hot messages off a server-side cursor, one extra to check if
+            # there's more
+            hot_limit = limit + 1 - len(archived)
+            if hot_limit <= 0:
+                return
+            hot_query = (
+                select(
+                    Message.id,
+                    Message.match_id,
+                    Message.sender_id,
+                    Message.content,
+                    Message.is_read,
+                    Message.sent_at,
+                )
+                .where(Message.match_id == match_id)
+                .order_by(Message.sent_at.asc())
+                .offset(max(offset - cold_total, 0))
+                .limit(hot_limit)
+                .execution_options(yield_per=settings.CHAT_HISTORY_YIELD_PER)
             )
-            for msg in messages
-        ],
-        total=len(messages),
-        has_more=has_more,
+            rows = await stream_db.stream(hot_query)
+            async for msg in rows:
+                if page["total"] == limit:
+                    page["has_more"] = True
+                    break
+                yield encode(msg)
+                page["total"] += 1
+            await rows.close()
+
+    streamed = StreamingResponse(
+        stream_json_object("messages", encoded_messages(), lambda: page),
+        media_type="application/json",
     )
+    set_etag(streamed, etag)
+    return streamed
 
 
 @router.post("/{match_id}/messages", response_model=MessageResponse)
 async def send_message(
     match_id: UUID,
     request: MessageCreate,
-    current_user: User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ):
     """Send a message in a match chat."""
-    match = await verify_match_access(match_id, current_user, db)
+    await rate_limiter.check("chat_user", str(current_user_id))
+    match = await verify_match_access(match_id, current_user_id, db)
+
+    # Only active matches take messages; the check and the activity bump are
+    # one statement so a match expiring meanwhile is not written to
+    sent_at = datetime.utcnow()
+    result = await db.execute(
+        update(Match)
+        .where(Match.id == match_id)
+        .where(Match.status == MatchStatus.ACTIVE)
+        .values(last_activity_at=sent_at)
+    )
+    if not result.rowcount:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Match is closed"
+        )
 
     # Create message
     message = Message(
-        match_id=match_id, sender_id=current_user.id, content=request.content
+        match_id=match_id,
+        sender_id=current_user_id,
+        content=request.content,
+        sent_at=sent_at,
     )
     db.add(message)
+    await db.flush()
+    record_message_created(db, message)
     await db.commit()
     await db.refresh(message)
+    await versions.bump(
+        f"chat:{match_id}",
+        *user_stamps("inbox", (match.male_user_id, match.female_user_id)),
+    )
 
     return MessageResponse(
         id=message.id,
@@ -131,19 +225,12 @@ async def send_message(
 @router.post("/{match_id}/read")
 async def mark_messages_as_read(
     match_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ):
     """Mark all messages in a chat as read."""
-    match = await verify_match_access(match_id, current_user, db)
-
-    await db.execute(
-        update(Message)
-        .where(Message.match_id == match_id)
-        .where(Message.sender_id != current_user.id)
-        .where(Message.is_read == False)
-        .values(is_read=True)
-    )
-    await db.commit()
+    await rate_limiter.check("chat_user", str(current_user_id))
+    await verify_match_access(match_id, current_user_id, db)
+    await mark_read(db, match_id, current_user_id)
 
     return {"message": "Messages marked as read"}
@@ -7,14 +7,15 @@ Matching endpoints:
 
 from uuid import UUID
 
-from app.api.v1.endpoints.users import get_current_user
+from app.api.v1.endpoints.users import get_current_user_id
 from app.core.database import get_db
 from app.core.matching_engine import MatchingEngine
+from app.core.presence import presence
+from app.core.versions import conditional_get, set_etag
 from app.models.match import Match, MatchStatus
 from app.models.message import Message
-from app.models.user import User
 from app.schemas import MatchListResponse, MatchResponse, UserPublic
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy import func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
@@ -24,17 +25,26 @@ router = APIRouter(prefix="/matches", tags=["Matches"])
 
 @router.get("", response_model=MatchListResponse)
 async def get_matches(
-    current_user: User = Depends(get_current_user), db: AsyncSession = Depends(get_db)
+    request: Request,
+    response: Response,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
 ):
-    """Get all matches for current user."""
+    """Get all matches for current user (answers If-None-Match without DB access)."""
+    etag, not_modified = await conditional_get(
+        request, current_user_id, [f"inbox:{current_user_id}"]
+    )
+    if not_modified:
+        return not_modified
+
     # Find all matches where user is either male or female
     query = (
         select(Match)
         .options(selectinload(Match.male_user), selectinload(Match.female_user))
         .where(
             or_(
-                Match.male_user_id == current_user.id,
-                Match.female_user_id == current_user.id,
+                Match.male_user_id == current_user_id,
+                Match.female_user_id == current_user_id,
             )
         )
         .order_by(Match.matched_at.desc())
@@ -42,19 +52,27 @@ async def get_matches(
     result = await db.execute(query)
     matches = result.scalars().all()
 
+    # Online status of every partner in one lookup (no DB access)
+    partner_ids = [
+        m.female_user_id if m.male_user_id == current_user_id else m.male_user_id
+        for m in matches
+    ]
+    partner_presence = await presence.lookup(partner_ids)
+
     match_responses = []
     for match in matches:
         # Determine partner
-        if match.male_user_id == current_user.id:
+        if match.male_user_id == current_user_id:
             partner = match.female_user
         else:
             partner = match.male_user
+        partner_status = partner_presence[str(partner.id)]
 
         # Get unread count
         unread_query = (
             select(func.count(Message.id))
             .where(Message.match_id == match.id)
-            .where(Message.sender_id != current_user.id)
+            .where(Message.sender_id != current_user_id)
             .where(Message.is_read == False)
         )
         unread_result = await db.execute(unread_query)
@@ -79,16 +97,20 @@ async def get_matches(
                 unread_count=unread_count,
                 last_message=last_msg.content if last_msg else None,
                 last_message_at=last_msg.sent_at if last_msg else None,
+                partner_online=partner_status.online,
+                partner_last_seen_at=partner_status.last_seen_at
+                or partner.last_active_at,
             )
         )
 
+    set_etag(response, etag)
     return MatchListResponse(matches=match_responses, total=len(match_responses))
 
 
 @router.get("/{match_id}", response_model=MatchResponse)
 async def get_match(
     match_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ):
     """Get a specific match."""
@@ -107,8 +129,8 @@ async def get_match(
 
     # Verify user is part of this match
     if (
-        match.male_user_id != current_user.id
-        and match.female_user_id != current_user.id
+        match.male_user_id != current_user_id
+        and match.female_user_id != current_user_id
     ):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -116,10 +138,11 @@ async def get_match(
         )
 
     # Determine partner
-    if match.male_user_id == current_user.id:
+    if match.male_user_id == current_user_id:
         partner = match.female_user
     else:
         partner = match.male_user
+    partner_status = (await presence.lookup([partner.id]))[str(partner.id)]
 
     return MatchResponse(
         id=match.id,
@@ -129,6 +152,8 @@ async def get_match(
         unread_count=0,
         last_message=None,
         last_message_at=None,
+        partner_online=partner_status.online,
+        partner_last_seen_at=partner_status.last_seen_at or partner.last_active_at,
     )
 
 
@@ -9,20 +9,23 @@ from uuid import UUID
 
 from app.core.database import get_db
 from app.core.matching_engine import MatchingEngine
-from app.core.security import decode_token
+from app.core.versions import conditional_get, set_etag
 from app.models.user import User, UserStatus
 from app.schemas import QueueStatusResponse, UserResponse
-from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.services.activity import activity
+from app.services.sessions import verify_access_token
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
 
-async def get_current_user(
-    authorization: str = Header(None), db: AsyncSession = Depends(get_db)
-) -> User:
-    """Dependency to get current authenticated user."""
+async def get_current_user_id(authorization: str = Header(None)) -> UUID:
+    """
+    Dependency to get the authenticated user's id from the access token.
+    No database access: revoked sessions are rejected by the revocation list.
+    """
     if not authorization:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,15 +43,23 @@ async def get_current_user(
             detail="Invalid authorization header format",
         )
 
-    # Decode token
-    user_id = decode_token(token)
-    if not user_id:
+    # Verify token and session
+    claims = await verify_access_token(token)
+    if not claims or not claims.get("sub"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired token"
         )
 
-    # Get user from database
-    query = select(User).where(User.id == UUID(user_id))
+    user_id = UUID(claims["sub"])
+    activity.record(user_id)
+    return user_id
+
+
+async def get_current_user(
+    user_id: UUID = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)
+) -> User:
+    """Dependency to get current authenticated user (loads the user row)."""
+    query = select(User).where(User.id == user_id)
     result = await db.execute(query)
     user = result.scalar_one_or_none()
 
@@ -61,8 +72,21 @@ async def get_current_user(
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    """Get current user's profile."""
+async def get_me(
+    request: Request,
+    response: Response,
+    current_user_id: UUID = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db),
+):
+    """Get current user's profile (answers If-None-Match without DB access)."""
+    etag, not_modified = await conditional_get(
+        request, current_user_id, [f"user:{current_user_id}"]
+    )
+    if not_modified:
+        return not_modified
+
+    current_user = await get_current_user(current_user_id, db)
+    set_etag(response, etag)
     return UserResponse.model_validate(current_user)
 
 
@@ -78,7 +102,7 @@ async def get_queue_status(
         )
 
     engine = MatchingEngine(db)
-    stats = await engine.get_queue_stats()
+    stats = await engine.get_queue_stats(current_user)
 
     return QueueStatusResponse(
         rank=current_user.queue_rank or 0,
@@ -92,7 +116,7 @@ async def get_queue_status(
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
     user_id: UUID,
-    current_user: User = Depends(get_current_user),
+    current_user_id: UUID = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db),
 ):
     """Get a user by ID (for viewing match profiles)."""
@@ -2,18 +2,29 @@
 WebSocket endpoints for real-time chat
 """
 
+import time
+from contextlib import ExitStack
+from datetime import datetime
 from uuid import UUID
 
 from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
-from sqlalchemy import select
-
-from app.core.database import async_session_maker
-from app.core.security import decode_token
+from sqlalchemy import or_, select, update
+
+from app.core.database import async_session_maker, run_write
+from app.core.log import connection_id_var, get_logger, new_correlation_id
+from app.core.outbox import record_message_created
+from app.core.presence import presence
+from app.core.query_stats import log_slow_frame, track_queries
+from app.core.rate_limit import new_ws_frame_bucket
+from app.core.versions import user_stamps, versions
 from app.core.websocket_manager import manager
-from app.models.match import Match
+from app.models.match import Match, MatchStatus
 from app.models.message import Message
+from app.services.activity import activity
+from app.services.sessions import verify_access_token
 
 router = APIRouter(tags=["WebSocket"])
+logger = get_logger("websocket")
 
 
 @router.websocket("/ws/chat/{match_id}")
@@ -38,9 +49,24 @@ async def websocket_chat(websocket: WebSocket, match_id: str, token: str = Query
         "sent_at": "2024-01-01T12:00:00",
         "is_sent_by_me": false
     }
+
+    Heartbeat: the server sends {"type": "ping"} periodically; answer with
+    {"type": "pong"}. Sockets silent for WS_PING_TIMEOUT_SECONDS are closed
+    with code 4008.
+
+    Only active matches take messages: connecting to a closed match is
+    refused with code 4009, and a socket whose match closes is sent
+    {"type": "error", "detail": "match_closed"} and closed with 4009 on its
+    next message or read.
     """
+    # Refuse new sockets while this worker drains for shutdown
+    if manager.draining:
+        await websocket.close(code=1012, reason="Server restarting")
+        return
+
     # Validate token
-    user_id = decode_token(token)
+    claims = await verify_access_token(token)
+    user_id = claims.get("sub") if claims else None
     if not user_id:
         await websocket.close(code=4001, reason="Invalid token")
         return
@@ -59,13 +85,62 @@ async def websocket_chat(websocket: WebSocket, match_id: str, token: str = Query
             await websocket.close(code=4003, reason="Not authorized")
             return
 
-    # Connect
+        if match.status != MatchStatus.ACTIVE:
+            await websocket.close(code=4009, reason="Match closed")
+            return
+
+        # Everyone the user was matched with sees their presence in the inbox
+        pairs_query = select(Match.male_user_id, Match.female_user_id).where(
+            or_(
+                Match.male_user_id == UUID(user_id),
+                Match.female_user_id == UUID(user_id),
+            )
+        )
+        partner_inboxes = user_stamps(
+            "inbox",
+            {
+                female if str(male) == user_id else male
+                for male, female in (await db.execute(pairs_query)).all()
+            },
+        )
+    match_inboxes = user_stamps("inbox", (match.male_user_id, match.female_user_id))
+
+    # Connect (every log line of this connection carries its id)
+    connection_id_var.set(new_correlation_id())
     await manager.connect(websocket, match_id, user_id)
+    await presence.mark_online({user_id: time.time()})
+    await versions.bump(*partner_inboxes)
+    frame_bucket = new_ws_frame_bucket()
+    frame_scope = ExitStack()
 
     try:
         while True:
+            frame_scope.close()
+
             # Receive message
             data = await websocket.receive_json()
+            manager.touch(websocket)
+            activity.record(user_id)
+            if data.get("type") == "pong":
+                continue
+
+            # Count the frame's queries and hold off draining until it is
+            # handled; the scope closes before the next frame is awaited
+            frame_stats = frame_scope.enter_context(track_queries())
+            frame_scope.enter_context(manager.handling_frame())
+            frame_scope.callback(
+                log_slow_frame,
+                frame_stats,
+                frame_type=data.get("type"),
+                match_id=match_id,
+            )
+
+            # Drop frames over the per-connection rate limit
+            if not frame_bucket.allow():
+                await manager.send_personal_message(
+                    {"type": "error", "detail": "rate_limited"}, websocket
+                )
+                continue
 
             if data.get("type") == "message":
                 content = data.get("content", "").strip()
@@ -73,26 +148,48 @@ async def websocket_chat(websocket: WebSocket, match_id: str, token: str = Query
                     continue
 
                 # Save message to database
-                async with async_session_maker() as db:
+                async def save_message(db):
+                    # Nothing is written once the match has closed
+                    sent_at = datetime.utcnow()
+                    result = await db.execute(
+                        update(Match)
+                        .where(Match.id == UUID(match_id))
+                        .where(Match.status == MatchStatus.ACTIVE)
+                        .values(last_activity_at=sent_at)
+                    )
+                    if not result.rowcount:
+                        return None
+
                     message = Message(
                         match_id=UUID(match_id),
                         sender_id=UUID(user_id),
                         content=content,
+                        sent_at=sent_at,
                     )
                     db.add(message)
-                    await db.commit()
-                    await db.refresh(message)
-
-                    # Prepare response
-                    response = {
-                        "type": "message",
-                        "id": str(message.id),
-                        "match_id": match_id,
-                        "sender_id": user_id,
-                        "content": content,
-                        "sent_at": message.sent_at.isoformat(),
-                        "is_read": False,
-                    }
+                    await db.flush()
+                    record_message_created(db, message)
+                    return message
+
+                message = await run_write(save_message)
+                if message is None:
+                    await manager.send_personal_message(
+                        {"type": "error", "detail": "match_closed"}, websocket
+                    )
+                    await websocket.close(code=4009, reason="Match closed")
+                    break
+                await versions.bump(f"chat:{match_id}", *match_inboxes)
+
+                # Prepare response
+                response = {
+                    "type": "message",
+                    "id": str(message.id),
+                    "match_id": match_id,
+                    "sender_id": user_id,
+                    "content": content,
+                    "sent_at": message.sent_at.isoformat(),
+                    "is_read": False,
+                }
 
                 # Send confirmation to sender
                 await manager.send_personal_message(
@@ -112,17 +209,31 @@ async def websocket_chat(websocket: WebSocket, match_id: str, token: str = Query
 
             elif data.get("type") == "read":
                 # Mark messages as read
-                async with async_session_maker() as db:
-                    from sqlalchemy import update
+                async def mark_read(db):
+                    status = await db.scalar(
+                        select(Match.status).where(Match.id == UUID(match_id))
+                    )
+                    if status != MatchStatus.ACTIVE:
+                        return None
 
-                    await db.execute(
+                    result = await db.execute(
                         update(Message)
                         .where(Message.match_id == UUID(match_id))
                         .where(Message.sender_id != UUID(user_id))
                         .where(Message.is_read == False)
                         .values(is_read=True)
                     )
-                    await db.commit()
+                    return result.rowcount
+
+                marked = await run_write(mark_read)
+                if marked is None:
+                    await manager.send_personal_message(
+                        {"type": "error", "detail": "match_closed"}, websocket
+                    )
+                    await websocket.close(code=4009, reason="Match closed")
+                    break
+                if marked:
+                    await versions.bump(f"chat:{match_id}", f"inbox:{user_id}")
 
                 # Notify sender that messages were read
                 await manager.broadcast_to_match(
@@ -130,7 +241,12 @@ async def websocket_chat(websocket: WebSocket, match_id: str, token: str = Query
                 )
 
     except WebSocketDisconnect:
+        pass
+    except Exception:
+        logger.exception("WebSocket error", extra={"match_id": match_id})
+    finally:
+        frame_scope.close()
         manager.disconnect(websocket, match_id, user_id)
-    except Exception as e:
-        print(f"WebSocket error: {e}")
-        manager.disconnect(websocket, match_id, user_id)
+        if not manager.is_user_connected(user_id):
+            await presence.mark_offline(user_id)
+            await versions.bump(*partner_inboxes)
@@ -0,0 +1,160 @@
+"""
+Negotiated response compression.
+
+Responses of at least COMPRESSION_MIN_BYTES are compressed with brotli
+when the client accepts "br" and the optional Brotli package is installed,
+and with gzip otherwise. Bodies are compressed as they stream: the
+middleware only holds back the first COMPRESSION_MIN_BYTES to decide, so a
+streamed chat history is never buffered whole. Smaller bodies, bodies that
+already have a Content-Encoding and non-text types pass through unchanged.
+"""
+
+import zlib
+from typing import Dict, Optional
+
+from app.core.config import settings
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """The best encoding the client accepts ("br", "gzip" or None)."""
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    def allows(name: str) -> bool:
+        return accepted.get(name, accepted.get("*", 0.0)) > 0
+
+    if brotli is not None and allows("br"):
+        return "br"
+    if allows("gzip"):
+        return "gzip"
+    return None
+
+
+class _Gzip:
+    def __init__(self):
+        self._compressor = zlib.compressobj(
+            settings.COMPRESSION_GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._compressor = brotli.Compressor(
+            quality=settings.COMPRESSION_BROTLI_QUALITY
+        )
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing large HTTP responses."""
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = (
+            settings.COMPRESSION_MIN_BYTES if minimum_size is None else minimum_size
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        await self.app(
+            scope, receive, _CompressingSend(send, encoding, self.minimum_size)
+        )
+
+
+class _CompressingSend:
+    """`send` wrapper for one response."""
+
+    def __init__(self, send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start = None
+        self.buffer = bytearray()
+        self.compressor = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message.get("headers", []))
+            content_type = headers.get("content-type", "")
+            self.passthrough = "content-encoding" in headers or not any(
+                content_type.startswith(t) for t in COMPRESSIBLE_TYPES
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                # Held back until the body size is known to be worth it
+                self.start = {**message, "headers": list(message.get("headers", []))}
+            return
+
+        if self.passthrough or message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            self.buffer += body
+            if len(self.buffer) < self.minimum_size and more_body:
+                return
+            if len(self.buffer) < self.minimum_size:
+                # Small response: send it as it is
+                await self.send(self.start)
+                await self.send(
+                    {"type": "http.response.body", "body": bytes(self.buffer)}
+                )
+                return
+
+            self.compressor = _Brotli() if self.encoding == "br" else _Gzip()
+            headers = MutableHeaders(raw=self.start["headers"])
+            del headers["content-length"]
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            await self.send(self.start)
+            body, self.buffer = bytes(self.buffer), bytearray()
+
+        data = self.compressor.compress(body)
+        if not more_body:
+            data += self.compressor.finish()
+        # The compressor may hold small writes back; skip empty messages
+        if data or not more_body:
+            await self.send(
+                {"type": "http.response.body", "body": data, "more_body": more_body}
+            )
@@ -10,19 +10,140 @@ class Settings(BaseSettings):
     # Database - SQLite for local dev, PostgreSQL for production
     DATABASE_URL: str = "sqlite+aiosqlite:///./concort.db"
 
+    # SQLite production mode (WAL, pragmas, single writer connection)
+    SQLITE_PRODUCTION_MODE: bool = False
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_MMAP_SIZE: int = 268435456  # 256 MB
+    SQLITE_READ_POOL_SIZE: int = 4
+    SQLITE_WRITE_BATCH_SIZE: int = 64
+    SQLITE_WRITE_BATCH_WINDOW_MS: int = 5
+
+    # Refuse to start unless `alembic upgrade head` ran for these models
+    SCHEMA_CHECK_ENABLED: bool = True
+
+    # Query stats (Server-Timing headers) and slow-query log (0 disables)
+    QUERY_STATS_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: int = 200
+
+    # Graceful drain on SIGTERM (keep the orchestrator's grace period longer)
+    DRAIN_TIMEOUT_SECONDS: float = 20.0
+    DRAIN_RECONNECT_SPREAD_SECONDS: float = 30.0
+
+    # Logging (json | text); WS connect/disconnect events are sampled
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATE: float = 0.1
+
+    # Prometheus metrics at /metrics
+    METRICS_ENABLED: bool = True
+
+    # Diagnostics: admin endpoints are disabled unless ADMIN_TOKEN is set
+    ADMIN_TOKEN: Optional[str] = None
+    PROFILER_MAX_SECONDS: int = 60
+    PROFILER_SIGNAL_SECONDS: int = 30  # kill -USR2 <pid>
+    PROFILER_OUTPUT_DIR: str = "/tmp"
+    SLOW_CALLBACK_THRESHOLD_MS: int = 100  # 0 disables
+
+    # Message storage (monthly partitions on PostgreSQL, cold archive)
+    MESSAGE_PARTITION_MONTHS_AHEAD: int = 2
+    MESSAGE_ARCHIVE_INTERVAL_SECONDS: int = 3600
+    MESSAGE_ARCHIVE_BATCH_MATCHES: int = 100
+    MESSAGE_ARCHIVE_CHUNK_SIZE: int = 500
+    # Chat history rows fetched per cursor round trip while streaming
+    CHAT_HISTORY_YIELD_PER: int = 500
+
+    # Matching partitions: per city, optionally within an age window (0 = any)
+    MATCH_BY_CITY: bool = True
+    MATCH_AGE_WINDOW_YEARS: int = 0
+
+    # Sharded match workers (same MATCH_SHARDS on every worker)
+    MATCH_SHARDS: int = 16
+    MATCH_SHARD_INTERVAL_SECONDS: float = 10.0
+    # "postgres", "redis" or "local" (default: postgres on PostgreSQL,
+    # redis when REDIS_URL is set, local otherwise)
+    MATCH_SHARD_LEASES: Optional[str] = None
+    MATCH_SHARD_LEASE_SECONDS: float = 30.0  # redis leases; > the interval
+    # Queue digests for warm restarts (unset: no snapshots)
+    MATCH_SNAPSHOT_PATH: Optional[str] = None
+    MATCH_SNAPSHOT_INTERVAL_SECONDS: int = 60
+
+    # Transactional outbox relay (match and message events)
+    OUTBOX_RELAY_INTERVAL_SECONDS: float = 1.0
+    OUTBOX_BATCH_SIZE: int = 500
+    OUTBOX_RETENTION_HOURS: float = 24.0
+    OUTBOX_REDIS_STREAMS: bool = False  # also XADD to "outbox:<topic>"
+    OUTBOX_STREAM_MAXLEN: int = 100000
+
+    # Match lifecycle sweeper
+    MATCH_INACTIVITY_TIMEOUT_HOURS: int = 72
+    MATCH_SWEEP_INTERVAL_SECONDS: int = 60
+    MATCH_SWEEP_BATCH_SIZE: int = 200
+    MATCH_SWEEP_MAX_PER_SECOND: int = 500
+
     # Security
     SECRET_KEY: str = "dev-secret-key-change-in-production"
     ALGORITHM: str = "HS256"
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080  # 7 days
+    # A week while the Android client cannot call /auth/refresh; 15 after
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 10080
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+    # Asymmetric algorithms (RS256, ES256, ...) read keys from a directory
+    JWT_KEYS_DIR: Optional[str] = None
+    JWT_ACTIVE_KID: Optional[str] = None
+    TOKEN_CACHE_SIZE: int = 10000
+
+    # last_active_at write-behind: bulk flush interval, per-user resolution
+    ACTIVITY_FLUSH_SECONDS: float = 5.0
+    ACTIVITY_RESOLUTION_SECONDS: float = 60.0
+
+    # Session revocation (Bloom filter synced from the revoked_sessions table)
+    REVOCATION_SYNC_SECONDS: int = 5
+    REVOCATION_BLOOM_CAPACITY: int = 100000
+
+    # Redis - shared TTL stores when set, in-process stores otherwise
+    REDIS_URL: Optional[str] = None
 
-    # Redis
-    REDIS_URL: str = "redis://localhost:6379"
+    # OTP challenges
+    OTP_TTL_SECONDS: int = 600
+    OTP_MAX_ATTEMPTS: int = 5
+
+    # Rate limiting
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_USE_REDIS: bool = False  # share counters between workers
+    WS_FRAME_RATE_PER_SECOND: float = 5.0
+    WS_FRAME_BURST: int = 20
+
+    # WebSocket heartbeat and presence
+    WS_PING_INTERVAL_SECONDS: float = 25.0
+    WS_PING_TIMEOUT_SECONDS: float = 60.0  # silent this long: socket is reaped
+    PRESENCE_LAST_SEEN_TTL_HOURS: int = 720
+    # Presence visible to API workers (default: REDIS_URL set or APP_ROLE=all)
+    PRESENCE_SHARED: Optional[bool] = None
+
+    # Conditional GETs: ETag version stamps (default: on when REDIS_URL is set)
+    ETAG_ENABLED: Optional[bool] = None
+    ETAG_STAMP_TTL_HOURS: int = 24
+
+    # Response compression (br with the optional Brotli package, else gzip)
+    COMPRESSION_ENABLED: bool = True
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
 
     # Twilio (SMS OTP)
     TWILIO_ACCOUNT_SID: Optional[str] = None
     TWILIO_AUTH_TOKEN: Optional[str] = None
     TWILIO_PHONE_NUMBER: Optional[str] = None
 
+    # SMS delivery - "console", "twilio" or "fake" (default: console in DEV_MODE)
+    SMS_PROVIDER: Optional[str] = None
+    SMS_WORKERS: int = 4
+    SMS_QUEUE_SIZE: int = 10000
+    SMS_MAX_RETRIES: int = 3
+    SMS_RETRY_BACKOFF_SECONDS: float = 0.5
+    SMS_TIMEOUT_SECONDS: float = 10.0
+    SMS_MAX_CONNECTIONS: int = 20
+
     # Development mode
     DEV_MODE: bool = True
     DEV_OTP_CODE: str = "123456"
@@ -30,6 +151,8 @@ class Settings(BaseSettings):
     # App settings
     APP_NAME: str = "Concort"
     APP_VERSION: str = "1.0.0"
+    # Worker role: all | api | ws | matcher (see app/factory.py)
+    APP_ROLE: str = "all"
 
     class Config:
         env_file = ".env"
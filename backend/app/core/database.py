@@ -1,19 +1,124 @@
-from typing import AsyncGenerator
+from typing import Any, AsyncGenerator
 
 from app.core.config import settings
+from app.core.metrics import db_pool_connections, outbound_queue_depth, registry
+from app.core.query_stats import install_query_hooks
+from app.core.write_queue import SQLiteWriteQueue, WriteJob
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-# Create async engine
-engine = create_async_engine(
-    settings.DATABASE_URL,
-    echo=False,  # Set to True for SQL logging
-    future=True,
+# SQLite production mode: WAL + pragmas, a pool of reader connections and
+# one dedicated writer connection. Ignored for PostgreSQL.
+SQLITE_MODE = settings.SQLITE_PRODUCTION_MODE and settings.DATABASE_URL.startswith(
+    "sqlite"
 )
 
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure every new SQLite connection for concurrent use."""
+    # Let SQLAlchemy emit BEGIN itself (pysqlite's implicit BEGIN breaks
+    # savepoints and hides the transaction boundaries)
+    dbapi_connection.isolation_level = None
+
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+if SQLITE_MODE:
+    # Reader pool - WAL readers never block each other or the writer
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        future=True,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+    )
+    # Single writer connection - writers queue on the pool, not on SQLite locks
+    write_engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,
+        future=True,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+
+    for _engine in (engine, write_engine):
+        event.listen(_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+
+    @event.listens_for(engine.sync_engine, "begin")
+    def _begin_read(conn):
+        conn.exec_driver_sql("BEGIN")
+
+    @event.listens_for(write_engine.sync_engine, "begin")
+    def _begin_write(conn):
+        # Take the write lock up front instead of upgrading mid-transaction
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+else:
+    # Create async engine
+    engine = create_async_engine(
+        settings.DATABASE_URL,
+        echo=False,  # Set to True for SQL logging
+        future=True,
+    )
+    write_engine = engine
+
+install_query_hooks(engine, write_engine)
+
+
+class RoutingSession(Session):
+    """
+    Session that sends reads to the reader pool and writes to the writer.
+
+    Once a transaction has written anything, its remaining reads also go to
+    the writer so they see their own uncommitted changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            self.info.get("uses_writer")
+            or self._flushing
+            or getattr(clause, "is_dml", False)
+        ):
+            self.info["uses_writer"] = True
+            return write_engine.sync_engine
+        return engine.sync_engine
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_writer_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("uses_writer", None)
+
+
 # Create async session factory
-async_session_maker = async_sessionmaker(
-    engine, class_=AsyncSession, expire_on_commit=False
+if SQLITE_MODE:
+    async_session_maker = async_sessionmaker(
+        class_=AsyncSession, sync_session_class=RoutingSession, expire_on_commit=False
+    )
+else:
+    async_session_maker = async_sessionmaker(
+        engine, class_=AsyncSession, expire_on_commit=False
+    )
+
+# Batched writer for hot write paths (SQLite mode only)
+write_queue = (
+    SQLiteWriteQueue(
+        async_sessionmaker(write_engine, class_=AsyncSession, expire_on_commit=False),
+        max_batch=settings.SQLITE_WRITE_BATCH_SIZE,
+        batch_window=settings.SQLITE_WRITE_BATCH_WINDOW_MS / 1000,
+    )
+    if SQLITE_MODE
+    else None
 )
 
 
@@ -36,7 +141,48 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
-async def create_tables():
-    """Create all tables in the database."""
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+async def _collect_metrics():
+    """Pool usage per engine and pending SQLite writes."""
+    engines = (
+        {"read": engine, "write": write_engine} if SQLITE_MODE else {"main": engine}
+    )
+    for name, _engine in engines.items():
+        pool = _engine.pool
+        if hasattr(pool, "checkedout"):
+            db_pool_connections.labels(name, "checked_out").set(pool.checkedout())
+            db_pool_connections.labels(name, "idle").set(pool.checkedin())
+            db_pool_connections.labels(name, "size").set(pool.size())
+    if write_queue is not None:
+        outbound_queue_depth.labels("sqlite_writes").set(write_queue.qsize())
+
+
+registry.add_collector(_collect_metrics)
+
+
+async def run_write(job: WriteJob) -> Any:
+    """
+    Run a write job and commit it.
+
+    In SQLite mode the job goes through the single-writer queue and is
+    committed together with other queued writes. Otherwise it runs in its
+    own session. The job must not commit.
+    """
+    if write_queue is not None:
+        return await write_queue.submit(job)
+
+    async with async_session_maker() as session:
+        result = await job(session)
+        await session.commit()
+        return result
+
+
+async def start_write_queue():
+    """Start the SQLite writer task (no-op outside SQLite mode)."""
+    if write_queue is not None:
+        await write_queue.start()
+
+
+async def stop_write_queue():
+    """Flush and stop the SQLite writer task (no-op outside SQLite mode)."""
+    if write_queue is not None:
+        await write_queue.stop()
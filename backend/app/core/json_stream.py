@@ -0,0 +1,47 @@
+"""
+Streaming JSON encoding for large list responses.
+
+`stream_json_object` writes {"<key>": [item, ...], <trailer>} piece by
+piece: items are encoded one at a time as they come off a database cursor
+and sent in chunks of about STREAM_CHUNK_BYTES, so memory per request does
+not grow with the number of items. The trailer (counts, has_more) is built
+after the last item.
+"""
+
+import json
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict
+
+# Bytes collected before a chunk is sent (one ASGI message)
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def _encode(value: Any) -> bytes:
+    return json.dumps(value, default=str, separators=(",", ":")).encode()
+
+
+async def stream_json_object(
+    key: str,
+    items: AsyncIterable[bytes],
+    trailer: Callable[[], Dict[str, Any]],
+    chunk_bytes: int = STREAM_CHUNK_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Encode an object whose `key` holds the already-encoded JSON `items`,
+    followed by the fields returned by `trailer()` once items are exhausted.
+    """
+    buffer = bytearray(b"{" + _encode(key) + b":[")
+    first = True
+    async for item in items:
+        if not first:
+            buffer += b","
+        first = False
+        buffer += item
+        if len(buffer) >= chunk_bytes:
+            yield bytes(buffer)
+            buffer.clear()
+
+    buffer += b"]"
+    for name, value in trailer().items():
+        buffer += b"," + _encode(name) + b":" + _encode(value)
+    buffer += b"}"
+    yield bytes(buffer)
@@ -0,0 +1,156 @@
+"""
+Expiring key-value store.
+
+Backed by Redis when REDIS_URL is set, so state is shared between workers,
+and by an in-process TTL map otherwise. Used for short-lived state that
+should not cost database writes (OTP challenges, counters).
+"""
+
+import abc
+import heapq
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+class KeyValueStore(abc.ABC):
+    """Interface for expiring key-value stores. Values are strings."""
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        """Value of `key`, or None if missing or expired."""
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        """Set `key`, expiring after `ttl` seconds."""
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        """Remove `key` if present."""
+
+    @abc.abstractmethod
+    async def incr(self, key: str, ttl: float) -> int:
+        """Increment a counter. The TTL starts when the counter is created."""
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        """Values of `keys`, in order (one round trip on Redis)."""
+        return [await self.get(key) for key in keys]
+
+    async def set_many(self, items: Dict[str, str], ttl: float) -> None:
+        """Set several keys with the same TTL (one round trip on Redis)."""
+        for key, value in items.items():
+            await self.set(key, value, ttl)
+
+
+class MemoryStore(KeyValueStore):
+    """
+    In-process TTL map. Expired keys are purged lazily via a min-heap.
+
+    Overwriting a key leaves its old heap entry behind; the heap is rebuilt
+    from the live keys once it holds more than twice as many entries, so
+    keys rewritten far more often than they expire (presence, stamps) do
+    not pile up entries.
+    """
+
+    # Heaps this small are never rebuilt
+    MIN_COMPACT_SIZE = 1024
+
+    def __init__(self):
+        self._data: Dict[str, Tuple[str, float]] = {}
+        self._expiry_heap: List[Tuple[float, str]] = []
+
+    def _purge(self, now: float):
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            # Skip stale heap entries for keys that were re-set since
+            if entry is not None and entry[1] == expires_at:
+                del self._data[key]
+
+    def _put(self, key: str, value: str, expires_at: float):
+        self._data[key] = (value, expires_at)
+        heapq.heappush(self._expiry_heap, (expires_at, key))
+        if len(self._expiry_heap) > max(2 * len(self._data), self.MIN_COMPACT_SIZE):
+            self._compact()
+
+    def _compact(self):
+        """Rebuild the heap with one entry per live key (amortized O(1))."""
+        self._expiry_heap = [(entry[1], key) for key, entry in self._data.items()]
+        heapq.heapify(self._expiry_heap)
+
+    async def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        self._purge(now)
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= now:
+            return None
+        return entry[0]
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.monotonic()
+        self._purge(now)
+        self._put(key, value, now + ttl)
+
+    async def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        now = time.monotonic()
+        self._purge(now)
+        entry = self._data.get(key)
+        if entry is None or entry[1] <= now:
+            self._put(key, "1", now + ttl)
+            return 1
+        value = int(entry[0]) + 1
+        self._data[key] = (str(value), entry[1])
+        return value
+
+
+class RedisStore(KeyValueStore):
+    """Redis-backed store shared by all workers."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: str, ttl: float) -> None:
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def delete(self, key: str) -> None:
+        await self.client.delete(key)
+
+    async def incr(self, key: str, ttl: float) -> int:
+        value = await self.client.incr(key)
+        if value == 1:
+            await self.client.pexpire(key, int(ttl * 1000))
+        return value
+
+    async def get_many(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        return await self.client.mget(keys)
+
+    async def set_many(self, items: Dict[str, str], ttl: float) -> None:
+        if not items:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        for key, value in items.items():
+            pipe.set(key, value, px=int(ttl * 1000))
+        await pipe.execute()
+
+
+def create_kv_store() -> KeyValueStore:
+    """Build the store selected by REDIS_URL."""
+    if settings.REDIS_URL:
+        return RedisStore(settings.REDIS_URL)
+    return MemoryStore()
+
+
+# Global store
+kv_store = create_kv_store()
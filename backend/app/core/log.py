@@ -0,0 +1,204 @@
+"""
+Structured, non-blocking logging.
+
+Application loggers live under `concort.*`. Records are put on a bounded
+in-memory queue by the calling coroutine (no I/O on the event loop) and
+written to stdout by a background thread. When the queue is full, records
+are dropped and counted rather than blocking the loop.
+
+Output is one JSON object per line (LOG_FORMAT=json) or plain text
+(LOG_FORMAT=text). Fields passed via `extra=` are included as-is, and
+every record carries the current request id (X-Request-ID) and WebSocket
+connection id when there is one.
+
+High-frequency events (WebSocket connect/disconnect) go through
+`log_sampled()`, which keeps a configurable fraction of them.
+"""
+
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.core.config import settings
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+connection_id_var: ContextVar[Optional[str]] = ContextVar("connection_id", default=None)
+
+# Attributes every LogRecord has; anything else came from `extra=`
+_RESERVED = set(logging.makeLogRecord({}).__dict__) | {"message", "asctime"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger under the `concort` namespace, e.g. get_logger("chat")."""
+    return logging.getLogger(f"concort.{name}")
+
+
+def new_correlation_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def log_sampled(
+    logger: logging.Logger,
+    level: int,
+    msg: str,
+    rate: Optional[float] = None,
+    **fields,
+):
+    """Log only a `rate` fraction of calls; the kept records carry the rate."""
+    if rate is None:
+        rate = settings.LOG_SAMPLE_RATE
+    if rate < 1.0 and random.random() >= rate:
+        return
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={**fields, "sample_rate": rate})
+
+
+# ===== Formatting =====
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_text:
+            payload["exc"] = record.exc_text
+        return json.dumps(payload, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines with extra fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = " ".join(
+            f"{key}={value}"
+            for key, value in record.__dict__.items()
+            if key not in _RESERVED and not key.startswith("_")
+        )
+        return f"{line} {fields}" if fields else line
+
+
+# ===== Queue handler =====
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Enqueues records with correlation ids; drops them when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Capture context in the calling task; format in the writer thread
+        request_id = request_id_var.get()
+        if request_id is not None:
+            record.request_id = request_id
+        connection_id = connection_id_var.get()
+        if connection_id is not None:
+            record.connection_id = connection_id
+
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_listener: Optional[QueueListener] = None
+queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def setup_logging():
+    """Route `concort.*` loggers through the queue (idempotent)."""
+    global _listener, queue_handler
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(
+        TextFormatter() if settings.LOG_FORMAT == "text" else JsonFormatter()
+    )
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+
+    root = logging.getLogger("concort")
+    root.setLevel(settings.LOG_LEVEL.upper())
+    root.addHandler(queue_handler)
+    root.propagate = False
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records, stop the writer thread and detach the handler."""
+    global _listener, queue_handler
+    if _listener is not None:
+        root = logging.getLogger("concort")
+        root.removeHandler(queue_handler)
+        root.propagate = True
+        _listener.stop()
+        _listener = None
+        queue_handler = None
+
+
+# ===== Request ids =====
+
+
+class RequestIdMiddleware:
+    """ASGI middleware binding X-Request-ID (or a new id) to each request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope.get("headers", ()):
+            if name == b"x-request-id":
+                request_id = value.decode("latin-1")[:64]
+                break
+        request_id = request_id or new_correlation_id()
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-request-id", request_id.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
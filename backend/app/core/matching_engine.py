@@ -5,18 +5,91 @@ Core algorithm for fair, queue-based matching.
 Rules:
 1. First-come, first-match based on verified_at timestamp
 2. Match only between MALE and FEMALE users in WAITING status
-3. Update queue ranks for remaining users after matching
+3. Match only within a partition: the same city (MATCH_BY_CITY) and,
+   when MATCH_AGE_WINDOW_YEARS is set, ages at most that many years apart
+4. Queue ranks are positions within the user's city and gender
+
+A new arrival is matched on the spot with the earliest-verified compatible
+waiter of its partition: one lookup on the (city, gender, status,
+verified_at) index instead of a pass over the whole queue. Because every
+arrival is matched this way, no compatible pair is left waiting, so
+matching the arrival with that waiter keeps first-come order.
+process_queue() pairs whole partitions and repairs anything that bypassed
+add_to_queue (bulk requeues, imports, changed settings); the match shard
+workers run it for the cities they own (app.services.match_shards).
 """
 
+import time
+from collections import defaultdict, deque
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple
 from uuid import UUID
 
+from app.core.config import settings
+from app.core.database import async_session_maker, write_engine
+from app.core.metrics import (
+    matches_created,
+    process_queue_duration,
+    queue_waiting_users,
+    registry,
+)
+from app.core.outbox import record_match_created
+from app.core.versions import user_stamps, versions
 from app.models.match import Match, MatchStatus
 from app.models.user import Gender, User, UserStatus
-from sqlalchemy import func, select
+from sqlalchemy import bindparam, func, or_, select, true, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+# (count, newest verified_at) of the MALE and FEMALE waiters of a partition
+QueueDigest = Tuple[Tuple[int, Optional[datetime]], Tuple[int, Optional[datetime]]]
+
+
+def opposite_gender(gender: Gender) -> Gender:
+    return Gender.FEMALE if gender == Gender.MALE else Gender.MALE
+
+
+def partition_key(user: User) -> Optional[str]:
+    """City a user is matched within (None when matching nationwide)."""
+    return user.city if settings.MATCH_BY_CITY else None
+
+
+def in_partition(city: Optional[str]):
+    """WHERE clause selecting the users of one partition."""
+    if not settings.MATCH_BY_CITY:
+        return true()
+    return User.city.is_(None) if city is None else User.city == city
+
+
+def ages_compatible(a: Optional[int], b: Optional[int]) -> bool:
+    window = settings.MATCH_AGE_WINDOW_YEARS
+    if window <= 0 or a is None or b is None:
+        return True
+    return abs(a - b) <= window
+
+
+def pair_partition(users: Iterable[User]) -> Tuple[List[Tuple[User, User]], Dict]:
+    """
+    Pair the waiters of one partition, given in verified_at order.
+
+    Replays arrivals: each user takes the earliest compatible waiter of the
+    opposite gender, or waits. Returns (male, female) pairs and the users
+    left waiting per gender, still in order.
+    """
+    waiting = {Gender.MALE: deque(), Gender.FEMALE: deque()}
+    pairs = []
+    for user in users:
+        others = waiting[opposite_gender(user.gender)]
+        for index, other in enumerate(others):
+            if ages_compatible(user.age, other.age):
+                del others[index]
+                pairs.append(
+                    (user, other) if user.gender == Gender.MALE else (other, user)
+                )
+                break
+        else:
+            waiting[user.gender].append(user)
+    return pairs, waiting
+
 
 class MatchingEngine:
     """Core matching engine for the dating platform."""
@@ -24,43 +97,110 @@ class MatchingEngine:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def process_queue(self) -> List[Match]:
+    async def _lock_queues(self, city: Optional[str], genders: Iterable[Gender]):
         """
-        Process the queue and create matches.
-        Called when:
-        1. A new user gets verified
-        2. Periodically via background job
+        Serialize rank changes per city and gender until commit.
 
-        Returns list of new matches created.
+        SQLite already runs one write transaction at a time; PostgreSQL
+        takes a transaction-scoped advisory lock per queue (in a fixed
+        order, so two transactions cannot deadlock). On SQLite, reads made
+        before the first write are not covered, so users are always claimed
+        with conditional UPDATEs.
         """
-        new_matches = []
+        if write_engine.dialect.name != "postgresql":
+            return
+        for gender in sorted(set(genders), key=lambda g: g.value):
+            key = f"queue:{city}:{gender.value}"
+            await self.db.execute(
+                select(func.pg_advisory_xact_lock(func.hashtext(key)))
+            )
 
-        # Get waiting males ordered by verified_at
-        male_query = (
-            select(User)
-            .where(User.gender == Gender.MALE)
+    async def waiting_partitions(
+        self, user_ids: Optional[List[UUID]] = None
+    ) -> List[Optional[str]]:
+        """Partitions with users waiting (optionally only those of `user_ids`)."""
+        if not settings.MATCH_BY_CITY:
+            return [None]
+        query = select(User.city).distinct().where(User.status == UserStatus.WAITING)
+        if user_ids is not None:
+            query = query.where(User.id.in_(user_ids))
+        return list((await self.db.execute(query)).scalars())
+
+    async def queue_digests(self) -> Dict[Optional[str], QueueDigest]:
+        """
+        Per partition, (waiting count, newest verified_at) of each gender.
+
+        One grouped scan that the (city, gender, status, verified_at) index
+        covers. A partition whose digest has not changed since it was last
+        paired has had no arrivals, matches or departures since, so pairing
+        it again would find nothing.
+        """
+        columns = [User.city, User.gender] if settings.MATCH_BY_CITY else [User.gender]
+        query = (
+            select(*columns, func.count(), func.max(User.verified_at))
             .where(User.status == UserStatus.WAITING)
-            .order_by(User.verified_at.asc())
+            .group_by(*columns)
         )
-        male_result = await self.db.execute(male_query)
-        males = list(male_result.scalars().all())
+        sides = defaultdict(dict)
+        for row in (await self.db.execute(query)).all():
+            city = row[0] if settings.MATCH_BY_CITY else None
+            sides[city][row.gender] = tuple(row[-2:])
+        empty = (0, None)
+        return {
+            city: (
+                by_gender.get(Gender.MALE, empty),
+                by_gender.get(Gender.FEMALE, empty),
+            )
+            for city, by_gender in sides.items()
+        }
+
+    async def process_queue(
+        self, partitions: Optional[Iterable[Optional[str]]] = None
+    ) -> List[Match]:
+        """
+        Pair the queue of each partition (default: all with waiters) and
+        re-rank the remaining users. Called:
+        1. After matched users are put back in bulk (requeue_users)
+        2. By the match shard workers, for the cities they own
+        3. Manually via the process-queue endpoint
+
+        Each partition is paired in its own short transaction, holding the
+        same queue locks as add_to_queue. New arrivals are matched by
+        add_to_queue without a full pass.
+        Returns list of new matches created.
+        """
+        started = time.perf_counter()
+        if partitions is None:
+            partitions = await self.waiting_partitions()
 
-        # Get waiting females ordered by verified_at
-        female_query = (
+        new_matches = []
+        for city in partitions:
+            new_matches += await self._process_partition(city)
+
+        process_queue_duration.observe(time.perf_counter() - started)
+        matches_created.inc(len(new_matches))
+        return new_matches
+
+    async def _process_partition(self, city: Optional[str]) -> List[Match]:
+        await self._lock_queues(city, Gender)
+
+        # Waiting users of the partition in arrival order
+        query = (
             select(User)
-            .where(User.gender == Gender.FEMALE)
+            .where(in_partition(city))
             .where(User.status == UserStatus.WAITING)
             .order_by(User.verified_at.asc())
         )
-        female_result = await self.db.execute(female_query)
-        females = list(female_result.scalars().all())
-
-        # Match pairs in order
-        match_count = min(len(males), len(females))
+        users = (await self.db.execute(query)).scalars().all()
+        pairs, waiting = pair_partition(users)
 
-        for i in range(match_count):
-            male = males[i]
-            female = females[i]
+        new_matches = []
+        matched_ids = []
+        for male, female in pairs:
+            # The waiters were read before the write transaction (always on
+            # SQLite), so an arrival may have taken either of them since
+            if not await self._claim_pair(male.id, female.id):
+                continue
 
             # Create the match
             match = Match(
@@ -69,52 +209,186 @@ class MatchingEngine:
                 status=MatchStatus.ACTIVE,
             )
             self.db.add(match)
-
-            # Update user statuses
-            male.status = UserStatus.MATCHED
-            male.queue_rank = None
-            female.status = UserStatus.MATCHED
-            female.queue_rank = None
-
             new_matches.append(match)
+            matched_ids += [male.id, female.id]
 
-        # Update ranks for remaining users
-        remaining_males = males[match_count:]
-        remaining_females = females[match_count:]
-
-        for rank, user in enumerate(remaining_males, start=1):
-            user.queue_rank = rank
+        # Update ranks for remaining users (only rows that moved and still
+        # wait; a skipped pair is re-ranked in the next round)
+        moved = [
+            {"user_id": user.id, "rank": rank}
+            for remaining in waiting.values()
+            for rank, user in enumerate(remaining, start=1)
+            if user.queue_rank != rank
+        ]
+        if moved:
+            users_table = User.__table__
+            await self.db.execute(
+                update(users_table)
+                .where(users_table.c.id == bindparam("user_id"))
+                .where(users_table.c.status == UserStatus.WAITING)
+                .values(queue_rank=bindparam("rank")),
+                moved,
+            )
 
-        for rank, user in enumerate(remaining_females, start=1):
-            user.queue_rank = rank
+        if new_matches:
+            await self.db.flush()
+            for match in new_matches:
+                record_match_created(self.db, match)
 
         await self.db.commit()
-
+        await versions.bump(
+            *user_stamps("user", matched_ids + [row["user_id"] for row in moved]),
+            *user_stamps("inbox", matched_ids),
+        )
         return new_matches
 
-    async def get_queue_stats(self) -> dict:
-        """Get current queue statistics."""
-        # Count waiting males
-        male_count_query = (
+    async def _claim_pair(self, male_id: UUID, female_id: UUID) -> bool:
+        """
+        Mark two users MATCHED if both are still waiting, in one UPDATE.
+        Returns False (and changes nothing) if either was matched meanwhile.
+        """
+        ids = [male_id, female_id]
+        both_waiting = (
             select(func.count(User.id))
-            .where(User.gender == Gender.MALE)
+            .where(User.id.in_(ids))
+            .where(User.status == UserStatus.WAITING)
+            .scalar_subquery()
+        )
+        claimed = await self.db.execute(
+            update(User)
+            .where(User.id.in_(ids))
             .where(User.status == UserStatus.WAITING)
+            .where(both_waiting == 2)
+            .values(status=UserStatus.MATCHED, queue_rank=None)
+            .execution_options(synchronize_session=False)
         )
-        male_result = await self.db.execute(male_count_query)
-        males_waiting = male_result.scalar() or 0
+        return claimed.rowcount == 2
 
-        # Count waiting females
-        female_count_query = (
-            select(func.count(User.id))
-            .where(User.gender == Gender.FEMALE)
+    async def find_candidate(self, user: User) -> Optional[User]:
+        """
+        Earliest-verified waiter `user` can be matched with.
+
+        Seeks the (city, gender, status, verified_at) index; with an age
+        window, incompatible waiters are skipped in index order.
+        """
+        query = (
+            select(User)
+            .where(in_partition(partition_key(user)))
+            .where(User.gender == opposite_gender(user.gender))
             .where(User.status == UserStatus.WAITING)
+            .where(User.id != user.id)
+            .order_by(User.verified_at.asc())
+            .limit(1)
+        )
+        window = settings.MATCH_AGE_WINDOW_YEARS
+        if window > 0 and user.age is not None:
+            query = query.where(
+                or_(
+                    User.age.is_(None),
+                    User.age.between(user.age - window, user.age + window),
+                )
+            )
+        result = await self.db.execute(query)
+        return result.scalars().first()
+
+    async def match_arrival(self, user: User) -> Optional[Match]:
+        """
+        Match a user who just joined the queue, if anyone compatible waits.
+
+        Both users are claimed with one conditional UPDATE, so concurrent
+        arrivals cannot take the same waiter: if either was matched in the
+        meantime, the claim is rolled back and the next candidate is tried.
+        """
+        while True:
+            candidate = await self.find_candidate(user)
+            if candidate is None:
+                return None
+
+            await self._lock_queues(partition_key(user), Gender)
+            claimed = await self.db.execute(
+                update(User)
+                .where(User.id.in_([user.id, candidate.id]))
+                .where(User.status == UserStatus.WAITING)
+                .values(status=UserStatus.MATCHED)
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount == 2:
+                break
+
+            # Someone else matched us or the candidate first
+            await self.db.rollback()
+            await self.db.refresh(user)
+            if user.status != UserStatus.WAITING:
+                return None
+
+        male, female = (
+            (user, candidate) if user.gender == Gender.MALE else (candidate, user)
+        )
+        match = Match(
+            male_user_id=male.id,
+            female_user_id=female.id,
+            status=MatchStatus.ACTIVE,
         )
-        female_result = await self.db.execute(female_count_query)
-        females_waiting = female_result.scalar() or 0
+        self.db.add(match)
+        await self.db.flush()
+        record_match_created(self.db, match)
+
+        # Close the gaps the two leave in their queues: everyone ranked
+        # behind them moves up one place. Ranks are read after the claim,
+        # inside the write transaction, so they are current.
+        ranks = dict(
+            (
+                await self.db.execute(
+                    select(User.id, User.queue_rank).where(
+                        User.id.in_([user.id, candidate.id])
+                    )
+                )
+            ).all()
+        )
+        moved = []
+        for matched in (user, candidate):
+            if ranks.get(matched.id) is None:
+                continue
+            result = await self.db.execute(
+                update(User)
+                .where(in_partition(partition_key(matched)))
+                .where(User.gender == matched.gender)
+                .where(User.status == UserStatus.WAITING)
+                .where(User.queue_rank > ranks[matched.id])
+                .values(queue_rank=User.queue_rank - 1)
+                .returning(User.id)
+                .execution_options(synchronize_session=False)
+            )
+            moved += result.scalars().all()
+        await self.db.execute(
+            update(User)
+            .where(User.id.in_([user.id, candidate.id]))
+            .values(queue_rank=None)
+            .execution_options(synchronize_session=False)
+        )
+
+        await self.db.commit()
+        matches_created.inc()
+        pair = [user.id, candidate.id]
+        await versions.bump(
+            *user_stamps("user", pair + moved), *user_stamps("inbox", pair)
+        )
+        return match
+
+    async def get_queue_stats(self, user: Optional[User] = None) -> dict:
+        """Get current queue statistics (for `user`'s partition if given)."""
+        query = (
+            select(User.gender, func.count(User.id))
+            .where(User.status == UserStatus.WAITING)
+            .group_by(User.gender)
+        )
+        if user is not None:
+            query = query.where(in_partition(partition_key(user)))
+        counts = dict((await self.db.execute(query)).all())
 
         return {
-            "males_waiting": males_waiting,
-            "females_waiting": females_waiting,
+            "males_waiting": counts.get(Gender.MALE, 0),
+            "females_waiting": counts.get(Gender.FEMALE, 0),
             "last_updated": datetime.utcnow(),
         }
 
@@ -126,34 +400,73 @@ class MatchingEngine:
 
     async def add_to_queue(self, user: User) -> int:
         """
-        Add a verified user to the waiting queue.
-        Returns their assigned rank.
+        Add a verified user to the waiting queue of their partition and
+        match them right away if possible.
+        Returns their assigned rank (None if matched).
         """
-        # Get current max rank for this gender
-        max_rank_query = (
+        user.status = UserStatus.WAITING
+        user.verified_at = datetime.utcnow()
+
+        # Next rank after the last waiter of this city and gender, taken
+        # in the same UPDATE so concurrent arrivals get distinct ranks
+        await self._lock_queues(partition_key(user), [user.gender])
+        last_rank = (
             select(func.max(User.queue_rank))
+            .where(in_partition(partition_key(user)))
             .where(User.gender == user.gender)
             .where(User.status == UserStatus.WAITING)
+            .scalar_subquery()
         )
-        result = await self.db.execute(max_rank_query)
-        max_rank = result.scalar() or 0
-
-        # Assign next rank
-        new_rank = max_rank + 1
-        user.queue_rank = new_rank
-        user.status = UserStatus.WAITING
-        user.verified_at = datetime.utcnow()
+        user.queue_rank = func.coalesce(last_rank, 0) + 1
 
         await self.db.commit()
+        await versions.bump(f"user:{user.id}")
 
-        # Try to process queue (might create a match immediately)
-        await self.process_queue()
+        # Match against the partition's waiters (one index seek)
+        await self.match_arrival(user)
 
         # Return updated rank (might be None if matched)
         await self.db.refresh(user)
         return user.queue_rank
 
+    async def requeue_users(self, user_ids: List[UUID]) -> List[Match]:
+        """
+        Put matched users back at the end of the waiting queue in bulk.
+        Returns any new matches created by the following queue run.
+        """
+        if not user_ids:
+            return []
+
+        await self.db.execute(
+            update(User)
+            .where(User.id.in_(user_ids))
+            .where(User.status == UserStatus.MATCHED)
+            .values(status=UserStatus.WAITING, verified_at=datetime.utcnow())
+        )
+        await self.db.commit()
+        await versions.bump(*user_stamps("user", user_ids))
+
+        # Only the partitions the requeued users joined
+        partitions = await self.waiting_partitions(user_ids)
+        return await self.process_queue(partitions)
+
 
 async def get_matching_engine(db: AsyncSession) -> MatchingEngine:
     """Dependency for getting matching engine instance."""
     return MatchingEngine(db)
+
+
+async def _collect_metrics():
+    """Queue depth per gender (one grouped count per scrape)."""
+    async with async_session_maker() as db:
+        query = (
+            select(User.gender, func.count(User.id))
+            .where(User.status == UserStatus.WAITING)
+            .group_by(User.gender)
+        )
+        counts = dict((await db.execute(query)).all())
+    for gender in Gender:
+        queue_waiting_users.labels(gender.value).set(counts.get(gender, 0))
+
+
+registry.add_collector(_collect_metrics)
@@ -0,0 +1,294 @@
+"""
+Prometheus metrics, served as text from /metrics.
+
+Hot-path instrumentation only bumps preallocated counters: label sets are
+resolved to a child once and cached, histograms keep fixed bucket arrays,
+and nothing is formatted until scrape time. Gauges that describe current
+state (queue depth, open sockets, pool usage) are read from their owners
+by collectors registered with `registry.add_collector()` when scraped.
+"""
+
+import abc
+import time
+from bisect import bisect_left
+from typing import Awaitable, Callable, Dict, Iterable, List, Sequence, Tuple
+
+from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger("metrics")
+
+# Seconds; covers fast DB reads up to slow queue runs
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)  # fmt: skip
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class _Metric(abc.ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+
+    def labels(self, *values):
+        """Child for one label set; cache it at the call site when hot."""
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    @abc.abstractmethod
+    def _new_child(self):
+        """A child holding the values of one label set."""
+
+    def _label_dict(self, values: tuple) -> Dict[str, str]:
+        return dict(zip(self.labelnames, values))
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Sample]:
+        """Current samples of every child."""
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def samples(self):
+        for values, child in self._children.items():
+            yield self.name + "_total", self._label_dict(values), child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    type_name = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+    def samples(self):
+        for values, child in self._children.items():
+            yield self.name, self._label_dict(values), child.value
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in self._children.items():
+            labels = self._label_dict(values)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), child.counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield self.name + "_bucket", {**labels, "le": le}, cumulative
+            yield self.name + "_sum", labels, child.sum
+            yield self.name + "_count", labels, cumulative
+
+
+Collector = Callable[[], Awaitable[None]]
+
+
+class MetricsRegistry:
+    """Holds metrics and renders the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._collectors: List[Collector] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames=()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        """Register a coroutine that refreshes gauges before each scrape."""
+        self._collectors.append(collector)
+
+    async def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception:
+                logger.exception("Metrics collector failed")
+
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# Global registry
+registry = MetricsRegistry()
+
+
+# ===== Application metrics =====
+
+http_request_duration = registry.histogram(
+    "concort_http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ("method", "route", "status"),
+)
+queue_waiting_users = registry.gauge(
+    "concort_queue_waiting_users", "Users waiting in the matching queue", ("gender",)
+)
+matches_created = registry.counter(
+    "concort_matches_created", "Matches created by the matching engine"
+)
+match_shards_owned = registry.gauge(
+    "concort_match_shards_owned", "Matching shards owned by this worker"
+)
+process_queue_duration = registry.histogram(
+    "concort_process_queue_duration_seconds", "Duration of MatchingEngine.process_queue"
+)
+websocket_connections = registry.gauge(
+    "concort_websocket_connections", "Open chat WebSocket connections"
+)
+websocket_reaped = registry.counter(
+    "concort_websocket_reaped", "WebSockets closed after missing heartbeats"
+)
+websocket_rooms = registry.gauge(
+    "concort_websocket_rooms", "Match rooms with at least one open WebSocket"
+)
+broadcast_duration = registry.histogram(
+    "concort_broadcast_duration_seconds", "Fan-out latency of broadcast_to_match"
+)
+outbound_queue_depth = registry.gauge(
+    "concort_outbound_queue_depth", "Items waiting in outbound queues", ("queue",)
+)
+db_pool_connections = registry.gauge(
+    "concort_db_pool_connections",
+    "Database pool connections by engine and state",
+    ("engine", "state"),
+)
+
+
+# ===== HTTP middleware =====
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+        # (method, route, status) -> histogram child, resolved once
+        self._children: Dict[tuple, _HistogramChild] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            key = (
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                status_code,
+            )
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = http_request_duration.labels(
+                    key[0], key[1], str(key[2])
+                )
+            child.observe(time.perf_counter() - started)
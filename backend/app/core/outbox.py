@@ -0,0 +1,57 @@
+"""
+Transactional outbox.
+
+Changes that other components care about (new matches, chat messages) add
+an OutboxEvent in the same transaction as the change itself, so an event
+exists if and only if the change was committed. The outbox relay
+(app.services.outbox_relay) delivers the events to subscribers.
+"""
+
+import json
+from typing import Any, Dict
+
+from app.models.outbox import OutboxEvent
+from sqlalchemy.ext.asyncio import AsyncSession
+
+MATCH_CREATED = "match.created"
+MESSAGE_CREATED = "message.created"
+
+
+def record_event(db: AsyncSession, topic: str, key: Any, payload: Dict[str, Any]):
+    """Add an event to the session; it is written when the session commits."""
+    db.add(
+        OutboxEvent(
+            topic=topic,
+            key=str(key),
+            payload=json.dumps(payload, default=str, separators=(",", ":")),
+        )
+    )
+
+
+def record_match_created(db: AsyncSession, match) -> None:
+    """Event for a flushed Match (its id must be assigned)."""
+    record_event(
+        db,
+        MATCH_CREATED,
+        match.id,
+        {
+            "match_id": match.id,
+            "male_user_id": match.male_user_id,
+            "female_user_id": match.female_user_id,
+        },
+    )
+
+
+def record_message_created(db: AsyncSession, message) -> None:
+    """Event for a flushed Message (its id and sent_at must be assigned)."""
+    record_event(
+        db,
+        MESSAGE_CREATED,
+        message.match_id,
+        {
+            "message_id": message.id,
+            "match_id": message.match_id,
+            "sender_id": message.sender_id,
+            "sent_at": message.sent_at.isoformat(),
+        },
+    )
@@ -0,0 +1,104 @@
+"""
+User presence: online status and last seen time.
+
+WebSocket workers mark the users of their open sockets online on connect
+and on every heartbeat round, and offline on disconnect. The entries live
+in the key-value store, so presence is per process by default and shared
+by all workers when REDIS_URL is set. No database writes are involved.
+
+- presence:online:<user>     last frame time; refreshed every heartbeat
+                             round and expires unless refreshed, so crashed
+                             workers do not leave users online
+- presence:last_seen:<user>  written once when the user goes offline (socket
+                             closed or reaped); kept PRESENCE_LAST_SEEN_TTL_HOURS
+
+Users of a crashed worker get no last_seen entry; the inbox then falls back
+to users.last_active_at.
+
+Lookups for many users (the inbox) are a single MGET. Workers that do not
+share the store with the chat workers (separate `api` and `ws` roles
+without REDIS_URL) cannot see presence and report it as unknown
+(PRESENCE_SHARED overrides).
+"""
+
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from app.core.config import settings
+from app.core.kv_store import KeyValueStore, kv_store
+
+
+def presence_shared() -> bool:
+    """Whether this worker sees the presence written by chat workers."""
+    if settings.PRESENCE_SHARED is not None:
+        return settings.PRESENCE_SHARED
+    return bool(settings.REDIS_URL) or settings.APP_ROLE == "all"
+
+
+@dataclass
+class Presence:
+    online: Optional[bool] = False  # None: unknown to this worker
+    last_seen_at: Optional[datetime] = None
+
+
+class PresenceTracker:
+    """Presence entries in the key-value store."""
+
+    def __init__(self, store: Optional[KeyValueStore] = None):
+        self.store = store or kv_store
+
+    @property
+    def online_ttl(self) -> float:
+        # Two missed heartbeat rounds before a user drops offline
+        return settings.WS_PING_INTERVAL_SECONDS * 2
+
+    async def mark_online(self, last_frames: Dict[str, float]) -> None:
+        """Refresh users with open sockets; `last_frames` maps user id to
+        the wall-clock time of their last frame."""
+        if not last_frames:
+            return
+        # While online, the online entry carries the last seen time too
+        await self.store.set_many(
+            {f"presence:online:{u}": str(at) for u, at in last_frames.items()},
+            self.online_ttl,
+        )
+
+    async def mark_offline(self, user_id: str, reaped: bool = False) -> None:
+        """
+        The user's last socket in this worker closed. A reaped user was last
+        seen at the frame time of the last heartbeat round, not now.
+        """
+        online_key = f"presence:online:{user_id}"
+        seen = await self.store.get(online_key) if reaped else None
+        await self.store.set(
+            f"presence:last_seen:{user_id}",
+            seen or str(time.time()),
+            settings.PRESENCE_LAST_SEEN_TTL_HOURS * 3600,
+        )
+        await self.store.delete(online_key)
+
+    async def lookup(self, user_ids: Iterable) -> Dict[str, Presence]:
+        """Presence of many users, keyed by str(user_id)."""
+        ids = [str(user_id) for user_id in user_ids]
+        if not ids:
+            return {}
+        if not presence_shared():
+            return {user_id: Presence(online=None) for user_id in ids}
+        values = await self.store.get_many(
+            [f"presence:online:{u}" for u in ids]
+            + [f"presence:last_seen:{u}" for u in ids]
+        )
+        result = {}
+        for user_id, online, last_seen in zip(ids, values, values[len(ids) :]):
+            seen = online or last_seen
+            result[user_id] = Presence(
+                online=online is not None,
+                last_seen_at=datetime.utcfromtimestamp(float(seen)) if seen else None,
+            )
+        return result
+
+
+# Global tracker
+presence = PresenceTracker()
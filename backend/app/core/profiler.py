@@ -0,0 +1,213 @@
+"""
+Production diagnostics for the event loop.
+
+- SamplingProfiler: a background thread samples the event-loop thread's
+  Python stack every few milliseconds and aggregates the samples into
+  collapsed stacks (`frame;frame;frame count`), the input format of
+  flamegraph.pl, speedscope and inferno.
+- SlowCallbackDetector: logs every time a callback (one coroutine step)
+  blocks the loop longer than SLOW_CALLBACK_THRESHOLD_MS, with the stack
+  that was blocking - e.g. bcrypt hashing or encoding a large chat
+  history inline.
+"""
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+
+logger = get_logger("profiler")
+slow_callback_logger = get_logger("slow_callback")
+
+
+# ===== Sampling profiler =====
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread."""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format, hottest first."""
+        lines = (f"{stack} {count}" for stack, count in self.samples.most_common())
+        return "\n".join(lines) + "\n"
+
+
+_profile_lock = asyncio.Lock()
+
+
+def profile_in_progress() -> bool:
+    return _profile_lock.locked()
+
+
+async def profile_event_loop(seconds: float, interval: float = 0.005) -> str:
+    """Sample the event-loop thread for `seconds`; returns collapsed stacks."""
+    async with _profile_lock:
+        profiler = SamplingProfiler(threading.get_ident(), interval)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            # Joining takes at most one interval
+            profiler.stop()
+        return profiler.collapsed()
+
+
+async def _profile_to_file():
+    seconds = settings.PROFILER_SIGNAL_SECONDS
+    if profile_in_progress():
+        logger.warning("Profiler already running, ignoring signal")
+        return
+    collapsed = await profile_event_loop(seconds)
+
+    os.makedirs(settings.PROFILER_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(
+        settings.PROFILER_OUTPUT_DIR,
+        f"profile-{os.getpid()}-{datetime.utcnow():%Y%m%dT%H%M%S}.collapsed",
+    )
+    with open(path, "w") as f:
+        f.write(collapsed)
+    logger.info("Wrote event-loop profile", extra={"seconds": seconds, "path": path})
+
+
+def install_profile_signal_handler():
+    """`kill -USR2 <pid>` profiles that worker into PROFILER_OUTPUT_DIR."""
+    if not hasattr(signal, "SIGUSR2"):
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(
+            signal.SIGUSR2, lambda: asyncio.ensure_future(_profile_to_file())
+        )
+    except (NotImplementedError, RuntimeError):
+        pass  # Not on the main thread or not supported by this loop
+
+
+# ===== Slow-callback detector =====
+
+
+class SlowCallbackDetector:
+    """
+    Heartbeat-based loop-blocking detector that works on any event loop
+    (asyncio or uvloop).
+
+    A heartbeat task wakes every `threshold / 2`; a late wake-up means some
+    callback held the loop. A watchdog thread notices the missing beat
+    while the loop is still blocked and captures the loop thread's stack,
+    so the log names the blocking code, not just the duration.
+    """
+
+    def __init__(self, threshold_ms: Optional[float] = None):
+        if threshold_ms is None:
+            threshold_ms = settings.SLOW_CALLBACK_THRESHOLD_MS
+        self.threshold = threshold_ms / 1000
+        self.interval = self.threshold / 2
+        self._last_beat = time.monotonic()
+        self._blocked_stack: Optional[list] = None
+        self._thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def start(self):
+        """Start the heartbeat and watchdog (no-op when disabled)."""
+        if self._task is not None or self.threshold <= 0:
+            return
+        self._thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(
+            target=self._watch, name="slow-callback-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def stop(self):
+        """Stop the heartbeat and watchdog."""
+        if self._task is None:
+            return
+        self._stop.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._thread.join()
+        self._task = self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+
+            lag = now - expected
+            if lag >= self.threshold:
+                stack, self._blocked_stack = self._blocked_stack, None
+                slow_callback_logger.warning(
+                    "slow_callback",
+                    extra={"blocked_ms": round(lag * 1000, 1), "stack": stack},
+                )
+
+    def _watch(self):
+        stalled_after = self.interval + self.threshold
+        while not self._stop.wait(self.interval / 2):
+            if self._blocked_stack is not None:
+                continue
+            if time.monotonic() - self._last_beat < stalled_after:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and len(stack) < 20:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            # Innermost frame first
+            self._blocked_stack = stack
+
+
+# Global detector
+slow_callback_detector = SlowCallbackDetector()
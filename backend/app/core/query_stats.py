@@ -0,0 +1,223 @@
+"""
+Per-request SQL statement counts and a slow-query log.
+
+Engine event hooks time every statement. Statements run while a
+`track_queries()` block is active (every HTTP request via
+QueryStatsMiddleware, every WebSocket frame) are added to its counters,
+and HTTP responses report them in a `Server-Timing` header:
+
+    Server-Timing: db;dur=12.4;desc="7 queries", app;dur=30.1
+
+Streamed responses (no Content-Length, e.g. chat history) get no header:
+it goes out before the body, whose queries have not run yet. Their totals
+are logged when the body is finished instead, as `streamed_response` at
+debug level, or `slow_streamed_response` past the threshold.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are logged to the
+`concort.slow_query` logger as JSON with normalized SQL and the shape
+(types, row count) of the bound parameters, never their values.
+"""
+
+import logging
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator, Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+from sqlalchemy import event
+
+slow_query_logger = get_logger("slow_query")
+
+
+class QueryStats:
+    """Statement count and total database time for one unit of work."""
+
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration * 1000
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar(
+    "query_stats", default=None
+)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats collector of the running request or frame, if any."""
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queries(stats: Optional[QueryStats] = None) -> Iterator[QueryStats]:
+    """Collect stats for statements run inside the block (into `stats` if
+    given, e.g. to attribute work done on another task)."""
+    stats = stats if stats is not None else QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+# ===== Normalization =====
+
+_WHITESPACE = re.compile(r"\s+")
+# Repeated placeholder groups from IN lists and multi-row VALUES
+_PLACEHOLDER_LIST = re.compile(
+    r"\((?:\s*(?:\?|%s|\$\d+|:\w+)\s*,)+\s*(?:\?|%s|\$\d+|:\w+)\s*\)"
+)
+_VALUES_ROWS = re.compile(r"(VALUES\s*\(\.\.\.\))(?:\s*,\s*\(\.\.\.\))+", re.IGNORECASE)
+
+
+def normalize_sql(statement: str) -> str:
+    """Collapse whitespace and repeated placeholder lists."""
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    statement = _PLACEHOLDER_LIST.sub("(...)", statement)
+    return _VALUES_ROWS.sub(r"\1, ...", statement)
+
+
+def parameter_shape(parameters: Any, executemany: bool = False) -> Any:
+    """Type names of bound parameters (values are never logged)."""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameter_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        return {key: type(value).__name__ for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return None
+
+
+# ===== Engine hooks =====
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started_at"].pop()
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += elapsed
+
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold > 0 and elapsed * 1000 >= threshold:
+        slow_query_logger.warning(
+            "slow_query",
+            extra={
+                "duration_ms": round(elapsed * 1000, 2),
+                "statement": normalize_sql(statement),
+                "parameters": parameter_shape(parameters, executemany),
+                "dialect": conn.dialect.name,
+            },
+        )
+
+
+def log_slow_frame(stats: QueryStats, **fields):
+    """Log a WebSocket frame whose total DB time crossed the threshold."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    if threshold > 0 and stats.duration_ms >= threshold:
+        slow_query_logger.warning(
+            "slow_ws_frame",
+            extra={
+                "duration_ms": round(stats.duration_ms, 2),
+                "queries": stats.count,
+                **fields,
+            },
+        )
+
+
+def log_streamed_response(stats: QueryStats, total_ms: float, **fields):
+    """Log the DB work of a streamed response once its body is sent."""
+    threshold = settings.SLOW_QUERY_THRESHOLD_MS
+    slow = threshold > 0 and stats.duration_ms >= threshold
+    slow_query_logger.log(
+        logging.WARNING if slow else logging.DEBUG,
+        "slow_streamed_response" if slow else "streamed_response",
+        extra={
+            "duration_ms": round(stats.duration_ms, 2),
+            "queries": stats.count,
+            "total_ms": round(total_ms, 2),
+            **fields,
+        },
+    )
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection and exception_context.connection.info.get(
+        "query_started_at"
+    )
+    if started:
+        started.pop()
+
+
+def install_query_hooks(*engines):
+    """Attach timing hooks to the given async engines (once each)."""
+    for sync_engine in {e.sync_engine for e in engines}:
+        if event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+            continue
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+
+
+# ===== HTTP middleware =====
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware adding per-request DB stats as Server-Timing, or
+    logging them at the end of streamed responses."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.QUERY_STATS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        streamed = False
+        with track_queries() as stats:
+
+            async def send_with_timing(message):
+                nonlocal streamed
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    streamed = all(
+                        name.lower() != b"content-length" for name, _ in headers
+                    )
+                    if not streamed:
+                        total_ms = (time.perf_counter() - started) * 1000
+                        timing = (
+                            f"db;dur={stats.duration_ms:.1f};"
+                            f'desc="{stats.count} queries", app;dur={total_ms:.1f}'
+                        )
+                        message["headers"] = headers + [
+                            (b"server-timing", timing.encode())
+                        ]
+                elif (
+                    message["type"] == "http.response.body"
+                    and streamed
+                    and not message.get("more_body", False)
+                ):
+                    log_streamed_response(
+                        stats,
+                        (time.perf_counter() - started) * 1000,
+                        path=scope["path"],
+                    )
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
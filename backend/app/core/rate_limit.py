@@ -0,0 +1,156 @@
+"""
+Rate limiting for auth, chat and WebSocket traffic.
+
+HTTP limits use sliding window counters (the current fixed window plus a
+weighted share of the previous one) keyed by IP, phone number or user id.
+Counters live in-process by default, or in Redis when
+RATE_LIMIT_USE_REDIS is set so all workers share them.
+
+WebSocket frames are limited per connection with an in-process token
+bucket, which costs no I/O per frame.
+"""
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.kv_store import KeyValueStore, MemoryStore, kv_store
+from starlette import status
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """Allow `limit` requests per `window` seconds per identity."""
+
+    name: str
+    limit: int
+    window: float
+
+
+POLICIES: Dict[str, RateLimitPolicy] = {
+    policy.name: policy
+    for policy in (
+        # Any auth endpoint, per client IP
+        RateLimitPolicy("auth_ip", limit=30, window=60),
+        # OTP sends (register / resend), per phone number
+        RateLimitPolicy("otp_send_phone", limit=5, window=60),
+        # OTP verification attempts, per phone number
+        RateLimitPolicy("otp_verify_phone", limit=10, window=60),
+        # REST chat writes, per user
+        RateLimitPolicy("chat_user", limit=60, window=60),
+    )
+}
+
+# Path prefix -> IP-keyed policy, applied by RateLimitMiddleware
+ROUTE_POLICIES = (("/api/v1/auth/", "auth_ip"),)
+
+
+class RateLimiter:
+    """Sliding window counter limiter on top of a KeyValueStore."""
+
+    def __init__(self, store: KeyValueStore):
+        self.store = store
+
+    async def hit(self, policy: RateLimitPolicy, identity: str) -> Optional[float]:
+        """
+        Count one request. Returns None if allowed, otherwise the number
+        of seconds to wait before retrying.
+        """
+        now = time.time()
+        window_index = int(now // policy.window)
+        elapsed = (now % policy.window) / policy.window
+        prefix = f"rl:{policy.name}:{identity}"
+
+        current = await self.store.incr(
+            f"{prefix}:{window_index}", ttl=policy.window * 2
+        )
+        previous = await self.store.get(f"{prefix}:{window_index - 1}")
+        estimated = int(previous or 0) * (1 - elapsed) + current
+
+        if estimated <= policy.limit:
+            return None
+        return policy.window * (1 - elapsed)
+
+    async def check(self, policy_name: str, identity: str) -> None:
+        """Count one request and raise 429 if the policy is exceeded."""
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        retry_after = await self.hit(POLICIES[policy_name], identity)
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests. Please slow down.",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying IP-keyed policies by path prefix."""
+
+    def __init__(self, app, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        for prefix, policy_name in ROUTE_POLICIES:
+            if path.startswith(prefix):
+                client = scope.get("client")
+                identity = client[0] if client else "unknown"
+                limiter = self.limiter or rate_limiter
+                retry_after = await limiter.hit(POLICIES[policy_name], identity)
+                if retry_after is not None:
+                    response = JSONResponse(
+                        {"detail": "Too many requests. Please slow down."},
+                        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                        headers={"Retry-After": str(math.ceil(retry_after))},
+                    )
+                    await response(scope, receive, send)
+                    return
+                break
+
+        await self.app(scope, receive, send)
+
+
+class TokenBucket:
+    """Per-connection token bucket: `rate` tokens per second, up to `burst`."""
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = time.monotonic()
+
+    def allow(self) -> bool:
+        """Take one token if available."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def new_ws_frame_bucket() -> TokenBucket:
+    """Token bucket for one WebSocket connection's incoming frames."""
+    return TokenBucket(
+        rate=settings.WS_FRAME_RATE_PER_SECOND, burst=settings.WS_FRAME_BURST
+    )
+
+
+# Global limiter
+rate_limiter = RateLimiter(
+    kv_store if settings.RATE_LIMIT_USE_REDIS and settings.REDIS_URL else MemoryStore()
+)
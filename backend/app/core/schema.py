@@ -0,0 +1,97 @@
+"""
+Schema fingerprint check.
+
+Tables are created and changed by Alembic migrations (`alembic upgrade head`),
+run once per deploy rather than by every worker. After upgrading to head,
+the migration step stores a fingerprint of the models in `schema_info`.
+Workers compare that single row against the fingerprint of the models they
+were built with, instead of reflecting every table at startup.
+"""
+
+import hashlib
+from datetime import datetime
+
+import app.models  # noqa: F401 - registers every table on Base.metadata
+from app.core.config import settings
+from app.core.database import Base, engine
+from sqlalchemy import Column, DateTime, Integer, String, Table, inspect, select
+
+schema_info = Table(
+    "schema_info",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("revision", String(32), nullable=True),
+    Column("fingerprint", String(64), nullable=False),
+    Column("migrated_at", DateTime, default=datetime.utcnow),
+)
+
+
+class SchemaMismatchError(RuntimeError):
+    """The database schema does not match the models of this build."""
+
+
+def schema_fingerprint(metadata=Base.metadata) -> str:
+    """SHA-256 over tables, columns, keys and indexes of the models."""
+    lines = []
+    for table in sorted(metadata.tables.values(), key=lambda t: t.name):
+        lines.append(f"table {table.name}")
+        for column in table.columns:
+            lines.append(
+                f"column {column.name} {column.type!r} "
+                f"nullable={column.nullable} pk={column.primary_key}"
+            )
+            for fk in sorted(fk.target_fullname for fk in column.foreign_keys):
+                lines.append(f"fk {column.name} -> {fk}")
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            columns = ",".join(c.name for c in index.columns)
+            lines.append(f"index {index.name} ({columns}) unique={index.unique}")
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+def record_schema_fingerprint(connection, revision: str):
+    """Store the models' fingerprint; called by the migration step at head."""
+    # Databases adopted with `alembic stamp` predate the table
+    schema_info.create(connection, checkfirst=True)
+    connection.execute(schema_info.delete())
+    connection.execute(
+        schema_info.insert().values(
+            id=1, revision=revision, fingerprint=schema_fingerprint()
+        )
+    )
+
+
+def clear_schema_fingerprint(connection):
+    """Forget the fingerprint, e.g. after a downgrade below head."""
+    if inspect(connection).has_table("schema_info"):
+        connection.execute(schema_info.delete())
+
+
+async def check_schema():
+    """
+    Fail fast unless the database was migrated for this build's models.
+
+    One primary-key lookup; no catalog reflection.
+    """
+    if not settings.SCHEMA_CHECK_ENABLED:
+        return
+
+    expected = schema_fingerprint()
+    try:
+        async with engine.connect() as conn:
+            result = await conn.execute(
+                select(schema_info.c.fingerprint, schema_info.c.revision).where(
+                    schema_info.c.id == 1
+                )
+            )
+            row = result.first()
+    except Exception as exc:
+        raise SchemaMismatchError(
+            "Database schema is missing; run `alembic upgrade head` first"
+        ) from exc
+
+    if row is None or row.fingerprint != expected:
+        found = row.revision if row is not None else "none"
+        raise SchemaMismatchError(
+            f"Database schema (revision {found}) does not match the models; "
+            "run `alembic upgrade head` or deploy the matching build"
+        )
@@ -1,28 +1,209 @@
+import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Any, Optional
+from typing import Any, Dict, Optional
 
 from app.core.config import settings
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+try:
+    # PyJWT is noticeably faster than python-jose; use it when installed
+    import jwt as pyjwt
+    from jwt import InvalidTokenError as PyJWTError
+
+    jose_jwt = None
+    JWTError = PyJWTError
+except ImportError:  # pragma: no cover
+    from jose import JWTError
+    from jose import jwt as jose_jwt
+
+    pyjwt = None
+    PyJWTError = JWTError
+
+# Password hashing (passlib/bcrypt are imported on first use)
+_pwd_context = None
+
+
+def _get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """Generate password hash."""
-    return pwd_context.hash(password)
+    return _get_pwd_context().hash(password)
+
+
+# ===== JWT signing backends =====
+
+
+class InvalidToken(Exception):
+    """Token failed signature, format or expiry checks."""
+
+
+def _jwt_encode(claims: dict, key: Any, algorithm: str, headers: dict = None) -> str:
+    if pyjwt is not None:
+        return pyjwt.encode(claims, key, algorithm=algorithm, headers=headers)
+    return jose_jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+
+def _jwt_decode(token: str, key: Any, algorithm: str) -> dict:
+    try:
+        if pyjwt is not None:
+            return pyjwt.decode(token, key, algorithms=[algorithm])
+        return jose_jwt.decode(token, key, algorithms=[algorithm])
+    except (JWTError, PyJWTError) as e:
+        raise InvalidToken(str(e))
+
+
+def _jwt_header(token: str) -> dict:
+    try:
+        if pyjwt is not None:
+            return pyjwt.get_unverified_header(token)
+        return jose_jwt.get_unverified_header(token)
+    except (JWTError, PyJWTError) as e:
+        raise InvalidToken(str(e))
+
+
+class HmacSigner:
+    """Shared-secret signing (HS256 and friends)."""
+
+    def __init__(self, secret: str, algorithm: str):
+        self.secret = secret
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return _jwt_encode(claims, self.secret, self.algorithm)
+
+    def decode(self, token: str) -> dict:
+        return _jwt_decode(token, self.secret, self.algorithm)
+
+
+class KeySetSigner:
+    """
+    Asymmetric signing (RS256 / ES256 / EdDSA) with key ids.
+
+    Tokens are signed with the active key and carry its `kid` header.
+    Any key in the set verifies, so keys can be rotated by adding a new
+    key, switching JWT_ACTIVE_KID, and removing the old key once all
+    tokens signed with it have expired.
+    """
+
+    def __init__(
+        self,
+        algorithm: str,
+        active_kid: str,
+        private_key: str,
+        public_keys: Dict[str, str],
+    ):
+        self.algorithm = algorithm
+        self.active_kid = active_kid
+        self.private_key = private_key
+        self.public_keys = public_keys
+
+    @classmethod
+    def from_directory(cls, algorithm: str, path: str, active_kid: str):
+        """
+        Load keys from `path`: `<kid>.pub.pem` for every verification key,
+        and `<active_kid>.pem` for the signing key.
+        """
+        public_keys = {}
+        for name in os.listdir(path):
+            if name.endswith(".pub.pem"):
+                with open(os.path.join(path, name)) as f:
+                    public_keys[name[: -len(".pub.pem")]] = f.read()
+
+        with open(os.path.join(path, f"{active_kid}.pem")) as f:
+            private_key = f.read()
+
+        if active_kid not in public_keys:
+            raise ValueError(f"Missing public key for active kid {active_kid}")
+
+        return cls(algorithm, active_kid, private_key, public_keys)
+
+    def encode(self, claims: dict) -> str:
+        return _jwt_encode(
+            claims, self.private_key, self.algorithm, headers={"kid": self.active_kid}
+        )
+
+    def decode(self, token: str) -> dict:
+        kid = _jwt_header(token).get("kid")
+        key = self.public_keys.get(kid)
+        if key is None:
+            raise InvalidToken(f"Unknown key id: {kid}")
+        return _jwt_decode(token, key, self.algorithm)
+
+
+def create_signer():
+    """Build the signer selected by ALGORITHM / JWT_KEYS_DIR."""
+    if settings.ALGORITHM.startswith("HS"):
+        return HmacSigner(settings.SECRET_KEY, settings.ALGORITHM)
+
+    if not (settings.JWT_KEYS_DIR and settings.JWT_ACTIVE_KID):
+        raise ValueError(
+            f"{settings.ALGORITHM} requires JWT_KEYS_DIR and JWT_ACTIVE_KID"
+        )
+    return KeySetSigner.from_directory(
+        settings.ALGORITHM, settings.JWT_KEYS_DIR, settings.JWT_ACTIVE_KID
+    )
+
+
+signer = create_signer()
+
+
+# ===== Verified token cache =====
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token claims, valid until each token's exp."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def get(self, token: str) -> Optional[dict]:
+        claims = self._entries.get(token)
+        if claims is None:
+            return None
+        if claims["exp"] <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return claims
+
+    def put(self, token: str, claims: dict):
+        if self.max_size <= 0 or "exp" not in claims:
+            return
+        self._entries[token] = claims
+        self._entries.move_to_end(token)
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+token_cache = VerifiedTokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+# ===== Access tokens =====
 
 
 def create_access_token(
-    subject: str | Any, expires_delta: Optional[timedelta] = None
+    subject: str | Any,
+    expires_delta: Optional[timedelta] = None,
+    session_id: Optional[str] = None,
 ) -> str:
-    """Create JWT access token."""
+    """Create JWT access token. `session_id` ties it to a revocable session."""
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
@@ -31,18 +212,29 @@ def create_access_token(
         )
 
     to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(
-        to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM
-    )
-    return encoded_jwt
+    if session_id is not None:
+        to_encode["sid"] = str(session_id)
+    return signer.encode(to_encode)
+
+
+def decode_token_claims(token: str) -> Optional[dict]:
+    """Verify a JWT and return its claims, or None if invalid or expired."""
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    try:
+        claims = signer.decode(token)
+    except InvalidToken:
+        return None
+
+    token_cache.put(token, claims)
+    return claims
 
 
 def decode_token(token: str) -> Optional[str]:
     """Decode and validate JWT token. Returns subject (user_id) or None."""
-    try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
-        )
-        return payload.get("sub")
-    except JWTError:
+    claims = decode_token_claims(token)
+    if claims is None:
         return None
+    return claims.get("sub")
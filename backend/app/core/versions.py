@@ -0,0 +1,123 @@
+"""
+Version stamps for conditional GETs (ETag / If-None-Match).
+
+Polled resources are described by version stamps in the key-value store:
+
+- user:<user>    GET /users/me (profile, status, queue rank)
+- inbox:<user>   GET /matches (matches, last messages, unread counts,
+                 partner profiles and presence)
+- chat:<match>   GET /chat/<match>/messages
+
+A stamp is a random token that writers replace after committing a change
+(`versions.bump`). The GET handlers read the stamps before anything else:
+when the ETag derived from them matches If-None-Match, they answer 304
+without touching the database. Stamps are read (and missing ones created)
+before the query, so a change committed during the query always replaces
+a stamp the client was sent.
+
+ETags are keyed with SECRET_KEY and bound to the requesting user and URL,
+so they reveal nothing and cannot be replayed by other users. Stamps must
+be shared by every process that writes or serves these resources, so
+conditional GETs are on by default only when REDIS_URL is set
+(ETAG_ENABLED overrides, e.g. for a single-process deployment).
+"""
+
+import hashlib
+import secrets
+from typing import Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.core.kv_store import KeyValueStore, kv_store
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def etags_enabled() -> bool:
+    """Whether GET handlers answer If-None-Match."""
+    if settings.ETAG_ENABLED is not None:
+        return settings.ETAG_ENABLED
+    return bool(settings.REDIS_URL)
+
+
+class VersionStamps:
+    """Version stamps in the key-value store."""
+
+    def __init__(self, store: Optional[KeyValueStore] = None):
+        self.store = store or kv_store
+
+    @property
+    def ttl(self) -> float:
+        return settings.ETAG_STAMP_TTL_HOURS * 3600
+
+    async def bump(self, *names: str) -> None:
+        """Replace the stamps of changed resources (call after commit)."""
+        if not names or not etags_enabled():
+            return
+        await self.store.set_many(
+            {f"version:{name}": secrets.token_hex(8) for name in names}, self.ttl
+        )
+
+    async def read(self, names: List[str]) -> List[str]:
+        """Current stamps of `names` (one round trip), creating missing ones."""
+        keys = [f"version:{name}" for name in names]
+        values = await self.store.get_many(keys)
+        missing = {
+            key: secrets.token_hex(8)
+            for key, value in zip(keys, values)
+            if value is None
+        }
+        if missing:
+            await self.store.set_many(missing, self.ttl)
+        return [value or missing[key] for key, value in zip(keys, values)]
+
+
+# Global stamps
+versions = VersionStamps()
+
+
+def user_stamps(kind: str, user_ids: Iterable) -> List[str]:
+    """Stamp names of one kind ("user" or "inbox") for many users."""
+    return [f"{kind}:{user_id}" for user_id in user_ids]
+
+
+def _etag(request: Request, viewer, stamps: List[str]) -> str:
+    digest = hashlib.blake2b(
+        "|".join([str(viewer), request.url.path, request.url.query, *stamps]).encode(),
+        key=settings.SECRET_KEY.encode()[:64],
+        digest_size=12,
+    )
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    # Weak comparison; "*" is not answered (it needs the row to exist)
+    if not if_none_match:
+        return False
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag[2:] in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def set_etag(response: Response, etag: Optional[str]) -> None:
+    """Attach the ETag of a full response (no-op when disabled)."""
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "private, no-cache"
+
+
+async def conditional_get(
+    request: Request, viewer, names: List[str]
+) -> Tuple[Optional[str], Optional[Response]]:
+    """
+    ETag of the resource described by the stamps `names`, as seen by
+    `viewer`, and a 304 response if the client's copy is current.
+    Returns (None, None) when conditional GETs are off.
+    """
+    if not etags_enabled():
+        return None, None
+
+    etag = _etag(request, viewer, await versions.read(names))
+    if _matches(request.headers.get("if-none-match"), etag):
+        not_modified = Response(status_code=304)
+        set_etag(not_modified, etag)
+        return etag, not_modified
+    return etag, None
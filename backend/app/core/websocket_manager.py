@@ -3,9 +3,23 @@ WebSocket Chat Handler for Real-time Messaging
 Zero cost - built into FastAPI!
 """
 
-from typing import Dict, List
+import asyncio
+import logging
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
 
-from fastapi import WebSocket
+from app.core.log import get_logger, log_sampled
+from app.core.metrics import (
+    broadcast_duration,
+    registry,
+    websocket_connections,
+    websocket_rooms,
+)
+from starlette.websockets import WebSocket
+
+logger = get_logger("websocket")
 
 
 class ConnectionManager:
@@ -16,6 +30,16 @@ class ConnectionManager:
         self.active_connections: Dict[str, List[WebSocket]] = {}
         # userId -> WebSocket (for direct notifications)
         self.user_connections: Dict[str, WebSocket] = {}
+        # WebSocket -> (matchId, userId), and time of its last frame
+        self._sockets: Dict[WebSocket, Tuple[str, str]] = {}
+        self._last_frame: Dict[WebSocket, float] = {}
+        # userId -> number of open sockets in this process
+        self._user_sockets: Dict[str, int] = {}
+        # Drain mode: refuse new sockets, let in-flight frames finish
+        self.draining = False
+        self._frames_in_flight = 0
+        self._idle = asyncio.Event()
+        self._idle.set()
 
     async def connect(self, websocket: WebSocket, match_id: str, user_id: str):
         """Accept and register a new WebSocket connection."""
@@ -28,8 +52,13 @@ class ConnectionManager:
 
         # Register user connection
         self.user_connections[user_id] = websocket
+        self._sockets[websocket] = (match_id, user_id)
+        self._last_frame[websocket] = time.monotonic()
+        self._user_sockets[user_id] = self._user_sockets.get(user_id, 0) + 1
 
-        print(f"User {user_id} connected to match {match_id}")
+        log_sampled(
+            logger, logging.INFO, "ws_connect", user_id=user_id, match_id=match_id
+        )
 
     def disconnect(self, websocket: WebSocket, match_id: str, user_id: str):
         """Remove a WebSocket connection."""
@@ -39,10 +68,25 @@ class ConnectionManager:
             if not self.active_connections[match_id]:
                 del self.active_connections[match_id]
 
-        if user_id in self.user_connections:
+        # Idempotent: the endpoint and the heartbeat may both disconnect
+        if self._sockets.pop(websocket, None) is not None:
+            del self._last_frame[websocket]
+            self._user_sockets[user_id] -= 1
+            if not self._user_sockets[user_id]:
+                del self._user_sockets[user_id]
+
+        if self.user_connections.get(user_id) is websocket:
             del self.user_connections[user_id]
+            # Notify through another open socket of the user, if any
+            if user_id in self._user_sockets:
+                for other, (_, other_user) in self._sockets.items():
+                    if other_user == user_id:
+                        self.user_connections[user_id] = other
+                        break
 
-        print(f"User {user_id} disconnected from match {match_id}")
+        log_sampled(
+            logger, logging.INFO, "ws_disconnect", user_id=user_id, match_id=match_id
+        )
 
     async def send_personal_message(self, message: dict, websocket: WebSocket):
         """Send message to a specific connection."""
@@ -53,12 +97,14 @@ class ConnectionManager:
     ):
         """Broadcast message to all users in a match."""
         if match_id in self.active_connections:
+            started = time.perf_counter()
             for connection in self.active_connections[match_id]:
                 if connection != exclude:
                     try:
                         await connection.send_json(message)
                     except:
                         pass
+            broadcast_duration.observe(time.perf_counter() - started)
 
     async def notify_user(self, user_id: str, message: dict):
         """Send notification to a specific user."""
@@ -68,6 +114,126 @@ class ConnectionManager:
             except:
                 pass
 
+    def is_user_connected(self, user_id: str) -> bool:
+        """Whether the user has any open socket in this process."""
+        return user_id in self._user_sockets
+
+    # ===== Heartbeat =====
+
+    def touch(self, websocket: WebSocket):
+        """Record a frame from `websocket`; any frame proves it is alive."""
+        if websocket in self._last_frame:
+            self._last_frame[websocket] = time.monotonic()
+
+    def last_frames_by_user(self) -> Dict[str, float]:
+        """Wall-clock time of each connected user's latest frame."""
+        offset = time.time() - time.monotonic()
+        latest: Dict[str, float] = {}
+        for websocket, last in self._last_frame.items():
+            user_id = self._sockets[websocket][1]
+            latest[user_id] = max(latest.get(user_id, 0.0), last + offset)
+        return latest
+
+    async def heartbeat(self, timeout: float, send_timeout: float) -> List[str]:
+        """
+        Ping every socket heard from within `timeout` seconds; close and
+        evict the others (half-open connections never send anything).
+        Returns the user ids of the evicted sockets.
+        """
+        now = time.monotonic()
+        alive, dead = [], []
+        for websocket, last in self._last_frame.items():
+            (dead if now - last > timeout else alive).append(websocket)
+
+        evicted = []
+        for websocket in dead:
+            match_id, user_id = self._sockets[websocket]
+            self.disconnect(websocket, match_id, user_id)
+            evicted.append(user_id)
+
+        async def ping(websocket: WebSocket):
+            try:
+                await websocket.send_json({"type": "ping"})
+            except Exception:
+                pass  # The receive loop sees the disconnect
+
+        async def close(websocket: WebSocket):
+            try:
+                await websocket.close(code=4008, reason="Heartbeat timeout")
+            except Exception:
+                pass  # Already gone
+
+        sends = [ping(websocket) for websocket in alive]
+        sends += [close(websocket) for websocket in dead]
+        if sends:
+            try:
+                await asyncio.wait_for(asyncio.gather(*sends), send_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out sending WebSocket heartbeats")
+        return evicted
+
+    # ===== Drain =====
+
+    @contextmanager
+    def handling_frame(self):
+        """Mark a received frame as in flight until its handler finishes."""
+        self._frames_in_flight += 1
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self._frames_in_flight -= 1
+            if self._frames_in_flight == 0:
+                self._idle.set()
+
+    def start_draining(self):
+        """Refuse new connections from now on."""
+        self.draining = True
+
+    async def wait_until_idle(self, timeout: float) -> bool:
+        """Wait for in-flight frames (and their writes) to finish."""
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def close_all(self, reconnect_spread: float, timeout: float) -> int:
+        """
+        Tell every client when to reconnect (uniformly jittered over
+        `reconnect_spread` seconds) and close its socket with 1012.
+        Returns the number of sockets closed.
+        """
+        sockets = [
+            websocket for room in self.active_connections.values() for websocket in room
+        ]
+
+        async def close(websocket: WebSocket):
+            after_ms = int(random.uniform(0, reconnect_spread) * 1000)
+            try:
+                await websocket.send_json({"type": "reconnect", "after_ms": after_ms})
+                await websocket.close(code=1012, reason="Server restarting")
+            except Exception:
+                pass  # Already gone
+
+        if sockets:
+            try:
+                await asyncio.wait_for(
+                    asyncio.gather(*(close(websocket) for websocket in sockets)),
+                    timeout,
+                )
+            except asyncio.TimeoutError:
+                logger.warning("Timed out closing WebSockets during drain")
+        return len(sockets)
+
+    async def collect_metrics(self):
+        """Refresh connection gauges (called on scrape)."""
+        websocket_connections.set(
+            sum(len(sockets) for sockets in self.active_connections.values())
+        )
+        websocket_rooms.set(len(self.active_connections))
+
 
 # Global connection manager
 manager = ConnectionManager()
+registry.add_collector(manager.collect_metrics)
@@ -0,0 +1,125 @@
+"""
+Single-writer queue for SQLite production mode.
+
+SQLite allows one writer at a time. Instead of letting every request race
+for the write lock (and fail with "database is locked"), write jobs are
+queued and applied by one background task on the dedicated writer
+connection. Jobs that arrive close together share a transaction, so one
+fsync covers the whole batch.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from app.core.query_stats import current_query_stats, track_queries
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+WriteJob = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class SQLiteWriteQueue:
+    """Applies queued write jobs in batched transactions from one task."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        max_batch: int = 64,
+        batch_window: float = 0.005,
+    ):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.batch_window = batch_window
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the writer task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Flush pending jobs and stop the writer task."""
+        if self._task is not None:
+            await self._queue.put(None)
+            await self._task
+            self._task = None
+
+    def qsize(self) -> int:
+        """Jobs waiting for the writer."""
+        return self._queue.qsize()
+
+    async def submit(self, job: WriteJob) -> Any:
+        """
+        Queue a write job and wait for its batch to commit.
+
+        The job receives a session bound to the writer connection and must
+        not commit itself. Its return value is handed back once committed.
+        """
+        if self._task is None:
+            # Writer not running (e.g. during startup) - apply directly
+            async with self.session_factory() as session:
+                result = await job(session)
+                await session.commit()
+                return result
+
+        future = asyncio.get_running_loop().create_future()
+        # Keep the submitter's query stats so the job's statements count there
+        await self._queue.put((job, future, current_query_stats()))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = loop.time() + self.batch_window
+
+            # Collect whatever else arrives within the batch window
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                try:
+                    if timeout <= 0:
+                        item = self._queue.get_nowait()
+                    else:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._apply(batch)
+
+    async def _apply(self, batch: List[Tuple[WriteJob, asyncio.Future, Any]]):
+        """Run a batch of jobs in one transaction, one savepoint per job."""
+        outcomes = []
+
+        async with self.session_factory() as session:
+            for job, future, stats in batch:
+                try:
+                    with track_queries(stats):
+                        async with session.begin_nested():
+                            result = await job(session)
+                    outcomes.append((future, result, None))
+                except Exception as e:
+                    outcomes.append((future, None, e))
+
+            try:
+                await session.commit()
+            except Exception as e:
+                await session.rollback()
+                outcomes = [(future, None, e) for future, _, _ in outcomes]
+
+        for future, result, error in outcomes:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
@@ -0,0 +1,230 @@
+"""
+Application factories per worker role.
+
+- api: REST endpoints under /api/v1
+- ws: chat WebSockets
+- matcher: background jobs (match shards, match sweeper, message archiver,
+  outbox relay)
+- all: everything in one process (local development)
+
+Each role imports only the subsystems it serves, so a WebSocket-only
+worker never loads the auth stack (passlib, SMS/httpx, OTP) and a matcher
+never loads FastAPI at all (it serves /health and /metrics from a plain
+Starlette app). Subsystem imports therefore live inside the factory
+functions; keep them there.
+
+    uvicorn app.main:app                        # role from APP_ROLE
+    uvicorn --factory app.factory:create_ws_app
+"""
+
+from contextlib import asynccontextmanager
+from typing import List, Optional
+
+from starlette.applications import Starlette
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+
+from app.core.config import settings
+from app.core.database import start_write_queue, stop_write_queue
+from app.core.log import (
+    RequestIdMiddleware,
+    get_logger,
+    setup_logging,
+    shutdown_logging,
+)
+from app.core.metrics import MetricsMiddleware, registry
+from app.core.profiler import install_profile_signal_handler, slow_callback_detector
+from app.core.query_stats import QueryStatsMiddleware
+from app.core.rate_limit import RateLimitMiddleware
+from app.core.schema import check_schema
+from app.core.websocket_manager import manager
+from app.services.message_archive import ensure_message_partitions
+
+ROLES = ("all", "api", "ws", "matcher")
+
+logger = get_logger("app")
+
+
+def _make_lifespan(role: str, services: List, drain: bool):
+    """Start `services` in order after the shared startup; stop in reverse."""
+
+    @asynccontextmanager
+    async def lifespan(app: Starlette):
+        # Startup (logging again after a previous lifespan shut it down)
+        setup_logging()
+        logger.info("Starting Concort Backend", extra={"role": role})
+        await slow_callback_detector.start()
+        install_profile_signal_handler()
+        await check_schema()
+        await ensure_message_partitions()
+        await start_write_queue()
+        for service in services:
+            await service.start()
+        if drain:
+            from app.services.drain import drainer
+
+            drainer.install_signal_handler()
+        yield
+        # Shutdown
+        logger.info("Shutting down Concort Backend", extra={"role": role})
+        if drain:
+            await drainer.drain()
+        for service in reversed(services):
+            await service.stop()
+        await stop_write_queue()
+        await slow_callback_detector.stop()
+        shutdown_logging()
+
+    return lifespan
+
+
+def create_app(role: Optional[str] = None) -> Starlette:
+    """Build the app for one worker role (default: APP_ROLE)."""
+    role = role or settings.APP_ROLE
+    if role not in ROLES:
+        raise ValueError(f"Unknown APP_ROLE {role!r}, expected one of {ROLES}")
+
+    setup_logging()
+    serves_api = role in ("all", "api")
+    serves_ws = role in ("all", "ws")
+    runs_jobs = role in ("all", "matcher")
+
+    # Background services of this role, in startup order
+    services = []
+    if serves_api or serves_ws:
+        from app.services.activity import activity
+        from app.services.sessions import revocation_list
+
+        services += [revocation_list, activity]
+    if serves_api:
+        from app.services.sms import sms_outbox
+
+        services.append(sms_outbox)
+    if serves_ws:
+        from app.services.heartbeat import heartbeat
+
+        services.append(heartbeat)
+    if runs_jobs:
+        from app.services.match_shards import match_shard_worker
+        from app.services.match_sweeper import match_sweeper
+        from app.services.message_archive import message_archiver
+        from app.services.outbox_relay import outbox_relay
+
+        services += [outbox_relay, message_archiver, match_shard_worker, match_sweeper]
+
+    lifespan = _make_lifespan(role, services, drain=serves_ws)
+    if serves_api or serves_ws:
+        from fastapi import FastAPI
+
+        app = FastAPI(
+            title=settings.APP_NAME,
+            description="A dating platform built on fairness, patience, and real connections. No swipes. No chaos. Just your turn.",
+            version=settings.APP_VERSION,
+            lifespan=lifespan,
+            docs_url="/docs" if serves_api else None,
+            redoc_url="/redoc" if serves_api else None,
+            openapi_url="/openapi.json" if serves_api else None,
+        )
+    else:
+        # Only health and metrics: skip FastAPI's import cost
+        app = Starlette(lifespan=lifespan)
+    app.state.role = role
+
+    # CORS middleware - allow mobile app to connect
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # In production, restrict to specific origins
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Negotiated gzip/brotli for large API responses (streams included)
+    if serves_api and settings.COMPRESSION_ENABLED:
+        from app.core.compression import CompressionMiddleware
+
+        app.add_middleware(CompressionMiddleware)
+
+    # Rate limiting for auth endpoints (per client IP)
+    app.add_middleware(RateLimitMiddleware)
+
+    # Statement counts and DB time per request (Server-Timing header)
+    app.add_middleware(QueryStatsMiddleware)
+
+    # Request latency per route (Prometheus)
+    app.add_middleware(MetricsMiddleware)
+
+    # Correlation id per request (X-Request-ID), outermost so every log has it
+    app.add_middleware(RequestIdMiddleware)
+
+    if serves_api:
+        from app.api.v1.api import api_router
+
+        app.include_router(api_router, prefix="/api/v1")
+
+    if serves_ws:
+        # WebSocket router (no prefix for cleaner URLs)
+        from app.api.v1.endpoints.websocket import router as ws_router
+
+        app.include_router(ws_router)
+
+    app.add_route("/", root, include_in_schema=False)
+    app.add_route("/health", health_check, include_in_schema=False)
+    app.add_route("/metrics", metrics, include_in_schema=False)
+    return app
+
+
+def create_api_app() -> Starlette:
+    return create_app("api")
+
+
+def create_ws_app() -> Starlette:
+    return create_app("ws")
+
+
+def create_matcher_app() -> Starlette:
+    return create_app("matcher")
+
+
+# ===== Endpoints served by every role =====
+
+
+async def root(request: Request):
+    """Root endpoint - API info."""
+    return JSONResponse(
+        {
+            "name": settings.APP_NAME,
+            "version": settings.APP_VERSION,
+            "description": "A dating platform built on fairness, patience, and real connections.",
+            "role": request.app.state.role,
+            "docs": "/docs",
+            "health": "/health",
+        }
+    )
+
+
+async def health_check(request: Request):
+    """Health check endpoint (503 while draining for shutdown)."""
+    if manager.draining:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "draining", "version": settings.APP_VERSION},
+        )
+    return JSONResponse(
+        {
+            "status": "healthy",
+            "version": settings.APP_VERSION,
+            "role": request.app.state.role,
+            "dev_mode": settings.DEV_MODE,
+        }
+    )
+
+
+async def metrics(request: Request):
+    """Prometheus metrics in the text exposition format."""
+    if not settings.METRICS_ENABLED:
+        return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    return PlainTextResponse(
+        await registry.render(), media_type="text/plain; version=0.0.4"
+    )
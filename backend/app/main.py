@@ -1,76 +1,10 @@
 """
 Concort Backend - A dating platform built on fairness and real connections.
 
-Main FastAPI application entry point.
+Main FastAPI application entry point. Serves the role in APP_ROLE (all
+subsystems by default); see app.factory for per-role factories.
 """
 
-from contextlib import asynccontextmanager
+from app.factory import create_app
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-
-from app.api.v1.api import api_router
-from app.api.v1.endpoints.websocket import router as ws_router
-from app.core.config import settings
-from app.core.database import create_tables
-
-
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Application lifespan events."""
-    # Startup
-    print("🚀 Starting Concort Backend...")
-    await create_tables()
-    print("✅ Database tables created")
-    yield
-    # Shutdown
-    print("👋 Shutting down Concort Backend...")
-
-
-# Create FastAPI app
-app = FastAPI(
-    title=settings.APP_NAME,
-    description="A dating platform built on fairness, patience, and real connections. No swipes. No chaos. Just your turn.",
-    version=settings.APP_VERSION,
-    lifespan=lifespan,
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json",
-)
-
-# CORS middleware - allow mobile app to connect
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, restrict to specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Include API router
-app.include_router(api_router, prefix="/api/v1")
-
-# Include WebSocket router (no prefix for cleaner URLs)
-app.include_router(ws_router)
-
-
-@app.get("/")
-async def root():
-    """Root endpoint - API info."""
-    return {
-        "name": settings.APP_NAME,
-        "version": settings.APP_VERSION,
-        "description": "A dating platform built on fairness, patience, and real connections.",
-        "docs": "/docs",
-        "health": "/health",
-    }
-
-
-@app.get("/health")
-async def health_check():
-    """Health check endpoint."""
-    return {
-        "status": "healthy",
-        "version": settings.APP_VERSION,
-        "dev_mode": settings.DEV_MODE,
-    }
+app = create_app()
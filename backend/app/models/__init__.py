@@ -1,6 +1,20 @@
 # Models module - import all models here for Alembic to detect them
 from app.models.match import Match, MatchStatus
 from app.models.message import Message
+from app.models.message_archive import MessageArchive
+from app.models.outbox import OutboxEvent
+from app.models.session import RefreshToken, RevokedSession
 from app.models.user import Gender, User, UserStatus
 
-__all__ = ["User", "Gender", "UserStatus", "Match", "MatchStatus", "Message"]
+__all__ = [
+    "User",
+    "Gender",
+    "UserStatus",
+    "Match",
+    "MatchStatus",
+    "Message",
+    "MessageArchive",
+    "OutboxEvent",
+    "RefreshToken",
+    "RevokedSession",
+]
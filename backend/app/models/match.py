@@ -3,9 +3,8 @@ import uuid
 from datetime import datetime
 
 from app.core.database import Base
-from sqlalchemy import Column, DateTime, ForeignKey
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, Index
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 
@@ -22,6 +21,10 @@ class Match(Base):
     """Match model - represents a connection between two users."""
 
     __tablename__ = "matches"
+    __table_args__ = (
+        # Lifecycle sweeper scans active matches by last activity
+        Index("ix_matches_status_activity", "status", "last_activity_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -35,6 +38,7 @@ class Match(Base):
     # Timestamps
     matched_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
+    last_activity_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     # Relationships
     male_user = relationship(
@@ -2,15 +2,33 @@ import uuid
 from datetime import datetime
 
 from app.core.database import Base
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Text
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy import UUID, Boolean, Column, DateTime, ForeignKey, Index, Text, false
 from sqlalchemy.orm import relationship
 
 
 class Message(Base):
-    """Chat message model."""
+    """
+    Chat message model.
+
+    On PostgreSQL the table is range-partitioned by month on sent_at, so the
+    partition key is part of the primary key. Messages of closed matches are
+    moved to MessageArchive by the archiver.
+    """
 
     __tablename__ = "messages"
+    __table_args__ = (
+        # Chat history and last-message lookups
+        Index("ix_messages_match_sent", "match_id", "sent_at"),
+        # Unread counts only touch unread rows
+        Index(
+            "ix_messages_unread",
+            "match_id",
+            "sender_id",
+            postgresql_where=Column("is_read") == false(),
+            sqlite_where=Column("is_read") == false(),
+        ),
+        {"postgresql_partition_by": "RANGE (sent_at)"},
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
 
@@ -26,8 +44,8 @@ class Message(Base):
     # Status
     is_read = Column(Boolean, default=False)
 
-    # Timestamps
-    sent_at = Column(DateTime, default=datetime.utcnow)
+    # Timestamps (partition key)
+    sent_at = Column(DateTime, primary_key=True, default=datetime.utcnow)
 
     # Relationships
     match = relationship("Match", back_populates="messages")
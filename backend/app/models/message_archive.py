@@ -0,0 +1,31 @@
+from datetime import datetime
+
+from app.core.database import Base
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, Integer, LargeBinary
+
+
+class MessageArchive(Base):
+    """
+    Cold storage for chat history of closed matches.
+
+    Each row holds a compressed chunk of consecutive messages of one match,
+    in sent order. chunk_index orders the chunks within a match.
+    """
+
+    __tablename__ = "message_archive"
+
+    match_id = Column(UUID(as_uuid=True), ForeignKey("matches.id"), primary_key=True)
+    chunk_index = Column(Integer, primary_key=True)
+
+    # Chunk bounds, usable without decompressing the payload
+    message_count = Column(Integer, nullable=False)
+    first_sent_at = Column(DateTime, nullable=False)
+    last_sent_at = Column(DateTime, nullable=False)
+
+    # zlib-compressed JSON rows
+    payload = Column(LargeBinary, nullable=False)
+
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<MessageArchive {self.match_id}#{self.chunk_index}>"
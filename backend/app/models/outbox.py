@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from app.core.database import Base
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, Text
+
+
+class OutboxEvent(Base):
+    """
+    Domain event written in the same transaction as the change it describes
+    (transactional outbox). The outbox relay delivers pending rows in id
+    order, marks them delivered and compacts them away after a retention
+    period.
+    """
+
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # The relay only scans undelivered rows
+        Index(
+            "ix_outbox_events_pending",
+            "id",
+            postgresql_where=Column("delivered_at").is_(None),
+            sqlite_where=Column("delivered_at").is_(None),
+        ),
+    )
+
+    # SQLite only autoincrements INTEGER primary keys
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+
+    # e.g. "match.created"; key is the id of the aggregate (match id)
+    topic = Column(String(50), nullable=False)
+    key = Column(String(64), nullable=False)
+
+    # JSON document
+    payload = Column(Text, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    delivered_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<OutboxEvent {self.id} {self.topic}>"
@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from app.core.database import Base
+from sqlalchemy import UUID, Column, DateTime, ForeignKey, String
+
+
+class RefreshToken(Base):
+    """
+    Rotating refresh token. Only the SHA-256 of the token is stored.
+
+    All tokens issued from one login share a session_id; reusing an
+    already rotated token revokes the whole session.
+    """
+
+    __tablename__ = "refresh_tokens"
+
+    token_hash = Column(String(64), primary_key=True)
+    session_id = Column(UUID(as_uuid=True), nullable=False, index=True)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False)
+    used_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<RefreshToken {self.session_id}>"
+
+
+class RevokedSession(Base):
+    """
+    Revoked login session. Rows are kept until every access token of the
+    session has expired, then compacted away.
+    """
+
+    __tablename__ = "revoked_sessions"
+
+    session_id = Column(UUID(as_uuid=True), primary_key=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, index=True)
+    expires_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<RevokedSession {self.session_id}>"
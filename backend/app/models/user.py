@@ -3,9 +3,8 @@ import uuid
 from datetime import datetime
 
 from app.core.database import Base
-from sqlalchemy import Boolean, Column, DateTime, Integer, String
+from sqlalchemy import UUID, Boolean, Column, DateTime, Index, Integer, String
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import relationship
 
 
@@ -29,6 +28,10 @@ class User(Base):
     """User model for the dating platform."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        # Matching: earliest waiter of one gender in one city
+        Index("ix_users_matching", "city", "gender", "status", "verified_at"),
+    )
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     phone_number = Column(String(20), unique=True, nullable=False, index=True)
@@ -39,8 +42,6 @@ class User(Base):
 
     # Verification
     is_verified = Column(Boolean, default=False)
-    otp_code = Column(String(6), nullable=True)
-    otp_expires_at = Column(DateTime, nullable=True)
 
     # Queue/Ranking
     status = Column(SQLEnum(UserStatus), default=UserStatus.PENDING_VERIFICATION)
@@ -12,6 +12,8 @@ from app.schemas.user import (
     Gender,
     ProfileSetupRequest,
     QueueStatusResponse,
+    RefreshRequest,
+    RefreshResponse,
     RegisterRequest,
     RegisterResponse,
     TokenResponse,
@@ -30,6 +32,8 @@ __all__ = [
     "RegisterResponse",
     "VerifyOtpRequest",
     "TokenResponse",
+    "RefreshRequest",
+    "RefreshResponse",
     "ProfileSetupRequest",
     "UserBase",
     "UserResponse",
@@ -27,6 +27,8 @@ class MatchResponse(BaseModel):
     unread_count: int = 0
     last_message: Optional[str] = None
     last_message_at: Optional[datetime] = None
+    partner_online: Optional[bool] = False  # None: presence unavailable
+    partner_last_seen_at: Optional[datetime] = None
 
     class Config:
         from_attributes = True
@@ -47,11 +47,29 @@ class TokenResponse(BaseModel):
     """JWT token response."""
 
     access_token: str
+    refresh_token: str
     token_type: str = "bearer"
+    expires_in: int
     user_id: UUID
     is_profile_complete: bool
 
 
+class RefreshRequest(BaseModel):
+    """Request to rotate a refresh token (or revoke it on logout)."""
+
+    refresh_token: str
+
+
+class RefreshResponse(BaseModel):
+    """New token pair after refresh."""
+
+    access_token: str
+    refresh_token: str
+    token_type: str = "bearer"
+    expires_in: int
+    user_id: UUID
+
+
 class ProfileSetupRequest(BaseModel):
     """Request to complete profile."""
 
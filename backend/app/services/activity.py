@@ -0,0 +1,130 @@
+"""
+Write-behind tracking of User.last_active_at.
+
+Authenticated requests and WebSocket frames call `activity.record()`, which
+only updates an in-memory map. Every ACTIVITY_FLUSH_SECONDS the map is
+written in one bulk UPDATE (executemany by primary key), so a user sending
+hundreds of requests costs at most one row write per flush. A user's value
+is written again only once it moved by ACTIVITY_RESOLUTION_SECONDS, which
+bounds writes for constantly active users. Pending values are flushed on
+shutdown; a crash loses at most one flush interval of activity.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.database import run_write
+from app.core.log import get_logger
+from app.core.metrics import outbound_queue_depth, registry
+from app.models.user import User
+from sqlalchemy import bindparam, or_, update
+
+logger = get_logger("activity")
+
+
+class ActivityTracker:
+    """Coalesces user activity in memory and flushes it in bulk."""
+
+    def __init__(
+        self,
+        flush_interval: Optional[float] = None,
+        resolution: Optional[float] = None,
+    ):
+        self.flush_interval = flush_interval or settings.ACTIVITY_FLUSH_SECONDS
+        self.resolution = resolution or settings.ACTIVITY_RESOLUTION_SECONDS
+        # user id -> latest activity not yet written
+        self._pending: Dict[UUID, datetime] = {}
+        # user id -> monotonic time of the last write (recent writes only)
+        self._written: Dict[UUID, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def record(self, user_id, at: Optional[datetime] = None):
+        """Note activity of a user (no I/O)."""
+        if not isinstance(user_id, UUID):
+            user_id = UUID(str(user_id))
+        written = self._written.get(user_id)
+        if written is not None and time.monotonic() - written < self.resolution:
+            return
+        self._pending[user_id] = at or datetime.utcnow()
+
+    async def flush(self) -> int:
+        """Write pending activity in one bulk UPDATE; returns rows written."""
+        # Forget writes older than the resolution (keeps the map small)
+        now = time.monotonic()
+        self._written = {
+            user_id: at
+            for user_id, at in self._written.items()
+            if now - at < self.resolution
+        }
+        if not self._pending:
+            return 0
+
+        pending, self._pending = self._pending, {}
+        rows = [{"user_id": user_id, "at": at} for user_id, at in pending.items()]
+        users = User.__table__
+        # Never move a value back (another worker may have written a newer one)
+        statement = (
+            update(users)
+            .where(users.c.id == bindparam("user_id"))
+            .where(
+                or_(
+                    users.c.last_active_at.is_(None),
+                    users.c.last_active_at < bindparam("at"),
+                )
+            )
+            .values(last_active_at=bindparam("at"))
+        )
+
+        async def write(db):
+            await db.execute(statement, rows)
+
+        try:
+            await run_write(write)
+        except Exception:
+            # Keep the values for the next flush unless newer ones arrived
+            for user_id, at in pending.items():
+                self._pending.setdefault(user_id, at)
+            raise
+
+        for user_id in pending:
+            self._written[user_id] = now
+        return len(rows)
+
+    async def start(self):
+        """Start the flush loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write what is pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception("Final activity flush failed")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Activity flush failed")
+
+    async def collect_metrics(self):
+        outbound_queue_depth.labels("activity").set(len(self._pending))
+
+
+# Global tracker
+activity = ActivityTracker()
+registry.add_collector(activity.collect_metrics)
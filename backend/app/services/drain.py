@@ -0,0 +1,112 @@
+"""
+Graceful drain for rolling deploys.
+
+On SIGTERM the worker drains before handing control to uvicorn's own
+shutdown:
+
+1. Refuse new WebSockets and report /health as 503 so load balancers stop
+   routing here.
+2. Let in-flight WebSocket frames finish, including their queued writes.
+3. Send every client a `{"type": "reconnect", "after_ms": ...}` frame with
+   a delay jittered over DRAIN_RECONNECT_SPREAD_SECONDS, then close with
+   1012 (service restart), so clients come back spread out instead of all
+   at once.
+
+The whole drain is bounded by DRAIN_TIMEOUT_SECONDS. The lifespan shutdown
+then flushes the SQLite write queue and the SMS outbox as before. A second
+SIGTERM during the drain skips straight to uvicorn's shutdown.
+"""
+
+import asyncio
+import signal
+from typing import Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.websocket_manager import manager
+
+logger = get_logger("drain")
+
+
+class Drainer:
+    """Runs the drain sequence once, from a signal or from shutdown."""
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        reconnect_spread: Optional[float] = None,
+    ):
+        self.timeout = timeout or settings.DRAIN_TIMEOUT_SECONDS
+        self.reconnect_spread = (
+            reconnect_spread or settings.DRAIN_RECONNECT_SPREAD_SECONDS
+        )
+        self._task: Optional[asyncio.Task] = None
+        self._signalled = False
+
+    @property
+    def draining(self) -> bool:
+        return manager.draining
+
+    async def drain(self):
+        """Drain once; later calls wait for the same drain."""
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._drain())
+        await asyncio.shield(self._task)
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        logger.info("Draining", extra={"timeout": self.timeout})
+        manager.start_draining()
+
+        # Half the budget for in-flight frames, the rest for goodbyes
+        if not await manager.wait_until_idle(self.timeout / 2):
+            logger.warning("In-flight WebSocket frames did not finish in time")
+
+        closed = await manager.close_all(
+            self.reconnect_spread, max(deadline - loop.time(), 0.1)
+        )
+        logger.info("Drained WebSockets", extra={"closed": closed})
+
+    def install_signal_handler(self):
+        """Drain on SIGTERM, then pass the signal on to uvicorn's handler."""
+        if not hasattr(signal, "SIGTERM"):
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            original = signal.getsignal(signal.SIGTERM)
+        except ValueError:
+            return  # Not on the main thread
+
+        def hand_over(sig):
+            if callable(original):
+                original(sig, None)
+            else:
+                signal.signal(sig, signal.SIG_DFL)
+                signal.raise_signal(sig)
+
+        async def drain_then_exit(sig):
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("Drain failed")
+            hand_over(sig)
+
+        def on_signal(sig, frame):
+            if self._signalled:
+                # Second signal: stop waiting for the drain
+                hand_over(sig)
+                return
+            self._signalled = True
+            loop.call_soon_threadsafe(
+                lambda: asyncio.ensure_future(drain_then_exit(sig))
+            )
+
+        try:
+            signal.signal(signal.SIGTERM, on_signal)
+        except ValueError:
+            pass  # Not on the main thread
+
+
+# Global drainer
+drainer = Drainer()
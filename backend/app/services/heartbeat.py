@@ -0,0 +1,77 @@
+"""
+WebSocket heartbeat and presence refresh.
+
+Every WS_PING_INTERVAL_SECONDS the server sends {"type": "ping"} on each
+chat socket; clients answer {"type": "pong"}. Any frame counts as a sign of
+life, and sockets silent for WS_PING_TIMEOUT_SECONDS are closed (4008) and
+evicted. Mobile clients that vanish without closing their TCP connection
+therefore no longer stay in the connection manager.
+
+The same round refreshes the online entries of connected users
+(app.core.presence) in one batch, so being online costs no per-frame
+writes; last seen times are only written when a user goes offline.
+"""
+
+import asyncio
+from typing import Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.metrics import websocket_reaped
+from app.core.presence import presence
+from app.core.websocket_manager import manager
+
+logger = get_logger("heartbeat")
+
+
+class Heartbeat:
+    """Background task pinging sockets and reaping dead ones."""
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.interval = interval or settings.WS_PING_INTERVAL_SECONDS
+        self.timeout = timeout or settings.WS_PING_TIMEOUT_SECONDS
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the heartbeat loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the heartbeat loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def beat(self) -> int:
+        """One round: ping, evict silent sockets, refresh presence."""
+        evicted = await manager.heartbeat(self.timeout, send_timeout=self.interval)
+        for user_id in evicted:
+            if not manager.is_user_connected(user_id):
+                await presence.mark_offline(user_id, reaped=True)
+        await presence.mark_online(manager.last_frames_by_user())
+
+        if evicted:
+            websocket_reaped.inc(len(evicted))
+            logger.info("Reaped silent WebSockets", extra={"count": len(evicted)})
+        return len(evicted)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.beat()
+            except Exception:
+                logger.exception("WebSocket heartbeat failed")
+
+
+# Global heartbeat
+heartbeat = Heartbeat()
@@ -0,0 +1,415 @@
+"""
+Sharded match workers.
+
+Cities are spread over MATCH_SHARDS shards by hash range, and every worker
+running this service pairs the queues of the shards it owns with
+MatchingEngine.process_queue(). Ownership is coordinated through leases:
+
+- postgres: session advisory locks on one dedicated connection. PostgreSQL
+  releases them as soon as a worker's connection dies.
+- redis: keys with a TTL (MATCH_SHARD_LEASE_SECONDS), renewed every round.
+- local: this process owns every shard (SQLite, single node).
+
+Every round, a worker renews its leases, counts the live workers and
+settles on its fair share, ceil(shards / workers). It sheds shards above
+that share and takes free ones below it. New workers therefore get shards
+within a round, and the shards of a dead worker are taken over once its
+leases lapse.
+
+Partitions are only paired again when their queue digest changed, and the
+digests survive restarts through snapshots (app.services.queue_snapshot).
+
+Leases only spread the work. Correctness does not depend on them: two
+owners of one shard serialize on the same per-queue locks as concurrent
+arrivals, and every pair is claimed with a conditional UPDATE that only
+succeeds while both users still wait.
+"""
+
+import abc
+import asyncio
+import math
+import os
+import random
+import socket
+import time
+import uuid
+import zlib
+from typing import Dict, Iterable, Optional, Set
+
+from app.core.config import settings
+from app.core.database import async_session_maker, write_engine
+from app.core.log import get_logger
+from app.core.matching_engine import MatchingEngine, QueueDigest
+from app.core.metrics import match_shards_owned
+from app.services.queue_snapshot import read_snapshot, write_snapshot
+from sqlalchemy import text
+
+logger = get_logger("match_shards")
+
+
+def shard_of(city: Optional[str], shards: int) -> int:
+    """Shard owning `city`: its 32-bit hash range out of `shards` ranges."""
+    if city is None:
+        return 0
+    return (zlib.crc32(city.encode()) * shards) >> 32
+
+
+# ===== Leases =====
+
+
+class ShardLeases(abc.ABC):
+    """Interface for shard ownership leases."""
+
+    async def join(self) -> None:
+        """Register this worker as live."""
+
+    async def leave(self) -> None:
+        """Release every lease and deregister this worker."""
+
+    @abc.abstractmethod
+    async def members(self) -> int:
+        """Number of live workers, including this one."""
+
+    @abc.abstractmethod
+    async def renew(self, shards: Set[int]) -> Set[int]:
+        """Extend the leases on `shards`; returns those still held."""
+
+    @abc.abstractmethod
+    async def try_acquire(self, shard: int) -> bool:
+        """Take the lease on `shard` if no live worker holds it."""
+
+    @abc.abstractmethod
+    async def release(self, shard: int) -> None:
+        """Give up the lease on `shard`."""
+
+
+class LocalShardLeases(ShardLeases):
+    """Single process: every lease is granted."""
+
+    async def members(self) -> int:
+        return 1
+
+    async def renew(self, shards: Set[int]) -> Set[int]:
+        return set(shards)
+
+    async def try_acquire(self, shard: int) -> bool:
+        return True
+
+    async def release(self, shard: int) -> None:
+        pass
+
+
+class PostgresShardLeases(ShardLeases):
+    """
+    Session advisory locks, two-key form: (MEMBERS, worker key) marks a live
+    worker and (SHARDS, shard) owns a shard. Both live on one connection
+    held for the worker's lifetime.
+    """
+
+    MEMBERS = 0x434D0001
+    SHARDS = 0x434D0002
+
+    def __init__(self):
+        self._conn = None
+
+    async def join(self) -> None:
+        conn = await write_engine.connect()
+        self._conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        while True:
+            key = random.randrange(1, 2**31)
+            if await self._try_lock(self.MEMBERS, key):
+                break
+
+    async def leave(self) -> None:
+        if self._conn is not None:
+            try:
+                await self._conn.execute(text("SELECT pg_advisory_unlock_all()"))
+            finally:
+                await self._conn.close()
+                self._conn = None
+
+    async def _try_lock(self, namespace: int, key: int) -> bool:
+        result = await self._conn.execute(
+            text("SELECT pg_try_advisory_lock(:namespace, :key)"),
+            {"namespace": namespace, "key": key},
+        )
+        return bool(result.scalar())
+
+    async def _ensure_connected(self):
+        if self._conn is None or self._conn.closed:
+            self._conn = None
+            await self.join()
+
+    async def members(self) -> int:
+        await self._ensure_connected()
+        result = await self._conn.execute(
+            text(
+                "SELECT count(*) FROM pg_locks "
+                "WHERE locktype = 'advisory' AND granted AND objsubid = 2 "
+                "AND classid::bigint = :namespace "
+                "AND database = (SELECT oid FROM pg_database "
+                "WHERE datname = current_database())"
+            ),
+            {"namespace": self.MEMBERS},
+        )
+        return max(1, result.scalar())
+
+    async def renew(self, shards: Set[int]) -> Set[int]:
+        # Session locks need no renewal; report what this session still holds
+        try:
+            await self._ensure_connected()
+            result = await self._conn.execute(
+                text(
+                    "SELECT objid::bigint FROM pg_locks "
+                    "WHERE locktype = 'advisory' AND granted AND objsubid = 2 "
+                    "AND classid::bigint = :namespace AND pid = pg_backend_pid()"
+                ),
+                {"namespace": self.SHARDS},
+            )
+        except Exception:
+            # Connection lost: so are the locks
+            logger.exception("Lost shard lease connection")
+            self._conn = None
+            return set()
+        return set(shards) & set(result.scalars())
+
+    async def try_acquire(self, shard: int) -> bool:
+        return await self._try_lock(self.SHARDS, shard)
+
+    async def release(self, shard: int) -> None:
+        await self._conn.execute(
+            text("SELECT pg_advisory_unlock(:namespace, :key)"),
+            {"namespace": self.SHARDS, "key": shard},
+        )
+
+
+class RedisShardLeases(ShardLeases):
+    """Lease keys with a TTL, owned by the worker id stored in them."""
+
+    PREFIX = "match_shards"
+
+    # Extend or delete a key only while this worker still owns it
+    _RENEW = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('pexpire', KEYS[1], ARGV[2]) else return 0 end"
+    )
+    _RELEASE = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then "
+        "return redis.call('del', KEYS[1]) else return 0 end"
+    )
+
+    def __init__(self, url: str, lease_seconds: float):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.lease_ms = int(lease_seconds * 1000)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._renew = self.client.register_script(self._RENEW)
+        self._release = self.client.register_script(self._RELEASE)
+
+    def _member_key(self) -> str:
+        return f"{self.PREFIX}:member:{self.worker_id}"
+
+    def _shard_key(self, shard: int) -> str:
+        return f"{self.PREFIX}:shard:{shard}"
+
+    async def join(self) -> None:
+        await self.client.set(self._member_key(), "1", px=self.lease_ms)
+
+    async def leave(self) -> None:
+        await self.client.delete(self._member_key())
+        await self.client.aclose()
+
+    async def members(self) -> int:
+        count = 0
+        async for _ in self.client.scan_iter(match=f"{self.PREFIX}:member:*"):
+            count += 1
+        return max(1, count)
+
+    async def renew(self, shards: Set[int]) -> Set[int]:
+        await self.client.set(self._member_key(), "1", px=self.lease_ms)
+        held = set()
+        for shard in shards:
+            if await self._renew(
+                [self._shard_key(shard)], [self.worker_id, self.lease_ms]
+            ):
+                held.add(shard)
+        return held
+
+    async def try_acquire(self, shard: int) -> bool:
+        return bool(
+            await self.client.set(
+                self._shard_key(shard), self.worker_id, nx=True, px=self.lease_ms
+            )
+        )
+
+    async def release(self, shard: int) -> None:
+        await self._release([self._shard_key(shard)], [self.worker_id])
+
+
+def create_shard_leases() -> ShardLeases:
+    """Build the leases selected by MATCH_SHARD_LEASES."""
+    name = settings.MATCH_SHARD_LEASES
+    if name is None:
+        if write_engine.dialect.name == "postgresql":
+            name = "postgres"
+        elif settings.REDIS_URL:
+            name = "redis"
+        else:
+            name = "local"
+
+    if name == "local":
+        return LocalShardLeases()
+    if name == "postgres":
+        if write_engine.dialect.name != "postgresql":
+            raise ValueError("postgres shard leases require a PostgreSQL database")
+        return PostgresShardLeases()
+    if name == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("redis shard leases require REDIS_URL")
+        return RedisShardLeases(settings.REDIS_URL, settings.MATCH_SHARD_LEASE_SECONDS)
+    raise ValueError(f"Unknown MATCH_SHARD_LEASES {name!r}")
+
+
+# ===== Worker =====
+
+
+class MatchShardWorker:
+    """Background task pairing the queues of the shards this worker owns."""
+
+    def __init__(
+        self,
+        shards: Optional[int] = None,
+        interval: Optional[float] = None,
+        leases: Optional[ShardLeases] = None,
+    ):
+        self.shards = shards or settings.MATCH_SHARDS
+        self.interval = interval or settings.MATCH_SHARD_INTERVAL_SECONDS
+        self.leases = leases
+        self.owned: Set[int] = set()
+        # Digest of each partition when it was last paired (see queue_snapshot)
+        self.paired: Dict[Optional[str], QueueDigest] = {}
+        self._snapshot_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Join the worker group and start the matching loop."""
+        if self._task is None:
+            if self.leases is None:
+                self.leases = create_shard_leases()
+            await self.leases.join()
+            if settings.MATCH_SNAPSHOT_PATH:
+                self.paired = read_snapshot(settings.MATCH_SNAPSHOT_PATH)
+                self._snapshot_at = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the loop and hand the shards back at once."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            for shard in self.owned:
+                await self.leases.release(shard)
+            self._set_owned(set())
+            await self.leases.leave()
+            self.save_snapshot()
+
+    def _set_owned(self, owned: Set[int]):
+        self.owned = owned
+        match_shards_owned.set(len(owned))
+
+    def _preference(self) -> Iterable[int]:
+        # Start at a random shard so that joining workers rarely race for the same one
+        start = random.randrange(self.shards)
+        return [(start + i) % self.shards for i in range(self.shards)]
+
+    async def rebalance(self) -> Set[int]:
+        """Renew leases, then shed or take shards to reach the fair share."""
+        before = self.owned
+        owned = await self.leases.renew(self.owned)
+        target = math.ceil(self.shards / await self.leases.members())
+
+        for shard in sorted(owned, reverse=True)[: max(0, len(owned) - target)]:
+            await self.leases.release(shard)
+            owned.discard(shard)
+
+        for shard in self._preference():
+            if len(owned) >= target:
+                break
+            if shard not in owned and await self.leases.try_acquire(shard):
+                owned.add(shard)
+
+        self._set_owned(owned)
+        if owned != before:
+            logger.info(
+                "Match shards rebalanced",
+                extra={"owned": sorted(owned), "target": target},
+            )
+        return owned
+
+    async def run_owned(self) -> int:
+        """
+        Pair the queues of the owned cities that changed since they were
+        last paired and have waiters of both genders.
+        """
+        if not self.owned:
+            return 0
+        async with async_session_maker() as db:
+            engine = MatchingEngine(db)
+            digests = await engine.queue_digests()
+            # Forget partitions whose queues emptied
+            self.paired = {
+                city: digest for city, digest in self.paired.items() if city in digests
+            }
+
+            partitions = [
+                city
+                for city, digest in digests.items()
+                if shard_of(city, self.shards) in self.owned
+                and digest[0][0] > 0
+                and digest[1][0] > 0
+                and self.paired.get(city) != digest
+            ]
+            if not partitions:
+                return 0
+            created = len(await engine.process_queue(partitions))
+
+            digests = await engine.queue_digests()
+            for city in partitions:
+                if city in digests:
+                    self.paired[city] = digests[city]
+            return created
+
+    def save_snapshot(self):
+        """Write the paired digests to MATCH_SNAPSHOT_PATH, if set."""
+        if not settings.MATCH_SNAPSHOT_PATH:
+            return
+        try:
+            write_snapshot(settings.MATCH_SNAPSHOT_PATH, self.paired)
+        except OSError:
+            logger.exception("Writing the queue snapshot failed")
+        self._snapshot_at = time.monotonic()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebalance()
+                created = await self.run_owned()
+                if created:
+                    logger.info("Matched queued users", extra={"count": created})
+                if (
+                    time.monotonic() - self._snapshot_at
+                    >= settings.MATCH_SNAPSHOT_INTERVAL_SECONDS
+                ):
+                    self.save_snapshot()
+            except Exception:
+                logger.exception("Match shard round failed")
+            await asyncio.sleep(self.interval)
+
+
+# Global worker
+match_shard_worker = MatchShardWorker()
@@ -0,0 +1,131 @@
+"""
+Match lifecycle sweeper.
+
+Expires ACTIVE matches that have seen no activity for
+MATCH_INACTIVITY_TIMEOUT_HOURS, puts both users back in the queue and
+tells connected clients. Work is done in bounded batches through the
+(status, last_activity_at) index and paced by MATCH_SWEEP_MAX_PER_SECOND
+so the sweeper never competes with foreground traffic. last_activity_at
+is NOT NULL (migrated matches start from matched_at), so the plain `<`
+comparison reaches every stale match.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.log import get_logger
+from app.core.matching_engine import MatchingEngine
+from app.core.versions import user_stamps, versions
+from app.core.websocket_manager import manager
+from app.models.match import Match, MatchStatus
+from sqlalchemy import select, update
+
+logger = get_logger("match_sweeper")
+
+
+class MatchSweeper:
+    """Background task that expires stale matches in bulk."""
+
+    def __init__(
+        self,
+        interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        max_per_second: Optional[float] = None,
+    ):
+        self.interval = interval or settings.MATCH_SWEEP_INTERVAL_SECONDS
+        self.batch_size = batch_size or settings.MATCH_SWEEP_BATCH_SIZE
+        self.max_per_second = max_per_second or settings.MATCH_SWEEP_MAX_PER_SECOND
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the sweeper loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the sweeper loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep_batch(self, cutoff: datetime) -> int:
+        """Expire one batch of matches inactive since `cutoff`."""
+        async with async_session_maker() as db:
+            query = (
+                select(Match.id, Match.male_user_id, Match.female_user_id)
+                .where(Match.status == MatchStatus.ACTIVE)
+                .where(Match.last_activity_at < cutoff)
+                .order_by(Match.last_activity_at.asc())
+                .limit(self.batch_size)
+            )
+            rows = (await db.execute(query)).all()
+            if not rows:
+                return 0
+
+            # Re-check status and activity so concurrent messages win
+            match_ids = [row.id for row in rows]
+            await db.execute(
+                update(Match)
+                .where(Match.id.in_(match_ids))
+                .where(Match.status == MatchStatus.ACTIVE)
+                .where(Match.last_activity_at < cutoff)
+                .values(status=MatchStatus.EXPIRED, completed_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+            expired_query = (
+                select(Match.id, Match.male_user_id, Match.female_user_id)
+                .where(Match.id.in_(match_ids))
+                .where(Match.status == MatchStatus.EXPIRED)
+            )
+            expired = (await db.execute(expired_query)).all()
+
+            user_ids = [
+                u for row in expired for u in (row.male_user_id, row.female_user_id)
+            ]
+            await versions.bump(*user_stamps("inbox", user_ids))
+            engine = MatchingEngine(db)
+            await engine.requeue_users(user_ids)
+
+        for row in expired:
+            event = {"type": "match_expired", "match_id": str(row.id)}
+            for user_id in (row.male_user_id, row.female_user_id):
+                await manager.notify_user(str(user_id), event)
+
+        return len(rows)
+
+    async def sweep(self) -> int:
+        """Expire all stale matches, pacing batches to the throughput cap."""
+        cutoff = datetime.utcnow() - timedelta(
+            hours=settings.MATCH_INACTIVITY_TIMEOUT_HOURS
+        )
+        total = 0
+        while True:
+            swept = await self.sweep_batch(cutoff)
+            total += swept
+            if swept < self.batch_size:
+                break
+            await asyncio.sleep(swept / self.max_per_second)
+        return total
+
+    async def _run(self):
+        while True:
+            try:
+                expired = await self.sweep()
+                if expired:
+                    logger.info("Expired inactive matches", extra={"count": expired})
+            except Exception:
+                logger.exception("Match sweep failed")
+            await asyncio.sleep(self.interval)
+
+
+# Global sweeper
+match_sweeper = MatchSweeper()
@@ -0,0 +1,342 @@
+"""
+Hot/cold message storage.
+
+Hot: the `messages` table, range-partitioned by month on PostgreSQL.
+Cold: `message_archive`, compressed chunks of history for closed matches.
+
+The archiver moves the messages of COMPLETED / EXPIRED / CANCELLED matches
+into the archive and drops old partitions once they are empty, so the hot
+indexes only cover live conversations. Chat history reads go through
+`fetch_archived_messages` to serve cold pages transparently.
+"""
+
+import asyncio
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Tuple
+from uuid import UUID
+
+from app.core.config import settings
+from app.core.database import async_session_maker, write_engine
+from app.core.log import get_logger
+from app.core.versions import user_stamps, versions
+from app.models.match import Match, MatchStatus
+from app.models.message import Message
+from app.models.message_archive import MessageArchive
+from sqlalchemy import delete, exists, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = get_logger("message_archive")
+
+CLOSED_MATCH_STATUSES = (
+    MatchStatus.COMPLETED,
+    MatchStatus.EXPIRED,
+    MatchStatus.CANCELLED,
+)
+
+
+@dataclass
+class ArchivedMessage:
+    """A message read back from the cold archive (same fields as Message)."""
+
+    id: UUID
+    match_id: UUID
+    sender_id: UUID
+    content: str
+    is_read: bool
+    sent_at: datetime
+
+
+# ===== Encoding =====
+
+
+def encode_chunk(messages: List[Message]) -> bytes:
+    """Pack messages into a compact compressed payload."""
+    rows = [
+        [m.id.hex, m.sender_id.hex, m.content, bool(m.is_read), m.sent_at.isoformat()]
+        for m in messages
+    ]
+    return zlib.compress(json.dumps(rows, separators=(",", ":")).encode(), 6)
+
+
+def decode_chunk(match_id: UUID, payload: bytes) -> List[ArchivedMessage]:
+    """Unpack a payload produced by encode_chunk."""
+    rows = json.loads(zlib.decompress(payload))
+    return [
+        ArchivedMessage(
+            id=UUID(row[0]),
+            match_id=match_id,
+            sender_id=UUID(row[1]),
+            content=row[2],
+            is_read=row[3],
+            sent_at=datetime.fromisoformat(row[4]),
+        )
+        for row in rows
+    ]
+
+
+# ===== Cold reads =====
+
+
+async def fetch_archived_messages(
+    db: AsyncSession, match_id: UUID, offset: int, limit: int
+) -> Tuple[List[ArchivedMessage], int]:
+    """
+    Get a page of archived messages for a match.
+
+    Returns (messages, total archived count). Only the chunks overlapping
+    the requested page are decompressed.
+    """
+    chunk_query = (
+        select(MessageArchive.chunk_index, MessageArchive.message_count)
+        .where(MessageArchive.match_id == match_id)
+        .order_by(MessageArchive.chunk_index.asc())
+    )
+    chunks = (await db.execute(chunk_query)).all()
+    cold_total = sum(count for _, count in chunks)
+
+    if offset >= cold_total or limit <= 0:
+        return [], cold_total
+
+    # Find the chunks covering [offset, offset + limit)
+    wanted = []
+    skip = offset
+    position = 0
+    for chunk_index, count in chunks:
+        if position + count > offset and position < offset + limit:
+            wanted.append(chunk_index)
+        elif not wanted:
+            skip -= count
+        position += count
+
+    payload_query = (
+        select(MessageArchive.payload)
+        .where(MessageArchive.match_id == match_id)
+        .where(MessageArchive.chunk_index.in_(wanted))
+        .order_by(MessageArchive.chunk_index.asc())
+    )
+    messages: List[ArchivedMessage] = []
+    for payload in (await db.execute(payload_query)).scalars():
+        messages.extend(decode_chunk(match_id, payload))
+
+    return messages[skip : skip + limit], cold_total
+
+
+# ===== Partition management (PostgreSQL only) =====
+
+
+def _month_start(value: datetime, months_ahead: int = 0) -> datetime:
+    month_index = value.year * 12 + value.month - 1 + months_ahead
+    return datetime(month_index // 12, month_index % 12 + 1, 1)
+
+
+async def _is_partitioned(conn) -> bool:
+    result = await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = 'messages'")
+    )
+    return result.scalar() == "p"
+
+
+async def ensure_message_partitions(
+    months_ahead: Optional[int] = None,
+) -> None:
+    """Create monthly partitions from this month up to `months_ahead`."""
+    if write_engine.dialect.name != "postgresql":
+        return
+
+    if months_ahead is None:
+        months_ahead = settings.MESSAGE_PARTITION_MONTHS_AHEAD
+
+    async with write_engine.begin() as conn:
+        if not await _is_partitioned(conn):
+            logger.warning("messages table is not partitioned, skipping partitions")
+            return
+
+        now = datetime.utcnow()
+        for ahead in range(months_ahead + 1):
+            start = _month_start(now, ahead)
+            end = _month_start(now, ahead + 1)
+            await conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS messages_{start:%Y_%m} "
+                    f"PARTITION OF messages "
+                    f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+                )
+            )
+
+        # Catch-all for clock skew and backfills
+        await conn.execute(
+            text(
+                "CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT"
+            )
+        )
+
+
+async def drop_empty_partitions() -> List[str]:
+    """Detach and drop monthly partitions older than last month that are empty."""
+    if write_engine.dialect.name != "postgresql":
+        return []
+
+    cutoff = _month_start(datetime.utcnow(), -1)
+    dropped = []
+
+    async with write_engine.begin() as conn:
+        if not await _is_partitioned(conn):
+            return []
+
+        result = await conn.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON pg_inherits.inhparent = parent.oid "
+                "JOIN pg_class child ON pg_inherits.inhrelid = child.oid "
+                "WHERE parent.relname = 'messages' "
+                "AND child.relname ~ '^messages_[0-9]{4}_[0-9]{2}$'"
+            )
+        )
+        for name in result.scalars().all():
+            month = datetime.strptime(name, "messages_%Y_%m")
+            if month >= cutoff:
+                continue
+
+            has_rows = await conn.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})"))
+            if has_rows.scalar():
+                continue
+
+            await conn.execute(text(f"ALTER TABLE messages DETACH PARTITION {name}"))
+            await conn.execute(text(f"DROP TABLE {name}"))
+            dropped.append(name)
+
+    return dropped
+
+
+# ===== Archiving =====
+
+
+async def archive_match_messages(db: AsyncSession, match_id: UUID) -> int:
+    """Move all hot messages of one match into archive chunks."""
+    result = await db.execute(
+        select(Message)
+        .where(Message.match_id == match_id)
+        .order_by(Message.sent_at.asc())
+    )
+    messages = list(result.scalars().all())
+    if not messages:
+        return 0
+
+    # Append after any chunks from a previous run
+    next_index_query = select(
+        func.coalesce(func.max(MessageArchive.chunk_index) + 1, 0)
+    ).where(MessageArchive.match_id == match_id)
+    next_index = (await db.execute(next_index_query)).scalar()
+
+    # Delete exactly the rows that were read, chunk by chunk: a message
+    # committed after the read stays hot for the next run even if its
+    # sent_at falls inside the archived range. The sent_at bounds let
+    # PostgreSQL skip partitions outside the chunk.
+    chunk_size = settings.MESSAGE_ARCHIVE_CHUNK_SIZE
+    for start in range(0, len(messages), chunk_size):
+        chunk = messages[start : start + chunk_size]
+        db.add(
+            MessageArchive(
+                match_id=match_id,
+                chunk_index=next_index,
+                message_count=len(chunk),
+                first_sent_at=chunk[0].sent_at,
+                last_sent_at=chunk[-1].sent_at,
+                payload=encode_chunk(chunk),
+            )
+        )
+        await db.execute(
+            delete(Message)
+            .where(Message.id.in_([m.id for m in chunk]))
+            .where(Message.sent_at.between(chunk[0].sent_at, chunk[-1].sent_at))
+        )
+        next_index += 1
+
+    await db.commit()
+
+    return len(messages)
+
+
+async def archive_closed_matches(batch_size: Optional[int] = None) -> int:
+    """Archive one batch of closed matches that still have hot messages."""
+    if batch_size is None:
+        batch_size = settings.MESSAGE_ARCHIVE_BATCH_MATCHES
+
+    async with async_session_maker() as db:
+        query = (
+            select(Match.id, Match.male_user_id, Match.female_user_id)
+            .where(Match.status.in_(CLOSED_MATCH_STATUSES))
+            .where(exists().where(Message.match_id == Match.id))
+            .limit(batch_size)
+        )
+        rows = (await db.execute(query)).all()
+        await db.commit()
+
+        archived = 0
+        for match_id, male_user_id, female_user_id in rows:
+            archived += await archive_match_messages(db, match_id)
+            # The inbox only shows hot messages (last message, unread count)
+            await versions.bump(
+                f"chat:{match_id}",
+                *user_stamps("inbox", (male_user_id, female_user_id)),
+            )
+
+    return archived
+
+
+class MessageArchiver:
+    """Background task that keeps partitions ahead and archives closed chats."""
+
+    def __init__(self, interval: Optional[float] = None):
+        self.interval = (
+            interval
+            if interval is not None
+            else settings.MESSAGE_ARCHIVE_INTERVAL_SECONDS
+        )
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        """Start the archiver loop."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the archiver loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Run one maintenance pass. Returns number of messages archived."""
+        await ensure_message_partitions()
+
+        archived = 0
+        while True:
+            moved = await archive_closed_matches()
+            archived += moved
+            if moved == 0:
+                break
+
+        await drop_empty_partitions()
+        return archived
+
+    async def _run(self):
+        while True:
+            try:
+                archived = await self.run_once()
+                if archived:
+                    logger.info("Archived messages", extra={"count": archived})
+            except Exception:
+                logger.exception("Message archiving failed")
+            await asyncio.sleep(self.interval)
+
+
+# Global archiver
+message_archiver = MessageArchiver()
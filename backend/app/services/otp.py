@@ -0,0 +1,62 @@
+"""
+OTP challenges kept in the expiring key-value store.
+
+A challenge lives under `otp:<phone>` for OTP_TTL_SECONDS and allows
+OTP_MAX_ATTEMPTS wrong guesses before it is discarded. Nothing touches
+the users table until a code is verified.
+"""
+
+import enum
+import hmac
+
+from app.core.config import settings
+from app.core.kv_store import kv_store
+
+
+class OtpResult(str, enum.Enum):
+    """Outcome of an OTP check."""
+
+    VALID = "VALID"
+    INVALID = "INVALID"
+    EXPIRED = "EXPIRED"
+    TOO_MANY_ATTEMPTS = "TOO_MANY_ATTEMPTS"
+
+
+def _code_key(phone_number: str) -> str:
+    return f"otp:{phone_number}"
+
+
+def _attempts_key(phone_number: str) -> str:
+    return f"otp_attempts:{phone_number}"
+
+
+async def issue_otp(phone_number: str, code: str) -> None:
+    """Store a new challenge, replacing any previous one."""
+    await kv_store.set(_code_key(phone_number), code, settings.OTP_TTL_SECONDS)
+    await kv_store.delete(_attempts_key(phone_number))
+
+
+async def check_otp(phone_number: str, code: str) -> OtpResult:
+    """Check a code against the stored challenge. Consumes it when valid."""
+    # In dev mode, the dev OTP always works
+    if settings.DEV_MODE and code == settings.DEV_OTP_CODE:
+        await kv_store.delete(_code_key(phone_number))
+        return OtpResult.VALID
+
+    expected = await kv_store.get(_code_key(phone_number))
+    if expected is None:
+        return OtpResult.EXPIRED
+
+    attempts = await kv_store.incr(
+        _attempts_key(phone_number), settings.OTP_TTL_SECONDS
+    )
+    if attempts > settings.OTP_MAX_ATTEMPTS:
+        await kv_store.delete(_code_key(phone_number))
+        return OtpResult.TOO_MANY_ATTEMPTS
+
+    if not hmac.compare_digest(expected, code):
+        return OtpResult.INVALID
+
+    await kv_store.delete(_code_key(phone_number))
+    await kv_store.delete(_attempts_key(phone_number))
+    return OtpResult.VALID
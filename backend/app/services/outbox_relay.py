@@ -0,0 +1,213 @@
+"""
+Outbox relay.
+
+Streams committed OutboxEvent rows, in id order and in batches of
+OUTBOX_BATCH_SIZE, to:
+
+- in-process subscribers registered with `outbox_relay.subscribe()`;
+- Redis streams named "outbox:<topic>", when OUTBOX_REDIS_STREAMS is set
+  (requires REDIS_URL), trimmed to about OUTBOX_STREAM_MAXLEN entries.
+
+A batch is marked delivered only after every subscriber and the stream
+accepted it, so delivery is at-least-once: after a crash or a failing
+subscriber, the same events are delivered again. Subscribers must be
+idempotent, e.g. by event id. On PostgreSQL, batches are claimed with
+SKIP LOCKED, so several relays never deliver the same batch at the same
+time.
+
+Delivered events are compacted (deleted) after OUTBOX_RETENTION_HOURS.
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.log import get_logger
+from app.core.metrics import outbound_queue_depth, registry
+from app.models.outbox import OutboxEvent
+from sqlalchemy import delete, func, select, update
+
+logger = get_logger("outbox_relay")
+
+
+@dataclass
+class Event:
+    """An outbox event as handed to subscribers."""
+
+    id: int
+    topic: str
+    key: str
+    payload: Dict[str, Any]
+    created_at: datetime
+
+
+Subscriber = Callable[[Event], Awaitable[None]]
+
+
+class OutboxRelay:
+    """Background task delivering outbox events."""
+
+    def __init__(
+        self,
+        batch_size: Optional[int] = None,
+        interval: Optional[float] = None,
+        retention_hours: Optional[float] = None,
+    ):
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.interval = interval or settings.OUTBOX_RELAY_INTERVAL_SECONDS
+        self.retention_hours = retention_hours or settings.OUTBOX_RETENTION_HOURS
+        self._subscribers: Dict[str, List[Subscriber]] = defaultdict(list)
+        self._redis = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, topic: str, handler: Subscriber):
+        """Call `handler` for every event of `topic` ("*" for all topics)."""
+        self._subscribers[topic].append(handler)
+
+    async def start(self):
+        """Start the relay loop."""
+        if settings.OUTBOX_REDIS_STREAMS and self._redis is None:
+            if not settings.REDIS_URL:
+                raise ValueError("OUTBOX_REDIS_STREAMS requires REDIS_URL")
+            import redis.asyncio as redis
+
+            self._redis = redis.from_url(settings.REDIS_URL)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the relay loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._redis is not None:
+            await self._redis.aclose()
+            self._redis = None
+
+    async def _publish(self, events: List[Event]):
+        for event in events:
+            for handler in self._subscribers[event.topic] + self._subscribers["*"]:
+                await handler(event)
+
+        if self._redis is not None:
+            pipe = self._redis.pipeline(transaction=False)
+            for event in events:
+                pipe.xadd(
+                    f"outbox:{event.topic}",
+                    {
+                        "id": event.id,
+                        "key": event.key,
+                        "payload": json.dumps(event.payload),
+                    },
+                    maxlen=settings.OUTBOX_STREAM_MAXLEN,
+                    approximate=True,
+                )
+            await pipe.execute()
+
+    async def relay_batch(self) -> int:
+        """Deliver the oldest batch of pending events; returns its size."""
+        async with async_session_maker() as db:
+            query = (
+                select(OutboxEvent)
+                .where(OutboxEvent.delivered_at.is_(None))
+                .order_by(OutboxEvent.id.asc())
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = (await db.execute(query)).scalars().all()
+            if not rows:
+                return 0
+
+            events = [
+                Event(
+                    id=row.id,
+                    topic=row.topic,
+                    key=row.key,
+                    payload=json.loads(row.payload),
+                    created_at=row.created_at,
+                )
+                for row in rows
+            ]
+            await self._publish(events)
+
+            await db.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_([event.id for event in events]))
+                .values(delivered_at=datetime.utcnow())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+        return len(events)
+
+    async def relay(self) -> int:
+        """Deliver every pending event, batch by batch."""
+        total = 0
+        while True:
+            delivered = await self.relay_batch()
+            total += delivered
+            if delivered < self.batch_size:
+                return total
+
+    async def compact(self) -> int:
+        """Delete events delivered more than the retention period ago."""
+        cutoff = datetime.utcnow() - timedelta(hours=self.retention_hours)
+        total = 0
+        async with async_session_maker() as db:
+            while True:
+                # Oldest first, in bounded batches along the primary key
+                ids = (
+                    select(OutboxEvent.id)
+                    .where(OutboxEvent.delivered_at < cutoff)
+                    .order_by(OutboxEvent.id.asc())
+                    .limit(self.batch_size)
+                )
+                result = await db.execute(
+                    delete(OutboxEvent)
+                    .where(OutboxEvent.id.in_(ids.scalar_subquery()))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+                total += result.rowcount
+                if result.rowcount < self.batch_size:
+                    return total
+
+    async def _run(self):
+        compacted_at = datetime.utcnow()
+        while True:
+            try:
+                await self.relay()
+                if datetime.utcnow() - compacted_at >= timedelta(hours=1):
+                    compacted = await self.compact()
+                    compacted_at = datetime.utcnow()
+                    if compacted:
+                        logger.info(
+                            "Compacted outbox events", extra={"count": compacted}
+                        )
+            except Exception:
+                logger.exception("Outbox relay failed")
+            await asyncio.sleep(self.interval)
+
+
+# Global relay
+outbox_relay = OutboxRelay()
+
+
+async def _collect_metrics():
+    """Pending outbox events (uses the pending-events partial index)."""
+    async with async_session_maker() as db:
+        pending = await db.scalar(
+            select(func.count(OutboxEvent.id)).where(OutboxEvent.delivered_at.is_(None))
+        )
+    outbound_queue_depth.labels("outbox").set(pending or 0)
+
+
+registry.add_collector(_collect_metrics)
@@ -0,0 +1,136 @@
+"""
+Queue snapshots for warm restarts of the match shard workers.
+
+A shard worker remembers the digest (waiting count and newest verified_at
+per gender) of every partition it has paired, and only pairs partitions
+whose digest changed since. The digests are written to a compact binary
+file every MATCH_SNAPSHOT_INTERVAL_SECONDS and on shutdown. On startup
+they are read back, so the first round only pairs partitions that changed
+after the snapshot instead of loading every waiting user. A digest is
+valid whoever owns the partition, so snapshots survive rebalancing. It is
+not valid under other matching settings (partitions, age window), so the
+header records a fingerprint of them and a mismatching snapshot is ignored.
+
+Layout (little-endian):
+
+    header  magic "CQS2", written_at i64 (us), settings fingerprint u32,
+            entries u32
+    entry   male count u32, male newest i64 (us, -1 = none),
+            female count u32, female newest i64, city length u16
+            (0xFFFF = no city), city UTF-8 bytes
+"""
+
+import os
+import struct
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.matching_engine import QueueDigest
+
+logger = get_logger("queue_snapshot")
+
+MAGIC = b"CQS2"
+HEADER = struct.Struct("<4sqII")
+ENTRY = struct.Struct("<IqIqH")
+NO_CITY = 0xFFFF
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_us(value: Optional[datetime]) -> int:
+    return -1 if value is None else (value - _EPOCH) // _MICROSECOND
+
+
+def _from_us(value: int) -> Optional[datetime]:
+    return None if value < 0 else _EPOCH + value * _MICROSECOND
+
+
+def settings_fingerprint() -> int:
+    """CRC32 of the settings that decide which users are paired."""
+    key = f"by_city={settings.MATCH_BY_CITY};age={settings.MATCH_AGE_WINDOW_YEARS}"
+    return zlib.crc32(key.encode())
+
+
+def encode_snapshot(digests: Dict[Optional[str], QueueDigest]) -> bytes:
+    """Pack partition digests into the snapshot layout."""
+    parts = [
+        HEADER.pack(
+            MAGIC, _to_us(datetime.utcnow()), settings_fingerprint(), len(digests)
+        )
+    ]
+    for city, ((males, male_newest), (females, female_newest)) in digests.items():
+        name = b"" if city is None else city.encode()
+        parts.append(
+            ENTRY.pack(
+                males,
+                _to_us(male_newest),
+                females,
+                _to_us(female_newest),
+                NO_CITY if city is None else len(name),
+            )
+        )
+        parts.append(name)
+    return b"".join(parts)
+
+
+def decode_snapshot(data: bytes):
+    """Unpack a snapshot; returns (written_at, settings fingerprint, digests)."""
+    magic, written_at, fingerprint, count = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("not a queue snapshot")
+
+    digests = {}
+    offset = HEADER.size
+    for _ in range(count):
+        males, male_newest, females, female_newest, length = ENTRY.unpack_from(
+            data, offset
+        )
+        offset += ENTRY.size
+        if length == NO_CITY:
+            city = None
+        else:
+            city = data[offset : offset + length].decode()
+            offset += length
+        digests[city] = (
+            (males, _from_us(male_newest)),
+            (females, _from_us(female_newest)),
+        )
+    return _from_us(written_at), fingerprint, digests
+
+
+def write_snapshot(path: str, digests: Dict[Optional[str], QueueDigest]) -> None:
+    """Write a snapshot atomically (readers never see a partial file)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(encode_snapshot(digests))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Dict[Optional[str], QueueDigest]:
+    """Digests from the snapshot at `path`; empty if missing or unusable."""
+    try:
+        with open(path, "rb") as f:
+            written_at, fingerprint, digests = decode_snapshot(f.read())
+    except FileNotFoundError:
+        return {}
+    except (ValueError, struct.error, UnicodeDecodeError):
+        logger.warning("Ignoring unreadable queue snapshot", extra={"path": path})
+        return {}
+    if fingerprint != settings_fingerprint():
+        # Pairs that were impossible may be possible now, and vice versa
+        logger.warning(
+            "Ignoring queue snapshot written with other matching settings",
+            extra={"path": path},
+        )
+        return {}
+
+    logger.info(
+        "Loaded queue snapshot",
+        extra={"path": path, "partitions": len(digests), "written_at": written_at},
+    )
+    return digests
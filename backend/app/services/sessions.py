@@ -0,0 +1,240 @@
+"""
+Login sessions: short-lived access tokens, rotating refresh tokens and
+session revocation.
+
+Every login starts a session. Access tokens carry the session id (`sid`)
+and live ACCESS_TOKEN_EXPIRE_MINUTES (a week by default while the Android
+client cannot refresh, minutes once it can); refresh tokens are single-use and
+rotate on every refresh. Reusing a rotated refresh token revokes the
+session.
+
+Revoked sessions are stored in `revoked_sessions` and mirrored into an
+in-memory Bloom filter that every worker syncs periodically. Checking an
+access token is then one O(1) filter lookup; only filter hits (revoked
+sessions and rare false positives) are confirmed against the database.
+"""
+
+import asyncio
+import hashlib
+import secrets
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+from uuid import UUID
+
+from app.core.bloom import BloomFilter
+from app.core.config import settings
+from app.core.database import async_session_maker
+from app.core.log import get_logger
+from app.core.security import create_access_token, decode_token_claims
+from app.models.session import RefreshToken, RevokedSession
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = get_logger("sessions")
+
+
+def _hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+# ===== Revocation list =====
+
+
+class RevocationList:
+    """Bloom filter of revoked session ids, synced from the database."""
+
+    def __init__(
+        self,
+        capacity: Optional[int] = None,
+        sync_interval: Optional[float] = None,
+    ):
+        self.capacity = capacity or settings.REVOCATION_BLOOM_CAPACITY
+        self.sync_interval = sync_interval or settings.REVOCATION_SYNC_SECONDS
+        self.bloom = BloomFilter(self.capacity)
+        self._cursor: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, session_id: str):
+        """Mark a session as revoked locally (no I/O)."""
+        self.bloom.add(str(session_id))
+
+    async def is_revoked(self, session_id: str) -> bool:
+        """O(1) for sessions that are not revoked; confirms filter hits."""
+        if str(session_id) not in self.bloom:
+            return False
+
+        async with async_session_maker() as db:
+            query = (
+                select(RevokedSession.session_id)
+                .where(RevokedSession.session_id == UUID(str(session_id)))
+                .where(RevokedSession.expires_at > datetime.utcnow())
+            )
+            return (await db.execute(query)).scalar() is not None
+
+    async def sync(self):
+        """Pull revocations made by other workers since the last sync."""
+        now = datetime.utcnow()
+        async with async_session_maker() as db:
+            if self._cursor is None or self.bloom.count >= self.capacity:
+                # Full rebuild: drop expired rows and start a fresh filter
+                await db.execute(
+                    delete(RevokedSession).where(RevokedSession.expires_at <= now)
+                )
+                await db.commit()
+                bloom = BloomFilter(self.capacity)
+                query = select(RevokedSession.session_id)
+            else:
+                bloom = self.bloom
+                # Overlap a little to tolerate clock skew between workers
+                query = select(RevokedSession.session_id).where(
+                    RevokedSession.revoked_at >= self._cursor - timedelta(seconds=30)
+                )
+
+            for session_id in (await db.execute(query)).scalars():
+                bloom.add(str(session_id))
+
+        self.bloom = bloom
+        self._cursor = now
+
+    async def start(self):
+        """Load the filter and start the sync loop."""
+        await self.sync()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the sync loop."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Revocation sync failed")
+
+
+# Global revocation list
+revocation_list = RevocationList()
+
+
+# ===== Sessions =====
+
+
+async def _issue_refresh_token(
+    db: AsyncSession, user_id: UUID, session_id: UUID
+) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(
+        RefreshToken(
+            token_hash=_hash_token(token),
+            session_id=session_id,
+            user_id=user_id,
+            expires_at=datetime.utcnow()
+            + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+    )
+    return token
+
+
+async def start_session(db: AsyncSession, user_id: UUID) -> Tuple[str, str]:
+    """Start a login session. Returns (access_token, refresh_token)."""
+    session_id = uuid.uuid4()
+    refresh_token = await _issue_refresh_token(db, user_id, session_id)
+    await db.commit()
+
+    access_token = create_access_token(subject=str(user_id), session_id=session_id)
+    return access_token, refresh_token
+
+
+async def rotate_session(
+    db: AsyncSession, refresh_token: str
+) -> Optional[Tuple[UUID, str, str]]:
+    """
+    Exchange a refresh token for a new token pair.
+    Returns (user_id, access_token, refresh_token) or None if rejected.
+    """
+    token_hash = _hash_token(refresh_token)
+    query = select(RefreshToken).where(RefreshToken.token_hash == token_hash)
+    token = (await db.execute(query)).scalar_one_or_none()
+
+    if not token or token.expires_at < datetime.utcnow():
+        return None
+    if await revocation_list.is_revoked(token.session_id):
+        return None
+
+    # Single use: claim the token atomically, revoke the session on reuse
+    result = await db.execute(
+        update(RefreshToken)
+        .where(RefreshToken.token_hash == token_hash)
+        .where(RefreshToken.used_at == None)
+        .values(used_at=datetime.utcnow())
+    )
+    if result.rowcount != 1:
+        await revoke_session(db, token.session_id)
+        return None
+
+    new_refresh_token = await _issue_refresh_token(
+        db, token.user_id, token.session_id
+    )
+    await db.commit()
+
+    access_token = create_access_token(
+        subject=str(token.user_id), session_id=token.session_id
+    )
+    return token.user_id, access_token, new_refresh_token
+
+
+async def revoke_session(db: AsyncSession, session_id: UUID):
+    """Revoke a session: its refresh tokens stop working immediately and
+    its access tokens are rejected until they expire."""
+    await db.execute(delete(RefreshToken).where(RefreshToken.session_id == session_id))
+
+    existing = await db.get(RevokedSession, session_id)
+    if existing is None:
+        db.add(
+            RevokedSession(
+                session_id=session_id,
+                revoked_at=datetime.utcnow(),
+                expires_at=datetime.utcnow()
+                + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES + 1),
+            )
+        )
+    await db.commit()
+
+    revocation_list.add(session_id)
+
+
+async def revoke_refresh_token(db: AsyncSession, refresh_token: str) -> bool:
+    """Revoke the session a refresh token belongs to (logout)."""
+    query = select(RefreshToken.session_id).where(
+        RefreshToken.token_hash == _hash_token(refresh_token)
+    )
+    session_id = (await db.execute(query)).scalar()
+    if session_id is None:
+        return False
+
+    await revoke_session(db, session_id)
+    return True
+
+
+async def verify_access_token(token: str) -> Optional[dict]:
+    """Verify signature, expiry and session revocation. No DB I/O unless
+    the session is (probably) revoked."""
+    claims = decode_token_claims(token)
+    if claims is None:
+        return None
+
+    session_id = claims.get("sid")
+    if session_id and await revocation_list.is_revoked(session_id):
+        return None
+
+    return claims
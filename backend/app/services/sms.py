@@ -0,0 +1,254 @@
+"""
+SMS delivery for OTP codes.
+
+Requests only enqueue into an in-process outbox; a pool of worker tasks
+sends through a shared, pooled httpx.AsyncClient with retries and
+exponential backoff. Providers are pluggable:
+
+- ConsoleSmsProvider: prints the message (DEV_MODE)
+- FakeSmsProvider: records messages in memory (tests)
+- TwilioSmsProvider: Twilio REST API over httpx (non-blocking)
+
+Missing Twilio credentials do not stop a worker from starting: an error is
+logged and every send fails until they are configured.
+"""
+
+import abc
+import asyncio
+import random
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import httpx
+from app.core.config import settings
+from app.core.log import get_logger
+from app.core.metrics import outbound_queue_depth, registry
+
+logger = get_logger("sms")
+
+
+class SmsDeliveryError(Exception):
+    """Raised by providers when a message could not be delivered."""
+
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+# ===== Providers =====
+
+
+class SmsProvider(abc.ABC):
+    """Interface for SMS providers."""
+
+    @abc.abstractmethod
+    async def send(self, client: httpx.AsyncClient, to: str, body: str) -> None:
+        """Send one SMS. Raise SmsDeliveryError on failure."""
+
+
+class ConsoleSmsProvider(SmsProvider):
+    """Prints messages instead of sending them."""
+
+    async def send(self, client: httpx.AsyncClient, to: str, body: str) -> None:
+        logger.info("dev_sms", extra={"to": to, "body": body})
+
+
+class FakeSmsProvider(SmsProvider):
+    """Keeps sent messages in memory. Can be told to fail the next N sends."""
+
+    def __init__(self, fail_times: int = 0):
+        self.sent: List[Tuple[str, str]] = []
+        self.fail_times = fail_times
+
+    async def send(self, client: httpx.AsyncClient, to: str, body: str) -> None:
+        if self.fail_times > 0:
+            self.fail_times -= 1
+            raise SmsDeliveryError("Fake provider failure")
+        self.sent.append((to, body))
+
+
+class UnconfiguredSmsProvider(SmsProvider):
+    """Fails every send; stands in for a provider missing its settings."""
+
+    def __init__(self, reason: str):
+        self.reason = reason
+
+    async def send(self, client: httpx.AsyncClient, to: str, body: str) -> None:
+        raise SmsDeliveryError(self.reason, retryable=False)
+
+
+class TwilioSmsProvider(SmsProvider):
+    """Sends through the Twilio Messages REST API."""
+
+    API_URL = "https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
+
+    def __init__(self, account_sid: str, auth_token: str, from_number: str):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_number = from_number
+
+    async def send(self, client: httpx.AsyncClient, to: str, body: str) -> None:
+        try:
+            response = await client.post(
+                self.API_URL.format(sid=self.account_sid),
+                data={"To": to, "From": self.from_number, "Body": body},
+                auth=(self.account_sid, self.auth_token),
+            )
+        except httpx.HTTPError as e:
+            raise SmsDeliveryError(f"Twilio request failed: {e}")
+
+        if response.status_code == 429 or response.status_code >= 500:
+            raise SmsDeliveryError(f"Twilio returned {response.status_code}")
+        if response.status_code >= 400:
+            raise SmsDeliveryError(
+                f"Twilio rejected message: {response.status_code} {response.text}",
+                retryable=False,
+            )
+
+
+def get_sms_provider() -> SmsProvider:
+    """Build the provider selected by SMS_PROVIDER."""
+    name = settings.SMS_PROVIDER or ("console" if settings.DEV_MODE else "twilio")
+
+    if name == "console":
+        return ConsoleSmsProvider()
+    if name == "fake":
+        return FakeSmsProvider()
+    if name == "twilio":
+        if not (
+            settings.TWILIO_ACCOUNT_SID
+            and settings.TWILIO_AUTH_TOKEN
+            and settings.TWILIO_PHONE_NUMBER
+        ):
+            reason = "Twilio SMS provider requires TWILIO_* settings"
+            logger.error(f"{reason}; OTP messages will not be delivered")
+            return UnconfiguredSmsProvider(reason)
+        return TwilioSmsProvider(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            settings.TWILIO_PHONE_NUMBER,
+        )
+    raise ValueError(f"Unknown SMS provider: {name}")
+
+
+# ===== Outbox =====
+
+
+@dataclass
+class SmsJob:
+    to: str
+    body: str
+    attempt: int = 0
+
+
+class SmsOutbox:
+    """In-process outbox drained by a pool of async workers."""
+
+    def __init__(
+        self,
+        provider: Optional[SmsProvider] = None,
+        workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff: Optional[float] = None,
+    ):
+        self.provider = provider
+        self.workers = workers or settings.SMS_WORKERS
+        self.max_retries = (
+            max_retries if max_retries is not None else settings.SMS_MAX_RETRIES
+        )
+        self.backoff = (
+            backoff if backoff is not None else settings.SMS_RETRY_BACKOFF_SECONDS
+        )
+        self._queue: asyncio.Queue = asyncio.Queue(
+            maxsize=queue_size or settings.SMS_QUEUE_SIZE
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        """Open the HTTP client and start the workers."""
+        if self._tasks:
+            return
+        if self.provider is None:
+            self.provider = get_sms_provider()
+
+        self._client = httpx.AsyncClient(
+            timeout=settings.SMS_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.SMS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SMS_MAX_CONNECTIONS,
+            ),
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        """Give queued messages up to `timeout` seconds, then stop the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                "Dropping unsent SMS messages", extra={"count": self._queue.qsize()}
+            )
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        await self._client.aclose()
+        self._client = None
+
+    def qsize(self) -> int:
+        """Messages waiting for a worker."""
+        return self._queue.qsize()
+
+    def enqueue(self, to: str, body: str) -> bool:
+        """Queue a message without waiting. Returns False if the outbox is full."""
+        try:
+            self._queue.put_nowait(SmsJob(to=to, body=body))
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: SmsJob):
+        while True:
+            try:
+                await self.provider.send(self._client, job.to, job.body)
+                return
+            except SmsDeliveryError as e:
+                job.attempt += 1
+                if not e.retryable or job.attempt > self.max_retries:
+                    logger.error(
+                        "SMS delivery failed",
+                        extra={"to": job.to, "attempts": job.attempt, "error": str(e)},
+                    )
+                    return
+            except Exception as e:
+                logger.exception("SMS provider error", extra={"to": job.to})
+                return
+
+            # Exponential backoff with jitter
+            delay = self.backoff * (2 ** (job.attempt - 1))
+            await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+
+# Global outbox
+sms_outbox = SmsOutbox()
+
+
+async def _collect_metrics():
+    outbound_queue_depth.labels("sms").set(sms_outbox.qsize())
+
+
+registry.add_collector(_collect_metrics)
@@ -0,0 +1,411 @@
+"""
+Benchmark suite for the matching engine, chat path and WebSocket fan-out.
+
+Runs against the database in DATABASE_URL, which must be set explicitly:
+every benchmark drops and recreates all tables.
+
+    DATABASE_URL=sqlite+aiosqlite:////tmp/bench.db python -m app.tools.benchmark
+    DATABASE_URL=postgresql+asyncpg://localhost/concort_bench \\
+        python -m app.tools.benchmark --sizes 1000,10000
+
+Latency percentiles and SQL query counts per call are written to JSON and
+compared with benchmarks/baseline-<dialect>.json. The run exits non-zero
+when a benchmark issues more queries than its baseline or its p50 is more
+than --tolerance slower. Use --update-baseline to record a new baseline.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List
+
+from app.api.v1.endpoints.chat import get_messages
+from app.api.v1.endpoints.matching import get_matches
+from app.core.database import Base, async_session_maker, write_engine
+from app.core.matching_engine import MatchingEngine
+from app.core.query_stats import track_queries
+from app.core.websocket_manager import ConnectionManager
+from app.models.match import Match, MatchStatus
+from app.models.message import Message
+from app.models.user import Gender, User, UserStatus
+from app.services.message_archive import ensure_message_partitions
+from app.tools.loadgen import generate_users, insert_users, new_id
+from fastapi import Request, Response
+from sqlalchemy import delete, insert
+
+BATCH_SIZE = 5000
+
+
+# ===== Measurement =====
+
+
+def summarize(samples: List[float], queries: List[int]) -> dict:
+    """Latency percentiles in milliseconds plus queries per call."""
+    ordered = sorted(samples)
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 3)
+
+    return {
+        "samples": len(ordered),
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+        "queries": max(queries),
+    }
+
+
+async def measure(
+    repeat: int,
+    call: Callable[[], Awaitable],
+    setup: Callable[[], Awaitable] = None,
+) -> dict:
+    """Run `setup` (untimed) and `call` (timed) `repeat` times."""
+    samples, queries = [], []
+    for _ in range(repeat):
+        if setup is not None:
+            await setup()
+        with track_queries() as stats:
+            started = time.perf_counter()
+            await call()
+            samples.append(time.perf_counter() - started)
+        queries.append(stats.count)
+    return summarize(samples, queries)
+
+
+# ===== Fixtures =====
+
+
+def get_request(path: str) -> Request:
+    """A bare GET request for calling endpoint functions directly."""
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": b"",
+            "headers": [],
+        }
+    )
+
+
+async def reset_database():
+    async with write_engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await ensure_message_partitions()
+
+
+async def clear_users():
+    async with write_engine.begin() as conn:
+        await conn.execute(delete(Message.__table__))
+        await conn.execute(delete(Match.__table__))
+        await conn.execute(delete(User.__table__))
+
+
+def user_rows(
+    count: int,
+    gender: Gender = None,
+    status: UserStatus = UserStatus.WAITING,
+    phone_start: int = 17000000000,
+) -> List[dict]:
+    """Queue-ready users; all of `gender` if given, otherwise mixed."""
+    rows = generate_users(count, 30, phone_start)
+    if gender is not None:
+        ranks = defaultdict(int)
+        for row in rows:
+            row["gender"] = gender
+            ranks[row["city"]] += 1
+            row["queue_rank"] = ranks[row["city"]]
+    for row in rows:
+        row["status"] = status
+        if status != UserStatus.WAITING:
+            row["queue_rank"] = None
+    return rows
+
+
+async def insert_rows(table, rows: List[dict]):
+    for offset in range(0, len(rows), BATCH_SIZE):
+        async with write_engine.begin() as conn:
+            await conn.execute(insert(table), rows[offset : offset + BATCH_SIZE])
+
+
+def message_rows(match_id, sender_ids, count: int) -> List[dict]:
+    start = datetime.utcnow() - timedelta(seconds=count)
+    return [
+        {
+            "id": new_id(),
+            "match_id": match_id,
+            "sender_id": sender_ids[i % 2],
+            "content": f"benchmark message {i}",
+            "is_read": False,
+            "sent_at": start + timedelta(seconds=i),
+        }
+        for i in range(count)
+    ]
+
+
+# ===== Benchmarks =====
+
+
+async def bench_process_queue(size: int, repeat: int) -> dict:
+    """One queue run over `size` waiting users (half male, half female)."""
+
+    async def setup():
+        await clear_users()
+        males = user_rows(size // 2, Gender.MALE)
+        females = user_rows(size - size // 2, Gender.FEMALE, phone_start=16000000000)
+        await insert_users(males + females, BATCH_SIZE)
+
+    async def call():
+        async with async_session_maker() as db:
+            await MatchingEngine(db).process_queue()
+
+    return await measure(repeat, call, setup)
+
+
+async def bench_add_to_queue(size: int, repeat: int) -> dict:
+    """A woman joins a queue of `size` waiting men (match + re-rank)."""
+    await clear_users()
+    await insert_users(user_rows(size, Gender.MALE), BATCH_SIZE)
+    joiners = user_rows(
+        repeat, Gender.FEMALE, UserStatus.PENDING_VERIFICATION, 16000000000
+    )
+    await insert_users(joiners, BATCH_SIZE)
+    pending = iter(joiners)
+
+    async def call():
+        async with async_session_maker() as db:
+            user = await db.get(User, next(pending)["id"])
+            await MatchingEngine(db).add_to_queue(user)
+
+    return await measure(repeat, call)
+
+
+async def bench_get_matches(match_count: int, repeat: int) -> dict:
+    """Inbox of a user with `match_count` matches, a few messages each."""
+    await clear_users()
+    me = user_rows(1, Gender.MALE, UserStatus.MATCHED)[0]
+    partners = user_rows(match_count, Gender.FEMALE, UserStatus.MATCHED, 16000000000)
+    await insert_users([me] + partners, BATCH_SIZE)
+
+    matches = [
+        {
+            "id": new_id(),
+            "male_user_id": me["id"],
+            "female_user_id": partner["id"],
+            "status": MatchStatus.ACTIVE,
+            "matched_at": partner["verified_at"],
+            "last_activity_at": partner["verified_at"],
+        }
+        for partner in partners
+    ]
+    await insert_rows(Match.__table__, matches)
+    messages = []
+    for match in matches:
+        senders = (match["male_user_id"], match["female_user_id"])
+        messages.extend(message_rows(match["id"], senders, 3))
+    await insert_rows(Message.__table__, messages)
+
+    async def call():
+        async with async_session_maker() as db:
+            await get_matches(
+                get_request("/api/v1/matches"),
+                Response(),
+                current_user_id=me["id"],
+                db=db,
+            )
+
+    return await measure(repeat, call)
+
+
+async def bench_get_messages(
+    message_count: int, offsets: List[int], repeat: int
+) -> Dict[str, dict]:
+    """One page of chat history at each offset of a long conversation."""
+    await clear_users()
+    male, female = user_rows(2, status=UserStatus.MATCHED)
+    male["gender"], female["gender"] = Gender.MALE, Gender.FEMALE
+    await insert_users([male, female], BATCH_SIZE)
+
+    match_id = new_id()
+    await insert_rows(
+        Match.__table__,
+        [
+            {
+                "id": match_id,
+                "male_user_id": male["id"],
+                "female_user_id": female["id"],
+                "status": MatchStatus.ACTIVE,
+            }
+        ],
+    )
+    await insert_rows(
+        Message.__table__,
+        message_rows(match_id, (male["id"], female["id"]), message_count),
+    )
+
+    results = {}
+    for offset in offsets:
+
+        async def call():
+            async with async_session_maker() as db:
+                response = await get_messages(
+                    get_request(f"/api/v1/chat/{match_id}/messages"),
+                    match_id,
+                    limit=50,
+                    offset=offset,
+                    current_user_id=male["id"],
+                    db=db,
+                )
+                # The history is read while the body streams
+                async for _ in response.body_iterator:
+                    pass
+
+        results[f"get_messages[offset={offset}]"] = await measure(repeat, call)
+    return results
+
+
+class SlowWebSocket:
+    """Stand-in client whose sends take `delay` seconds."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    async def send_json(self, message: dict):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+
+async def bench_broadcast(clients: int, slow: int, delay: float, repeat: int) -> dict:
+    """Fan-out of one frame to a room where `slow` clients lag by `delay`."""
+    manager = ConnectionManager()
+    sockets = [SlowWebSocket(delay if i < slow else 0) for i in range(clients)]
+    random.shuffle(sockets)
+    manager.active_connections["bench"] = sockets
+
+    async def call():
+        await manager.broadcast_to_match("bench", {"type": "message", "content": "x"})
+
+    return await measure(repeat, call)
+
+
+# ===== Runner =====
+
+
+async def run_suite(args) -> Dict[str, dict]:
+    await reset_database()
+    results = {}
+
+    def record(name: str, result: dict):
+        results[name] = result
+        print(
+            f"{name:<40}{result['p50_ms']:>10.2f}ms{result['p95_ms']:>10.2f}ms"
+            f"{result['queries']:>8}"
+        )
+
+    print(f"{'benchmark':<40}{'p50':>12}{'p95':>12}{'queries':>8}")
+    for size in args.sizes:
+        record(f"process_queue[n={size}]", await bench_process_queue(size, args.repeat))
+    for size in args.sizes:
+        record(f"add_to_queue[n={size}]", await bench_add_to_queue(size, args.repeat))
+    for count in args.matches:
+        record(f"get_matches[m={count}]", await bench_get_matches(count, args.repeat))
+
+    offsets = [0, args.messages // 10, args.messages // 2, args.messages - 50]
+    pages = await bench_get_messages(args.messages, offsets, args.repeat)
+    for name, result in pages.items():
+        record(name, result)
+
+    for clients in (2, 50):
+        name = f"broadcast[clients={clients},slow=1]"
+        record(name, await bench_broadcast(clients, 1, 0.02, args.repeat))
+
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float):
+    """Return a description of every regression against the baseline."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["queries"] > base["queries"]:
+            regressions.append(
+                f"{name}: {result['queries']} queries (baseline {base['queries']})"
+            )
+        if result["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p50 {result['p50_ms']:.2f}ms "
+                f"(baseline {base['p50_ms']:.2f}ms, tolerance {tolerance:.0%})"
+            )
+    return regressions
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.tools.benchmark")
+    parser.add_argument("--sizes", type=_int_list, default=[1000, 10000, 100000])
+    parser.add_argument("--matches", type=_int_list, default=[10, 100, 1000])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument(
+        "--baseline", help="default: benchmarks/baseline-<dialect>.json"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    if not os.environ.get("DATABASE_URL"):
+        parser.error("set DATABASE_URL to a scratch database (it will be wiped)")
+
+    results = asyncio.run(run_suite(args))
+    dialect = write_engine.dialect.name
+    report = {
+        "dialect": dialect,
+        "created_at": datetime.utcnow().isoformat(),
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {args.output}")
+
+    baseline_path = args.baseline or os.path.join(
+        "benchmarks", f"baseline-{dialect}.json"
+    )
+    if args.update_baseline:
+        os.makedirs(os.path.dirname(baseline_path) or ".", exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Baseline updated: {baseline_path}")
+        return
+
+    if not os.path.exists(baseline_path):
+        print(f"⚠️ No baseline at {baseline_path}, skipping comparison")
+        return
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("❌ Regressions against baseline:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Import-time budget check for the worker roles in app.factory.
+
+Builds each role's app in a fresh interpreter under `python -X importtime`
+and fails when:
+
+- its total import time exceeds the budget in
+  benchmarks/importtime-budget.json, or
+- it imports a module its role must not load (e.g. passlib in a
+  WebSocket worker, FastAPI in the matcher).
+
+    python -m app.tools.importtime
+    python -m app.tools.importtime --roles ws,matcher --repeat 5
+    python -m app.tools.importtime --update-budget
+
+Each role is measured --repeat times and the fastest run counts, which
+filters out noise from a busy machine.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Set, Tuple
+
+from app.factory import ROLES
+
+# Modules each role must not import, by top-level name or prefix
+FORBIDDEN: Dict[str, Tuple[str, ...]] = {
+    "all": (),
+    "api": (
+        "app.services.match_shards",
+        "app.services.match_sweeper",
+        "app.services.outbox_relay",
+        "app.services.drain",
+    ),
+    "ws": (
+        "passlib",
+        "jose",
+        "httpx",
+        "app.api.v1.endpoints.auth",
+        "app.services.sms",
+        "app.core.matching_engine",
+    ),
+    "matcher": ("fastapi", "passlib", "jose", "httpx", "app.api"),
+}
+
+DEFAULT_BUDGET_PATH = os.path.join("benchmarks", "importtime-budget.json")
+
+
+def measure_role(role: str) -> Tuple[float, Set[str]]:
+    """Total import time (ms) and imported modules for one role."""
+    code = f"from app.factory import create_app; create_app({role!r})"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        module = name.strip()
+        modules.add(module)
+        # One leading space at the top level, two more per nesting level
+        if len(name) - len(name.lstrip()) == 1:
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def forbidden_imports(role: str, modules: Set[str]) -> List[str]:
+    found = []
+    for prefix in FORBIDDEN[role]:
+        if any(m == prefix or m.startswith(prefix + ".") for m in modules):
+            found.append(prefix)
+    return found
+
+
+def _str_list(value: str) -> List[str]:
+    return [item for item in value.split(",") if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.tools.importtime")
+    parser.add_argument("--roles", type=_str_list, default=list(ROLES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", default=DEFAULT_BUDGET_PATH)
+    parser.add_argument(
+        "--update-budget",
+        action="store_true",
+        help="record measured times plus --headroom as the new budget",
+    )
+    parser.add_argument("--headroom", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    unknown = set(args.roles) - set(ROLES)
+    if unknown:
+        parser.error(f"unknown roles: {', '.join(sorted(unknown))}")
+
+    measured = {}
+    violations = []
+    for role in args.roles:
+        runs = [measure_role(role) for _ in range(args.repeat)]
+        import_ms = min(ms for ms, _ in runs)
+        measured[role] = import_ms
+        print(f"{role:8} {import_ms:8.1f} ms")
+        for module in forbidden_imports(role, runs[0][1]):
+            violations.append(f"{role}: imports {module}")
+
+    if args.update_budget:
+        budget = {
+            role: round(ms * (1 + args.headroom), 1) for role, ms in measured.items()
+        }
+        os.makedirs(os.path.dirname(args.budget) or ".", exist_ok=True)
+        with open(args.budget, "w") as f:
+            json.dump({"budget_ms": budget}, f, indent=2)
+        print(f"📝 Budget updated: {args.budget}")
+    elif os.path.exists(args.budget):
+        with open(args.budget) as f:
+            budget = json.load(f)["budget_ms"]
+        for role, ms in measured.items():
+            if role in budget and ms > budget[role]:
+                violations.append(
+                    f"{role}: {ms:.1f} ms exceeds budget of {budget[role]} ms"
+                )
+    else:
+        print(f"⚠️ No budget at {args.budget}, skipping time check")
+
+    if violations:
+        print("❌ Import budget violations:")
+        for violation in violations:
+            print(f"  {violation}")
+        sys.exit(1)
+    print("✅ Import budget respected")
+
+
+if __name__ == "__main__":
+    main()
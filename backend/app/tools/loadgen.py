@@ -0,0 +1,310 @@
+"""
+Bulk user import and synthetic load generator.
+
+Seed a database with verified, waiting users (COPY on PostgreSQL,
+multi-row INSERTs elsewhere):
+
+    python -m app.tools.loadgen seed --users 100000
+
+Drive concurrent signups, matching and chat against a running app
+(server must run with DEV_MODE=true and RATE_LIMIT_ENABLED=false):
+
+    python -m app.tools.loadgen traffic --base-url http://localhost:8000 \\
+        --signups 2000 --concurrency 100 --messages 5
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+import httpx
+from app.core.config import settings
+from app.core.database import write_engine
+from app.core.schema import check_schema
+from app.models.user import Gender, User, UserStatus
+from sqlalchemy import func, insert, select
+
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Hyderabad", "Pune", "Chennai", "Kolkata"]
+
+# Relative signup volume per hour of day (evening peak)
+HOURLY_WEIGHTS = [
+    1, 1, 1, 1, 1, 1, 2, 3, 4, 4, 4, 5,
+    5, 5, 5, 5, 6, 7, 9, 10, 10, 8, 5, 2,
+]  # fmt: skip
+
+
+# ===== Seeding =====
+
+
+def new_id() -> uuid.UUID:
+    """uuid4 that survives SQLite's NUMERIC affinity for UUID columns.
+
+    A hex form made only of digits and at most one "e" reads back as a
+    number; at bulk-seeding volumes that happens often enough to matter.
+    """
+    while True:
+        value = uuid.uuid4()
+        hex_value = value.hex
+        if set(hex_value) & set("abcdf") or hex_value.count("e") > 1:
+            return value
+
+
+def generate_verified_at(count: int, days: int) -> List[datetime]:
+    """Signup times spread over the last `days` days with a daily cycle."""
+    now = datetime.utcnow()
+    hours = random.choices(range(24), weights=HOURLY_WEIGHTS, k=count)
+    times = []
+    for hour in hours:
+        day = now - timedelta(days=random.randrange(days))
+        moment = day.replace(hour=hour, minute=0, second=0, microsecond=0)
+        moment += timedelta(seconds=random.randrange(3600))
+        times.append(min(moment, now))
+    times.sort()
+    return times
+
+
+def generate_users(
+    count: int, days: int, phone_start: int, rank_start: Dict = None
+) -> List[dict]:
+    """
+    Build rows for `count` verified users waiting in the queue.
+    `rank_start` maps (city, gender) to the last rank already taken.
+    """
+    ranks = defaultdict(int, rank_start or {})
+    rows = []
+    for i, verified_at in enumerate(generate_verified_at(count, days)):
+        gender = random.choice((Gender.MALE, Gender.FEMALE))
+        city = random.choice(CITIES)
+        # Ranks are positions within the city and gender
+        ranks[city, gender] += 1
+        rows.append(
+            {
+                "id": new_id(),
+                "phone_number": f"+{phone_start + i}",
+                "name": f"Load User {phone_start + i}",
+                "gender": gender,
+                "age": random.randint(18, 45),
+                "city": city,
+                "is_verified": True,
+                "status": UserStatus.WAITING,
+                "queue_rank": ranks[city, gender],
+                "registered_at": verified_at - timedelta(minutes=random.randint(1, 30)),
+                "verified_at": verified_at,
+                "last_active_at": verified_at,
+            }
+        )
+    return rows
+
+
+async def _copy_users(conn, rows: List[dict]):
+    """PostgreSQL fast path: COPY through the raw asyncpg connection."""
+    columns = list(rows[0].keys())
+    records = [
+        tuple(
+            value.value if hasattr(value, "value") else value
+            for value in (row[column] for column in columns)
+        )
+        for row in rows
+    ]
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        "users", records=records, columns=columns
+    )
+
+
+async def insert_users(rows: List[dict], batch_size: int, verbose: bool = False):
+    """Insert user rows in batches, one transaction per batch."""
+    is_postgres = write_engine.dialect.name == "postgresql"
+    for offset in range(0, len(rows), batch_size):
+        batch = rows[offset : offset + batch_size]
+        async with write_engine.begin() as conn:
+            if is_postgres:
+                await _copy_users(conn, batch)
+            else:
+                # executemany is sent as multi-row INSERT ... VALUES batches
+                await conn.execute(insert(User.__table__), batch)
+        if verbose:
+            print(f"  inserted {offset + len(batch)}/{len(rows)}")
+
+
+async def seed_users(count: int, batch_size: int, days: int, phone_start: int):
+    """Bulk-insert `count` verified, waiting users."""
+    await check_schema()
+
+    # Continue ranks after users already waiting
+    query = (
+        select(User.city, User.gender, func.max(User.queue_rank))
+        .where(User.status == UserStatus.WAITING)
+        .group_by(User.city, User.gender)
+    )
+    async with write_engine.connect() as conn:
+        rank_start = {
+            (city, gender): rank or 0
+            for city, gender, rank in (await conn.execute(query)).all()
+        }
+
+    rows = generate_users(count, days, phone_start, rank_start)
+    started = time.perf_counter()
+    await insert_users(rows, batch_size, verbose=True)
+    elapsed = time.perf_counter() - started
+    print(f"✅ Seeded {count} users in {elapsed:.1f}s ({count / elapsed:.0f}/s)")
+
+
+# ===== Traffic =====
+
+
+class LatencyStats:
+    """Per-operation latency samples and error counts."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, name: str, seconds: float, ok: bool):
+        self.samples[name].append(seconds)
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self):
+        print(
+            f"{'operation':<16}{'count':>8}{'errors':>8}{'p50':>10}{'p95':>10}{'p99':>10}"
+        )
+        for name, samples in sorted(self.samples.items()):
+            ordered = sorted(samples)
+
+            def pct(p):
+                return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000
+
+            print(
+                f"{name:<16}{len(ordered):>8}{self.errors[name]:>8}"
+                f"{pct(0.50):>9.1f}ms{pct(0.95):>8.1f}ms{pct(0.99):>8.1f}ms"
+            )
+
+
+async def run_traffic(
+    base_url: str, signups: int, concurrency: int, messages: int, phone_start: int
+):
+    """Concurrent signups, then inbox polling and chat for every user."""
+    stats = LatencyStats()
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=base_url.rstrip("/") + "/api/v1", limits=limits, timeout=30
+    ) as client:
+
+        async def call(name: str, method: str, url: str, **kwargs):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, **kwargs)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    response, ok = None, False
+                stats.record(name, time.perf_counter() - started, ok)
+                return response if ok else None
+
+        async def signup(i: int):
+            phone = f"+{phone_start + i}"
+            if not await call(
+                "register", "POST", "/auth/register", json={"phone_number": phone}
+            ):
+                return None
+            response = await call(
+                "verify_otp",
+                "POST",
+                "/auth/verify-otp",
+                json={"phone_number": phone, "otp_code": settings.DEV_OTP_CODE},
+            )
+            if not response:
+                return None
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            await call(
+                "profile_setup",
+                "POST",
+                "/auth/profile-setup",
+                headers=headers,
+                json={
+                    "name": f"Load User {i}",
+                    "gender": random.choice(("MALE", "FEMALE")),
+                    "age": random.randint(18, 45),
+                    "city": random.choice(CITIES),
+                },
+            )
+            return headers
+
+        async def chat(headers: dict):
+            response = await call("get_matches", "GET", "/matches", headers=headers)
+            if not response:
+                return
+            for match in response.json()["matches"]:
+                for n in range(messages):
+                    await call(
+                        "send_message",
+                        "POST",
+                        f"/chat/{match['id']}/messages",
+                        headers=headers,
+                        json={"content": f"load message {n}"},
+                    )
+                await call(
+                    "get_messages",
+                    "GET",
+                    f"/chat/{match['id']}/messages",
+                    headers=headers,
+                )
+
+        started = time.perf_counter()
+        sessions = await asyncio.gather(*(signup(i) for i in range(signups)))
+        await call("process_queue", "POST", "/matches/process-queue")
+        await asyncio.gather(*(chat(headers) for headers in sessions if headers))
+        elapsed = time.perf_counter() - started
+
+    stats.report()
+    print(f"✅ Traffic run finished in {elapsed:.1f}s")
+
+
+# ===== CLI =====
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.tools.loadgen")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed = commands.add_parser("seed", help="bulk-insert verified waiting users")
+    seed.add_argument("--users", type=int, default=100000)
+    seed.add_argument("--batch-size", type=int, default=5000)
+    seed.add_argument("--days", type=int, default=30, help="spread of verified_at")
+    seed.add_argument("--phone-start", type=int, default=19000000000)
+
+    traffic = commands.add_parser("traffic", help="drive load against a running app")
+    traffic.add_argument("--base-url", default="http://localhost:8000")
+    traffic.add_argument("--signups", type=int, default=1000)
+    traffic.add_argument("--concurrency", type=int, default=50)
+    traffic.add_argument("--messages", type=int, default=5, help="per match")
+    traffic.add_argument("--phone-start", type=int, default=18000000000)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "seed":
+        asyncio.run(
+            seed_users(args.users, args.batch_size, args.days, args.phone_start)
+        )
+    else:
+        asyncio.run(
+            run_traffic(
+                args.base_url,
+                args.signups,
+                args.concurrency,
+                args.messages,
+                args.phone_start,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
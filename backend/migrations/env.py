@@ -0,0 +1,67 @@
+"""
+Alembic environment.
+
+Uses DATABASE_URL from the app settings and the async driver it names.
+After an online upgrade that reaches head, the models' fingerprint is
+stored in `schema_info` for the workers' startup check; below head it is
+cleared so workers refuse to start against a partial schema.
+"""
+
+import asyncio
+
+from alembic import context
+from alembic.script import ScriptDirectory
+from app.core.config import settings
+from app.core.database import Base
+from app.core.schema import clear_schema_fingerprint, record_schema_fingerprint
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+config = context.config
+target_metadata = Base.metadata
+
+
+def run_migrations_offline():
+    """Emit SQL to stdout (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=settings.DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=settings.DATABASE_URL.startswith("sqlite"),
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection):
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite cannot ALTER most things in place
+        render_as_batch=connection.dialect.name == "sqlite",
+        # SQLite reflects UUID columns as NUMERIC
+        compare_type=connection.dialect.name != "sqlite",
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+        heads = set(ScriptDirectory.from_config(config).get_heads())
+        current = set(context.get_context().get_current_heads())
+        if current and current == heads:
+            record_schema_fingerprint(connection, ",".join(sorted(current)))
+        else:
+            clear_schema_fingerprint(connection)
+
+
+async def run_migrations_online():
+    engine = create_async_engine(settings.DATABASE_URL, poolclass=NullPool)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+        await connection.commit()
+    await engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_migrations_online())
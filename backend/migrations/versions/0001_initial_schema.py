@@ -0,0 +1,85 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 12:19:02.344904
+
+Tables exactly as the first release created them with
+`Base.metadata.create_all`. Databases that were created that way can be
+adopted with `alembic stamp 0001` followed by `alembic upgrade head`; the
+later revisions apply every schema change made since.
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+ENUMS = (
+    sa.Enum("MALE", "FEMALE", name="gender"),
+    sa.Enum(
+        "PENDING_VERIFICATION", "WAITING", "MATCHED", "INACTIVE", name="userstatus"
+    ),
+    sa.Enum("ACTIVE", "COMPLETED", "EXPIRED", "CANCELLED", name="matchstatus"),
+)
+gender, userstatus, matchstatus = ENUMS
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("phone_number", sa.String(length=20), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=True),
+        sa.Column("gender", gender, nullable=True),
+        sa.Column("age", sa.Integer(), nullable=True),
+        sa.Column("city", sa.String(length=100), nullable=True),
+        sa.Column("is_verified", sa.Boolean(), nullable=True),
+        sa.Column("otp_code", sa.String(length=6), nullable=True),
+        sa.Column("otp_expires_at", sa.DateTime(), nullable=True),
+        sa.Column("status", userstatus, nullable=True),
+        sa.Column("queue_rank", sa.Integer(), nullable=True),
+        sa.Column("registered_at", sa.DateTime(), nullable=True),
+        sa.Column("verified_at", sa.DateTime(), nullable=True),
+        sa.Column("last_active_at", sa.DateTime(), nullable=True),
+        sa.Column("profile_image_url", sa.String(length=500), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_phone_number", "users", ["phone_number"], unique=True)
+
+    op.create_table(
+        "matches",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("male_user_id", sa.UUID(), nullable=False),
+        sa.Column("female_user_id", sa.UUID(), nullable=False),
+        sa.Column("status", matchstatus, nullable=True),
+        sa.Column("matched_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["female_user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["male_user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("match_id", sa.UUID(), nullable=False),
+        sa.Column("sender_id", sa.UUID(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("is_read", sa.Boolean(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["match_id"], ["matches.id"]),
+        sa.ForeignKeyConstraint(["sender_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+
+
+def downgrade():
+    op.drop_table("messages")
+    op.drop_table("matches")
+    op.drop_table("users")
+    for enum in ENUMS:
+        enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,130 @@
+"""messages keyed by (id, sent_at) and partitioned by month; message archive
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 12:21:40.118203
+
+PostgreSQL cannot turn a table into a partitioned one in place, so messages
+is rebuilt: the old table is renamed, the new one created with monthly
+partitions covering its rows, and the rows copied over. SQLite has no
+partitioning but the table is rebuilt the same way for the new key.
+"""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def _month_start(moment: datetime, months_ahead: int = 0) -> datetime:
+    month = moment.month - 1 + months_ahead
+    return datetime(moment.year + month // 12, month % 12 + 1, 1)
+
+
+def _create_messages(partitioned: bool):
+    sent_at = sa.Column("sent_at", sa.DateTime(), nullable=not partitioned)
+    if partitioned:
+        key = sa.PrimaryKeyConstraint("id", "sent_at")
+        options = {"postgresql_partition_by": "RANGE (sent_at)"}
+    else:
+        key = sa.PrimaryKeyConstraint("id")
+        options = {}
+    op.create_table(
+        "messages",
+        sa.Column("id", sa.UUID(), nullable=False),
+        sa.Column("match_id", sa.UUID(), nullable=False),
+        sa.Column("sender_id", sa.UUID(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("is_read", sa.Boolean(), nullable=True),
+        sent_at,
+        sa.ForeignKeyConstraint(["match_id"], ["matches.id"]),
+        sa.ForeignKeyConstraint(["sender_id"], ["users.id"]),
+        key,
+        **options,
+    )
+
+
+def _rename_old_messages():
+    op.rename_table("messages", "messages_old")
+    if op.get_bind().dialect.name == "postgresql":
+        # The primary key index name would clash with the new table's
+        op.execute(
+            "ALTER TABLE messages_old RENAME CONSTRAINT messages_pkey "
+            "TO messages_old_pkey"
+        )
+
+
+def _create_partitions():
+    """Monthly partitions for the copied rows and this month, plus a default."""
+    now = datetime.utcnow()
+    oldest = None
+    if not op.get_context().as_sql:
+        oldest = op.get_bind().scalar(sa.text("SELECT min(sent_at) FROM messages_old"))
+    start = _month_start(min(oldest or now, now))
+    while start <= now:
+        end = _month_start(start, 1)
+        op.execute(
+            f"CREATE TABLE messages_{start:%Y_%m} PARTITION OF messages "
+            f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        start = end
+    op.execute("CREATE TABLE messages_default PARTITION OF messages DEFAULT")
+
+
+def _copy_messages():
+    # The partition key cannot be NULL; old rows without one count as sent now
+    op.execute(
+        sa.text(
+            "INSERT INTO messages "
+            "(id, match_id, sender_id, content, is_read, sent_at) "
+            "SELECT id, match_id, sender_id, content, is_read, "
+            "coalesce(sent_at, :now) FROM messages_old"
+        ).bindparams(now=datetime.utcnow())
+    )
+    op.drop_table("messages_old")
+
+
+def upgrade():
+    _rename_old_messages()
+    _create_messages(partitioned=True)
+    if op.get_bind().dialect.name == "postgresql":
+        _create_partitions()
+    _copy_messages()
+
+    op.create_index("ix_messages_match_sent", "messages", ["match_id", "sent_at"])
+    op.create_index(
+        "ix_messages_unread",
+        "messages",
+        ["match_id", "sender_id"],
+        postgresql_where=sa.column("is_read") == sa.false(),
+        sqlite_where=sa.column("is_read") == sa.false(),
+    )
+
+    op.create_table(
+        "message_archive",
+        sa.Column("match_id", sa.UUID(), nullable=False),
+        sa.Column("chunk_index", sa.Integer(), nullable=False),
+        sa.Column("message_count", sa.Integer(), nullable=False),
+        sa.Column("first_sent_at", sa.DateTime(), nullable=False),
+        sa.Column("last_sent_at", sa.DateTime(), nullable=False),
+        sa.Column("payload", sa.LargeBinary(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["match_id"], ["matches.id"]),
+        sa.PrimaryKeyConstraint("match_id", "chunk_index"),
+    )
+
+
+def downgrade():
+    # Archived chunks are dropped, not moved back into messages
+    op.drop_table("message_archive")
+
+    op.drop_index("ix_messages_unread", table_name="messages")
+    op.drop_index("ix_messages_match_sent", table_name="messages")
+    _rename_old_messages()
+    _create_messages(partitioned=False)
+    _copy_messages()
@@ -0,0 +1,50 @@
+"""last activity of matches for the lifecycle sweeper
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 12:23:05.640117
+"""
+
+from datetime import datetime
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+# SQLite rebuilds the table; keep the UUID types it reflects as NUMERIC
+MATCHES_UUIDS = [
+    sa.Column("id", sa.UUID(), primary_key=True),
+    sa.Column("male_user_id", sa.UUID(), sa.ForeignKey("users.id"), nullable=False),
+    sa.Column("female_user_id", sa.UUID(), sa.ForeignKey("users.id"), nullable=False),
+]
+
+
+def upgrade():
+    with op.batch_alter_table("matches") as batch_op:
+        batch_op.add_column(sa.Column("last_activity_at", sa.DateTime(), nullable=True))
+
+    # Existing matches count as active since they were made; the sweeper
+    # compares with `<`, which a NULL would never satisfy
+    op.execute(
+        sa.text(
+            "UPDATE matches SET last_activity_at = coalesce(matched_at, :now) "
+            "WHERE last_activity_at IS NULL"
+        ).bindparams(now=datetime.utcnow())
+    )
+    with op.batch_alter_table("matches", reflect_args=MATCHES_UUIDS) as batch_op:
+        batch_op.alter_column(
+            "last_activity_at", existing_type=sa.DateTime(), nullable=False
+        )
+    op.create_index(
+        "ix_matches_status_activity", "matches", ["status", "last_activity_at"]
+    )
+
+
+def downgrade():
+    op.drop_index("ix_matches_status_activity", table_name="matches")
+    with op.batch_alter_table("matches", reflect_args=MATCHES_UUIDS) as batch_op:
+        batch_op.drop_column("last_activity_at")
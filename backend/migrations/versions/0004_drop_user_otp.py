@@ -0,0 +1,30 @@
+"""drop OTP columns from users (challenges live in the TTL store)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 12:24:31.905572
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+# SQLite rebuilds the table; keep the UUID type it reflects as NUMERIC
+USERS_ID = sa.Column("id", sa.UUID(), primary_key=True)
+
+
+def upgrade():
+    with op.batch_alter_table("users", reflect_args=[USERS_ID]) as batch_op:
+        batch_op.drop_column("otp_expires_at")
+        batch_op.drop_column("otp_code")
+
+
+def downgrade():
+    with op.batch_alter_table("users", reflect_args=[USERS_ID]) as batch_op:
+        batch_op.add_column(sa.Column("otp_code", sa.String(length=6), nullable=True))
+        batch_op.add_column(sa.Column("otp_expires_at", sa.DateTime(), nullable=True))
@@ -0,0 +1,31 @@
+"""matching index on users (city, gender, status, verified_at)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19 12:40:00.000000
+"""
+
+from alembic import op
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CONCURRENTLY on PostgreSQL so the users table stays writable
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_users_matching",
+            "users",
+            ["city", "gender", "status", "verified_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_users_matching", table_name="users", postgresql_concurrently=True
+        )
@@ -0,0 +1,40 @@
+"""outbox events
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 12:35:09.257531
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "outbox_events",
+        sa.Column(
+            "id", sa.BigInteger().with_variant(sa.Integer(), "sqlite"), nullable=False
+        ),
+        sa.Column("topic", sa.String(length=50), nullable=False),
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("delivered_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_outbox_events_pending",
+        "outbox_events",
+        ["id"],
+        postgresql_where=sa.column("delivered_at").is_(None),
+        sqlite_where=sa.column("delivered_at").is_(None),
+    )
+
+
+def downgrade():
+    op.drop_table("outbox_events")
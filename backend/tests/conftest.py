@@ -0,0 +1,37 @@
+"""
+Test setup: every run migrates a scratch SQLite database.
+
+The settings are read when `app` is first imported, so the database URL
+is set here before any test module imports it. Run the suite once more
+with SQLITE_PRODUCTION_MODE=true to cover the reader/writer split.
+"""
+
+import os
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_db_dir = tempfile.mkdtemp(prefix="concort-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_dir}/test.db"
+
+import pytest  # noqa: E402
+from alembic import command  # noqa: E402
+from alembic.config import Config  # noqa: E402
+from app.core.database import Base, write_engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    """Build the schema with the real migrations."""
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    command.upgrade(config, "head")
+    yield
+
+
+@pytest.fixture(autouse=True)
+async def clean_tables(migrated_database):
+    """Every test starts from empty tables."""
+    yield
+    async with write_engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            await conn.execute(table.delete())
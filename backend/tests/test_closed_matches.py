@@ -0,0 +1,84 @@
+"""
+Closed matches take no more messages.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from app.api.v1.endpoints.chat import send_message
+from app.core.database import async_session_maker
+from app.models.match import Match, MatchStatus
+from app.models.message import Message
+from app.models.user import Gender, User, UserStatus
+from app.schemas import MessageCreate
+from fastapi import HTTPException
+from sqlalchemy import func, select
+
+_phones = iter(range(10_000_000))
+
+
+async def add_match(status: MatchStatus) -> Match:
+    async with async_session_maker() as db:
+        users = [
+            User(
+                phone_number=f"+1666{next(_phones):07d}",
+                name="Test",
+                gender=gender,
+                age=30,
+                city="Pune",
+                is_verified=True,
+                status=UserStatus.MATCHED,
+            )
+            for gender in (Gender.MALE, Gender.FEMALE)
+        ]
+        db.add_all(users)
+        await db.flush()
+        match = Match(
+            male_user_id=users[0].id,
+            female_user_id=users[1].id,
+            status=status,
+            last_activity_at=datetime.utcnow() - timedelta(days=2),
+        )
+        db.add(match)
+        await db.commit()
+        return match
+
+
+async def message_count() -> int:
+    async with async_session_maker() as db:
+        return await db.scalar(select(func.count()).select_from(Message))
+
+
+async def test_active_match_takes_messages():
+    match = await add_match(MatchStatus.ACTIVE)
+
+    async with async_session_maker() as db:
+        sent = await send_message(
+            match.id, MessageCreate(content="hi"), match.male_user_id, db
+        )
+
+    assert sent.content == "hi"
+    assert await message_count() == 1
+    async with async_session_maker() as db:
+        touched = await db.scalar(
+            select(Match.last_activity_at).where(Match.id == match.id)
+        )
+    assert touched == sent.sent_at
+
+
+async def test_expired_match_rejects_messages():
+    match = await add_match(MatchStatus.EXPIRED)
+
+    async with async_session_maker() as db:
+        with pytest.raises(HTTPException) as rejected:
+            await send_message(
+                match.id, MessageCreate(content="hi"), match.male_user_id, db
+            )
+
+    assert rejected.value.status_code == 409
+    assert await message_count() == 0
+    async with async_session_maker() as db:
+        touched = await db.scalar(
+            select(Match.last_activity_at).where(Match.id == match.id)
+        )
+    assert touched == match.last_activity_at
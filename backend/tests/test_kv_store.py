@@ -0,0 +1,32 @@
+"""
+In-process key-value store: expiry and bounded bookkeeping.
+"""
+
+import time
+
+from app.core.kv_store import MemoryStore
+
+
+async def test_rewritten_keys_do_not_pile_up_heap_entries():
+    store = MemoryStore()
+    keys = [f"presence:online:{i}" for i in range(1000)]
+
+    for _ in range(200):
+        await store.set_many({key: "1" for key in keys}, 3600)
+
+    assert len(store._data) == 1000
+    assert len(store._expiry_heap) <= 2 * len(store._data)
+    assert await store.get_many(keys[:2]) == ["1", "1"]
+
+
+async def test_expired_keys_are_purged(monkeypatch):
+    store = MemoryStore()
+    await store.set("a", "1", 10)
+    await store.set("a", "2", 10)
+    assert await store.incr("n", 10) == 1
+    assert await store.incr("n", 10) == 2
+
+    later = time.monotonic() + 11
+    monkeypatch.setattr(time, "monotonic", lambda: later)
+    assert await store.get("a") is None
+    assert store._data == {} and store._expiry_heap == []
@@ -0,0 +1,144 @@
+"""
+Concurrent matching: no user may end up in two ACTIVE matches.
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+from app.core.database import async_session_maker
+from app.core.matching_engine import MatchingEngine
+from app.models.match import Match, MatchStatus
+from app.models.user import Gender, User, UserStatus
+from sqlalchemy import func, select
+
+CITY = "Pune"
+_phones = iter(range(10_000_000))
+
+
+async def add_waiter(gender: Gender, minutes_ago: int = 0) -> User:
+    """A user already in the queue (as after a bulk requeue or import)."""
+    async with async_session_maker() as db:
+        user = User(
+            phone_number=f"+1555{next(_phones):07d}",
+            name="Test",
+            gender=gender,
+            age=30,
+            city=CITY,
+            is_verified=True,
+            status=UserStatus.WAITING,
+            verified_at=datetime.utcnow() - timedelta(minutes=minutes_ago),
+        )
+        db.add(user)
+        await db.commit()
+        return user
+
+
+async def arrive(gender: Gender) -> User:
+    """A user finishing profile setup: joins the queue and is matched."""
+    async with async_session_maker() as db:
+        user = User(
+            phone_number=f"+1555{next(_phones):07d}",
+            name="Test",
+            gender=gender,
+            age=30,
+            city=CITY,
+            is_verified=True,
+            status=UserStatus.PENDING_VERIFICATION,
+        )
+        db.add(user)
+        await db.commit()
+        await MatchingEngine(db).add_to_queue(user)
+        return user
+
+
+async def active_matches_per_user():
+    async with async_session_maker() as db:
+        matches = (
+            await db.execute(
+                select(Match.male_user_id, Match.female_user_id).where(
+                    Match.status == MatchStatus.ACTIVE
+                )
+            )
+        ).all()
+    counts = {}
+    for pair in matches:
+        for user_id in pair:
+            counts[user_id] = counts.get(user_id, 0) + 1
+    return counts
+
+
+async def status_of(user: User) -> UserStatus:
+    async with async_session_maker() as db:
+        return await db.scalar(select(User.status).where(User.id == user.id))
+
+
+async def test_concurrent_arrivals_take_a_waiter_once(monkeypatch):
+    male = await add_waiter(Gender.MALE, minutes_ago=5)
+
+    # Both arrivals find the same waiter before either claims him
+    barrier = asyncio.Barrier(2)
+    find_candidate = MatchingEngine.find_candidate
+
+    async def find_together(self, user):
+        candidate = await find_candidate(self, user)
+        if not getattr(self, "synced", False):
+            self.synced = True
+            await barrier.wait()
+        return candidate
+
+    monkeypatch.setattr(MatchingEngine, "find_candidate", find_together)
+    first, second = await asyncio.gather(arrive(Gender.FEMALE), arrive(Gender.FEMALE))
+
+    # One match; the losing arrival waits for the next male
+    counts = await active_matches_per_user()
+    assert counts[male.id] == 1 and len(counts) == 2
+    assert {await status_of(first), await status_of(second)} == {
+        UserStatus.MATCHED,
+        UserStatus.WAITING,
+    }
+
+
+async def test_partition_run_skips_a_pair_taken_by_an_arrival(monkeypatch):
+    male = await add_waiter(Gender.MALE, minutes_ago=10)
+    female = await add_waiter(Gender.FEMALE, minutes_ago=9)
+
+    # A new arrival takes the male after the partition was read
+    arrivals = []
+    claim_pair = MatchingEngine._claim_pair
+
+    async def arrival_first(self, male_id, female_id):
+        if not arrivals:
+            arrivals.append(await arrive(Gender.FEMALE))
+        return await claim_pair(self, male_id, female_id)
+
+    monkeypatch.setattr(MatchingEngine, "_claim_pair", arrival_first)
+    async with async_session_maker() as db:
+        new_matches = await MatchingEngine(db).process_queue([CITY])
+
+    assert new_matches == []
+    assert await active_matches_per_user() == {male.id: 1, arrivals[0].id: 1}
+    assert await status_of(female) == UserStatus.WAITING
+
+
+async def test_partition_run_pairs_and_ranks_the_rest():
+    males = [await add_waiter(Gender.MALE, minutes_ago=30 - i) for i in range(3)]
+    female = await add_waiter(Gender.FEMALE, minutes_ago=5)
+
+    async with async_session_maker() as db:
+        new_matches = await MatchingEngine(db).process_queue([CITY])
+
+    assert [(m.male_user_id, m.female_user_id) for m in new_matches] == [
+        (males[0].id, female.id)
+    ]
+    async with async_session_maker() as db:
+        ranks = dict(
+            (
+                await db.execute(
+                    select(User.id, User.queue_rank).where(
+                        User.status == UserStatus.WAITING
+                    )
+                )
+            ).all()
+        )
+        assert await db.scalar(select(func.count(Match.id))) == 1
+    assert ranks == {males[1].id: 1, males[2].id: 2}
@@ -0,0 +1,28 @@
+"""
+Presence: heartbeat rounds keep the key-value store bounded.
+"""
+
+from datetime import datetime
+
+from app.core.kv_store import MemoryStore
+from app.core.presence import PresenceTracker
+
+
+async def test_heartbeat_rounds_only_refresh_online_entries():
+    store = MemoryStore()
+    tracker = PresenceTracker(store)
+    users = [f"user-{i}" for i in range(1000)]
+
+    for round_number in range(200):
+        await tracker.mark_online({user: 1000.0 + round_number for user in users})
+
+    # One online entry per user, no last_seen writes while online
+    assert len(store._data) == len(users)
+    assert len(store._expiry_heap) <= 2 * len(store._data)
+
+    await tracker.mark_offline("user-0", reaped=True)
+    presence = await tracker.lookup(["user-0", "user-1"])
+    assert presence["user-0"].online is False
+    assert presence["user-0"].last_seen_at == datetime.utcfromtimestamp(1199.0)
+    assert presence["user-1"].online is True
+    assert len(store._data) == len(users)
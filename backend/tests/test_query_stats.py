@@ -0,0 +1,66 @@
+"""
+Server-Timing covers buffered responses; streamed ones are logged at the end.
+"""
+
+import logging
+import re
+
+import httpx
+from app.core.database import async_session_maker
+from app.core.query_stats import QueryStatsMiddleware
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from sqlalchemy import text
+
+app = FastAPI()
+app.add_middleware(QueryStatsMiddleware)
+
+
+async def run_query():
+    async with async_session_maker() as db:
+        await db.execute(text("SELECT 1"))
+
+
+@app.get("/buffered")
+async def buffered():
+    await run_query()
+    return {"ok": True}
+
+
+@app.get("/streamed")
+async def streamed():
+    async def body():
+        yield b"["
+        await run_query()
+        await run_query()
+        yield b"]"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+def client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://t")
+
+
+async def queries_per_session() -> int:
+    """Statements one run_query() costs (the reader session may add some)."""
+    async with client() as http:
+        timing = (await http.get("/buffered")).headers["server-timing"]
+    return int(re.search(r'desc="(\d+) queries"', timing).group(1))
+
+
+async def test_buffered_response_reports_its_queries():
+    assert await queries_per_session() >= 1
+
+
+async def test_streamed_response_logs_queries_run_by_its_body(caplog):
+    per_session = await queries_per_session()
+    with caplog.at_level(logging.DEBUG, logger="concort.slow_query"):
+        async with client() as http:
+            response = await http.get("/streamed")
+
+    assert response.content == b"[]"
+    assert "server-timing" not in response.headers
+    [record] = [r for r in caplog.records if r.msg.endswith("streamed_response")]
+    assert record.queries == 2 * per_session
+    assert record.path == "/streamed"
@@ -0,0 +1,76 @@
+"""
+Refresh token rotation and session revocation.
+"""
+
+from uuid import UUID
+
+from app.core.database import async_session_maker
+from app.models.user import Gender, User, UserStatus
+from app.services import sessions
+from app.services.sessions import (
+    RevocationList,
+    revoke_session,
+    rotate_session,
+    start_session,
+    verify_access_token,
+)
+
+
+async def add_user() -> User:
+    async with async_session_maker() as db:
+        user = User(
+            phone_number="+18880000000",
+            name="Test",
+            gender=Gender.FEMALE,
+            age=30,
+            city="Pune",
+            is_verified=True,
+            status=UserStatus.WAITING,
+        )
+        db.add(user)
+        await db.commit()
+        return user
+
+
+async def test_rotation_invalidates_the_old_refresh_token():
+    user = await add_user()
+    async with async_session_maker() as db:
+        _, first = await start_session(db, user.id)
+        user_id, access_token, second = await rotate_session(db, first)
+
+    assert user_id == user.id
+    assert await verify_access_token(access_token) is not None
+    async with async_session_maker() as db:
+        assert await rotate_session(db, second) is not None
+        assert await rotate_session(db, first) is None
+
+
+async def test_reusing_a_rotated_refresh_token_revokes_the_session():
+    user = await add_user()
+    async with async_session_maker() as db:
+        _, first = await start_session(db, user.id)
+        _, access_token, second = await rotate_session(db, first)
+
+        # The replayed token is refused and takes the whole session down
+        assert await rotate_session(db, first) is None
+        assert await rotate_session(db, second) is None
+
+    assert await verify_access_token(access_token) is None
+
+
+async def test_revocation_reaches_other_workers_on_sync(monkeypatch):
+    user = await add_user()
+    async with async_session_maker() as db:
+        access_token, _ = await start_session(db, user.id)
+    session_id = UUID((await verify_access_token(access_token))["sid"])
+
+    # The session is revoked on another worker
+    worker = RevocationList()
+    await worker.sync()
+    async with async_session_maker() as db:
+        await revoke_session(db, session_id)
+
+    monkeypatch.setattr(sessions, "revocation_list", worker)
+    assert await verify_access_token(access_token) is not None
+    await worker.sync()
+    assert await verify_access_token(access_token) is None